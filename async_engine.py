@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+asyncio-движок загрузки лотов и изображений для FullAuctionParser
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import aiohttp
+
+from image_policy import ImageBudgetExceeded, ImageTooLarge
+from incremental import UNCHANGED
+from metrics import timed
+from rate_limit import RETRY_STATUSES, AdaptiveRateLimiter, CircuitBreaker, parse_retry_after
+
+
+class AsyncRateLimiter:
+    """Бюджет запросов в секунду для корутин одного event loop; pause(seconds) - Retry-After"""
+
+    def __init__(self, requests_per_second):
+        self.interval = 1.0 / requests_per_second
+        self.next_slot = 0.0
+        self.paused_until = 0.0
+        self.lock = asyncio.Lock()
+
+    def pause(self, seconds):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        async with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_slot, self.paused_until)
+            self.next_slot = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+class AsyncAuctionEngine:
+    """Общий асинхронный пул соединений для страниц лотов и изображений
+
+    Движок живет в собственном потоке с event loop, поэтому один экземпляр
+    можно разделить между несколькими FullAuctionParser (в том числе из разных
+    потоков) - все запросы идут через одно ограниченное по хостам пул соединений.
+    requests_per_second - число, "auto" или готовый лимитер (RateLimiter /
+    AdaptiveRateLimiter), общий с requests-сессиями парсеров; circuit_breaker -
+    общий CircuitBreaker (для "auto" без него создается свой).
+    """
+
+    def __init__(self, concurrency=100, per_host_limit=20, requests_per_second=None,
+                 timeout=30, image_timeout=10, retries=3, backoff_factor=0.3,
+                 headers=None, extract_workers=4, metrics=None, log=None, circuit_breaker=None):
+        self.concurrency = concurrency
+        self.per_host_limit = per_host_limit
+        self.requests_per_second = requests_per_second
+        self.timeout = timeout
+        self.image_timeout = image_timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.headers = headers or {}
+        self.extract_workers = extract_workers
+        # Metrics: DNS, соединение, время до заголовков, загрузка тела, статусы ответов
+        self.metrics = metrics
+        # RunLog для пауз хостов CircuitBreaker
+        self.log = log
+
+        self.loop = None
+        self.thread = None
+        self.client = None
+        self.rate_limiter = None
+        self.circuit_breaker = circuit_breaker
+        self.extract_executor = None
+        self.start_lock = threading.Lock()
+
+    # ---------- жизненный цикл ----------
+
+    def start(self):
+        """Запуск event loop в фоновом потоке и открытие пула соединений"""
+        # Общий движок могут одновременно запускать парсеры из разных потоков
+        with self.start_lock:
+            if self.loop:
+                return self
+
+            loop = asyncio.new_event_loop()
+            self.thread = threading.Thread(target=loop.run_forever, name="async-engine", daemon=True)
+            self.thread.start()
+            self.extract_executor = ThreadPoolExecutor(max_workers=self.extract_workers)
+            try:
+                asyncio.run_coroutine_threadsafe(self._open(), loop).result()
+            except BaseException:
+                # close() без self.loop ничего не делает - освобождаем все здесь
+                self.stop_loop(loop)
+                raise
+            self.loop = loop
+        return self
+
+    async def _open(self):
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host_limit)
+        trace_configs = [self.trace_config()] if self.metrics else []
+        self.client = aiohttp.ClientSession(connector=connector, headers=self.headers, trace_configs=trace_configs)
+        if self.requests_per_second == "auto":
+            self.rate_limiter = AdaptiveRateLimiter()
+            self.circuit_breaker = self.circuit_breaker or CircuitBreaker(log=self.log)
+        elif hasattr(self.requests_per_second, 'acquire'):
+            # Готовый лимитер - как есть, бюджет общий с потоками
+            self.rate_limiter = self.requests_per_second
+        elif self.requests_per_second:
+            self.rate_limiter = AsyncRateLimiter(self.requests_per_second)
+
+    def close(self):
+        """Закрытие пула соединений и остановка event loop"""
+        if not self.loop:
+            return
+
+        self.stop_loop(self.loop)
+        self.loop = None
+
+    def stop_loop(self, loop):
+        if self.client:
+            asyncio.run_coroutine_threadsafe(self.client.close(), loop).result()
+            self.client = None
+        loop.call_soon_threadsafe(loop.stop)
+        self.thread.join()
+        loop.close()
+        self.extract_executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- HTTP ----------
+
+    def trace_config(self):
+        """Замер DNS, установки соединения и времени до заголовков ответа через трассировку aiohttp"""
+        metrics = self.metrics
+        trace_config = aiohttp.TraceConfig()
+
+        def start(name):
+            async def on_start(session, context, params):
+                setattr(context, name, time.perf_counter())
+            return on_start
+
+        def end(name, stage):
+            async def on_end(session, context, params):
+                metrics.observe(stage, time.perf_counter() - getattr(context, name))
+            return on_end
+
+        trace_config.on_dns_resolvehost_start.append(start('dns_started_at'))
+        trace_config.on_dns_resolvehost_end.append(end('dns_started_at', 'http_dns'))
+        trace_config.on_connection_create_start.append(start('connect_started_at'))
+        trace_config.on_connection_create_end.append(end('connect_started_at', 'http_connect'))
+        trace_config.on_request_start.append(start('request_started_at'))
+        trace_config.on_request_end.append(end('request_started_at', 'http_ttfb'))
+        return trace_config
+
+    async def throttle(self, host):
+        """Ожидание паузы хоста и слота в бюджете запросов"""
+        if self.metrics and (self.circuit_breaker or self.rate_limiter):
+            with self.metrics.timer('http_wait'):
+                await self.wait_turn(host)
+        else:
+            await self.wait_turn(host)
+
+    async def wait_turn(self, host):
+        if self.circuit_breaker:
+            while True:
+                wait_time = self.circuit_breaker.wait_time(host)
+                if wait_time <= 0:
+                    break
+                await asyncio.sleep(wait_time)
+        if hasattr(self.rate_limiter, 'acquire_async'):
+            # Лимитеры, общие с потоками: неблокирующее резервирование слота
+            await self.rate_limiter.acquire_async()
+        elif self.rate_limiter:
+            await self.rate_limiter.acquire()
+
+    def record_response(self, host, status, latency, retry_after=None):
+        """Статус и задержка ответа - лимитеру и предохранителю (status=None - ошибка соединения)
+
+        Возвращает True, если лимитер сам выдержит паузу перед повтором.
+        """
+        if self.circuit_breaker:
+            self.circuit_breaker.record(host, status is not None and status < 500)
+        if isinstance(self.rate_limiter, AdaptiveRateLimiter):
+            if status is None:
+                self.rate_limiter.record_error()
+            else:
+                self.rate_limiter.record_response(status, latency, parse_retry_after(retry_after))
+            return True
+        retry_after = parse_retry_after(retry_after)
+        if retry_after and status in (429, 503) and self.rate_limiter:
+            self.rate_limiter.pause(retry_after)
+            return True
+        return False
+
+    async def fetch(self, url, timeout=None, max_bytes=None, stage="page"):
+        """GET с повторами на 429/5xx, аналогично Retry в requests-сессии
+
+        max_bytes - тело больше предела не дочитывается (ImageTooLarge);
+        stage - префикс метрик загрузки тела (<stage>_download, <stage>_bytes)
+        """
+        client_timeout = aiohttp.ClientTimeout(total=timeout or self.timeout)
+        host = urlparse(url).netloc
+
+        for attempt in range(self.retries + 1):
+            await self.throttle(host)
+            started_at = time.monotonic()
+            try:
+                async with self.client.get(url, timeout=client_timeout) as response:
+                    paused = self.record_response(host, response.status, time.monotonic() - started_at,
+                                                  response.headers.get('Retry-After'))
+                    if self.metrics:
+                        self.metrics.increment(f"http_status_{response.status}")
+                    if response.status in RETRY_STATUSES and attempt < self.retries:
+                        # Лимитер сам выдерживает Retry-After (адаптивный - еще и снижает частоту)
+                        if not paused:
+                            await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+                        continue
+                    response.raise_for_status()
+                    headers_at = time.perf_counter()
+                    body = await self.read_body(response, max_bytes)
+                    if self.metrics:
+                        self.metrics.observe(f"{stage}_download", time.perf_counter() - headers_at)
+                        self.metrics.observe_size(f"{stage}_bytes", len(body))
+                    return body
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                self.record_response(host, None, time.monotonic() - started_at)
+                if attempt >= self.retries:
+                    raise
+                await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+
+    @staticmethod
+    async def read_body(response, max_bytes=None):
+        if max_bytes is None:
+            return await response.read()
+        if response.content_length and response.content_length > max_bytes:
+            raise ImageTooLarge(f"{response.content_length} байт > {max_bytes}")
+        chunks = []
+        size = 0
+        async for chunk in response.content.iter_chunked(65536):
+            size += len(chunk)
+            if size > max_bytes:
+                raise ImageTooLarge(f"больше {max_bytes} байт")
+            chunks.append(chunk)
+        return b''.join(chunks)
+
+    async def probe_size(self, url, probe):
+        """Размер файла до загрузки: HEAD или Range на первый байт; None - неизвестен"""
+        await self.throttle(urlparse(url).netloc)
+        client_timeout = aiohttp.ClientTimeout(total=self.image_timeout)
+        if probe == 'head':
+            async with self.client.head(url, timeout=client_timeout, allow_redirects=True) as response:
+                return response.content_length if response.ok else None
+        async with self.client.get(url, timeout=client_timeout, headers={'Range': 'bytes=0-0'}) as response:
+            if response.status == 206:
+                total = response.headers.get('Content-Range', '').rpartition('/')[2]
+                return int(total) if total.isdigit() else None
+            return response.content_length if response.ok else None
+
+    async def fetch_image(self, parser, url, filepath):
+        """(URL, байты) изображения в пределах parser.image_policy: при превышении max_image_bytes -
+        меньший размер того же изображения; (URL, None) - взято из хранилища, (None, None) - пропущено"""
+        policy = parser.image_policy
+        for candidate in policy.fallbacks(url):
+            if candidate != url and parser.image_store and await self.loop.run_in_executor(
+                    self.extract_executor, parser.image_from_store, candidate, filepath):
+                return candidate, None
+            try:
+                policy.check_budget()
+                if policy.probe:
+                    policy.check_size(await self.probe_size(candidate, policy.probe))
+                with timed(self.metrics, 'image_fetch'):
+                    body = await self.fetch(candidate, timeout=self.image_timeout, max_bytes=policy.max_image_bytes,
+                                            stage="image")
+                policy.consume(len(body))
+                return candidate, body
+            except ImageTooLarge as e:
+                policy.count_oversized()
+                parser.log("📏 Изображение больше лимита (%s): %s", e, candidate)
+            except ImageBudgetExceeded as e:
+                parser.log("⛔ Изображение пропущено: %s", e)
+                return None, None
+        return None, None
+
+    async def fetch_lot(self, parser, lot_url):
+        """Загрузка страницы лота и извлечение данных вне event loop"""
+        try:
+            parser.log("🎯 ПАРСИНГ ЛОТА: %s", lot_url)
+            with timed(self.metrics, 'lot_parse'):
+                with timed(self.metrics, 'page_fetch'):
+                    html = await self.fetch(lot_url)
+                if parser.raw_html_dir or parser.html_archive:
+                    await self.loop.run_in_executor(self.extract_executor, parser.store_raw_html, lot_url, html)
+                return await self.loop.run_in_executor(self.extract_executor, parser.process_lot_html, lot_url, html)
+        except Exception as e:
+            parser.run_log.error('lot_error', "❌ Ошибка парсинга лота: %s", e, url=lot_url, error=str(e))
+            return None
+
+    async def download_image(self, parser, image, metadata=None):
+        """Скачивание одного изображения в папку лота
+
+        С parser.image_processor результат обработки кладется в metadata[image_index]
+        """
+        try:
+            filepath = parser.get_image_path(
+                image['url'], image['lot_id'], image['lot_number'],
+                image['lot_description'], image['is_main'], image['image_index']
+            )
+            body = None
+            if filepath.exists() and filepath.stat().st_size > 0:
+                parser.log("⏭️ Изображение уже на диске: %s", filepath)
+            elif parser.image_store and await self.loop.run_in_executor(
+                    self.extract_executor, parser.image_from_store, image['url'], filepath):
+                pass
+            else:
+                image_url, body = await self.fetch_image(parser, image['url'], filepath)
+                if image_url is None:
+                    return None
+                if body is not None:
+                    tmp_path = filepath.with_name(filepath.name + '.part')
+                    with open(tmp_path, 'wb') as f:
+                        f.write(body)
+                    os.replace(tmp_path, filepath)
+                    if parser.image_store:
+                        await self.loop.run_in_executor(self.extract_executor, parser.image_store.add,
+                                                        image_url, filepath, body)
+                    parser.log("🖼️ Изображение сохранено: %s", filepath)
+
+            if parser.image_processor and metadata is not None:
+                if body is None:
+                    body = await self.loop.run_in_executor(self.extract_executor, filepath.read_bytes)
+                try:
+                    metadata[image['image_index']] = await asyncio.wrap_future(parser.image_processor.submit(body, filepath))
+                except Exception as e:
+                    parser.run_log.warning('image_error', "❌ Ошибка обработки изображения %s: %s", filepath, e,
+                                           path=str(filepath), error=str(e))
+
+            return str(filepath)
+
+        except Exception as e:
+            parser.run_log.warning('image_error', "❌ Ошибка скачивания изображения: %s", e, url=image['url'], error=str(e))
+            return None
+
+    async def download_lot_images(self, parser, lot_data):
+        """Все изображения лота одновременно через общий пул"""
+        images = parser.collect_lot_images(lot_data)
+        if not images:
+            return []
+
+        metadata = {}
+        results = await asyncio.gather(*(self.download_image(parser, image, metadata) for image in images))
+        downloaded = [path for path in results if path]
+        if metadata:
+            parser.apply_image_metadata(lot_data, metadata)
+        parser.log("📷 Скачано %s/%s изображений для лота #%s", len(downloaded), len(images), lot_data.get('lot_number', ''))
+        return downloaded
+
+    async def process_lot(self, parser, lot_url, download_images=True):
+        """Страница лота + его изображения"""
+        lot_data = await self.fetch_lot(parser, lot_url)
+        if download_images and lot_data and lot_data is not UNCHANGED:
+            await self.download_lot_images(parser, lot_data)
+        return lot_data
+
+    # ---------- синхронный интерфейс для FullAuctionParser ----------
+
+    def iter_parsed_lots(self, parser, lots, window=None, download_images=True):
+        """Результаты (лот, lot_data) в порядке лотов, изображения (download_images) уже скачаны
+
+        window - сколько лотов (страница + изображения) одновременно в работе
+        """
+        self.start()
+        window = window or self.concurrency
+        lots_iter = enumerate(lots, 1)
+        pending = deque()
+
+        def submit_next():
+            item = next(lots_iter, None)
+            if item is not None:
+                i, lot = item
+                parser.print_lot_header(i, len(lots), lot)
+                future = asyncio.run_coroutine_threadsafe(self.process_lot(parser, lot['url'], download_images), self.loop)
+                pending.append((lot, future))
+
+        try:
+            for _ in range(window):
+                submit_next()
+
+            while pending:
+                lot, future = pending.popleft()
+                try:
+                    lot_data = future.result()
+                except Exception as e:
+                    parser.run_log.error('lot_error', "❌ Ошибка парсинга лота %s: %s", lot['id'], e, lot_id=lot['id'], error=str(e))
+                    lot_data = None
+
+                submit_next()
+                yield lot, lot_data
+        finally:
+            for _, future in pending:
+                future.cancel()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Повторное извлечение полей из сохраненных HTML страниц лотов (без сети) на всех ядрах
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from html_archive import HTMLArchive
+from parse_full_auction import FullAuctionParser
+
+try:
+    from parquet_writer import ParquetLotWriter
+except ImportError:
+    ParquetLotWriter = None
+
+# Состояние процесса-обработчика (задается в init_worker)
+worker_parser = None
+worker_raw_dir = None
+worker_archive = None
+
+
+def load_manifest(raw_dir):
+    """Последняя запись manifest.jsonl для каждого файла; файлы вне манифеста - по имени lot_<id>.html"""
+    entries = {}
+    manifest_file = raw_dir / "manifest.jsonl"
+    if manifest_file.exists():
+        with open(manifest_file, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    entries[entry['file']] = entry
+
+    for path in raw_dir.glob('*.html'):
+        if path.name not in entries:
+            lot_match = re.search(r'lot_(\d+)', path.stem)
+            lot_query = f"?lot={lot_match.group(1)}" if lot_match else ""
+            entries[path.name] = {'file': path.name, 'url': f"https://www.tennants.co.uk/auction/lot/{path.stem}{lot_query}",
+                                  'fetched_at': ''}
+
+    return [entries[name] for name in sorted(entries) if (raw_dir / name).exists()]
+
+
+def load_archive_entries(archive_dir):
+    """Последняя версия каждой страницы лота из HTMLArchive"""
+    with HTMLArchive(archive_dir, readonly=True) as archive:
+        return archive.latest_entries(kind='lot')
+
+
+def init_worker(source, extractor, from_archive):
+    global worker_parser, worker_raw_dir, worker_archive
+    worker_parser = FullAuctionParser.offline(extractor)
+    if from_archive:
+        worker_archive = HTMLArchive(source, readonly=True)
+    else:
+        worker_raw_dir = Path(source)
+
+
+def extract_entry(entry):
+    """(lot_data, ошибка) для одного сохраненного лота"""
+    try:
+        if worker_archive:
+            html = worker_archive.read(entry)
+        else:
+            html = (worker_raw_dir / entry['file']).read_bytes()
+        lot_data = worker_parser.extract_lot_fields(entry['url'], html)
+        # Время снимка страницы, а не время повторного извлечения
+        if entry.get('fetched_at'):
+            lot_data['timestamp'] = entry['fetched_at']
+        return lot_data, None
+    except Exception as e:
+        return None, f"{entry.get('file') or entry['url']}: {e}"
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("source", help="папка с lot_<id>.html и manifest.jsonl (FullAuctionParser(raw_html_dir=...)) "
+                                           "или папка архива с --archive")
+    arg_parser.add_argument("--archive", action="store_true", help="source - архив HTMLArchive (FullAuctionParser(html_archive=...))")
+    arg_parser.add_argument("--output", help="CSV с результатом (по умолчанию reextracted_<время>.csv)")
+    arg_parser.add_argument("--parquet", help="дополнительно записать типизированный Parquet-датасет в эту папку (нужен pyarrow)")
+    arg_parser.add_argument("--extractor", choices=["bs4", "lxml"], default="lxml")
+    arg_parser.add_argument("--workers", type=int, default=os.cpu_count())
+    arg_parser.add_argument("--chunksize", type=int, default=64, help="лотов на одну задачу процесса")
+    args = arg_parser.parse_args()
+
+    if args.parquet and ParquetLotWriter is None:
+        arg_parser.error("для --parquet установите pyarrow")
+
+    output = Path(args.output or f"reextracted_{datetime.now().strftime('%Y-%m-%d_%H-%M')}.csv")
+    entries = load_archive_entries(args.source) if args.archive else load_manifest(Path(args.source))
+
+    print(f"🗄️ Сохраненных страниц: {len(entries)} | процессов: {args.workers} | движок: {args.extractor}")
+    print("="*60)
+
+    headers = FullAuctionParser.csv_headers()
+    parquet_writer = ParquetLotWriter(args.parquet) if args.parquet else None
+    extracted = 0
+    errors = []
+    start_time = time.perf_counter()
+
+    with open(output, 'w', newline='', encoding='utf-8') as f, \
+            ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                                initargs=(str(args.source), args.extractor, args.archive)) as executor:
+        writer = csv.writer(f)
+        writer.writerow(headers)
+
+        for lot_data, error in executor.map(extract_entry, entries, chunksize=args.chunksize):
+            if error:
+                errors.append(error)
+                continue
+            writer.writerow(FullAuctionParser.csv_row(lot_data))
+            if parquet_writer:
+                parquet_writer.write(lot_data)
+            extracted += 1
+            if extracted % 10000 == 0:
+                elapsed = time.perf_counter() - start_time
+                print(f"⏳ {extracted}/{len(entries)} лотов | {extracted / elapsed:.0f} лот/с")
+
+    if parquet_writer:
+        parquet_writer.close()
+
+    elapsed = time.perf_counter() - start_time
+    for error in errors[:10]:
+        print(f"❌ {error}")
+    print(f"\n✅ Извлечено лотов: {extracted} за {elapsed:.1f}с ({extracted / elapsed if elapsed else 0:.0f} лот/с)")
+    if errors:
+        print(f"❌ Ошибок: {len(errors)}")
+    print(f"💾 CSV: {output}")
+    if args.parquet:
+        print(f"💾 Parquet: {args.parquet}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Сравнение пропускной способности потокового и асинхронного движков на локальном имитаторе сайта
+
+--shared-limiter передает парсеру готовый лимитер (RateLimiter / AdaptiveRateLimiter),
+как crawl_orchestrator.py, - проверка общего бюджета запросов для обоих движков.
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import shutil
+import tempfile
+import time
+import os
+import sys
+
+from fake_tennants_site import FakeTennantsSite
+from parse_full_auction import FullAuctionParser
+from rate_limit import AdaptiveRateLimiter, RateLimiter
+
+
+def make_limit(requests_per_second, shared):
+    """Лимит для iter_lots: "auto", число или готовый лимитер (shared=True)"""
+    if requests_per_second in (None, "auto"):
+        return AdaptiveRateLimiter() if shared and requests_per_second else requests_per_second
+    requests_per_second = float(requests_per_second)
+    return RateLimiter(requests_per_second) if shared else requests_per_second
+
+
+def run_engine(site, engine, concurrency, requests_per_second=None):
+    """Один прогон parse_auction во временной папке, вывод парсера подавлен"""
+    workdir = tempfile.mkdtemp(prefix="tennants_bench_")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        requests_before = site.requests_served
+        with contextlib.redirect_stdout(io.StringIO()):
+            parser = FullAuctionParser("Benchmark", "2025")
+            start_time = time.perf_counter()
+            ok = parser.parse_auction(site.auction_url(), concurrency=concurrency, engine=engine,
+                                      requests_per_second=requests_per_second)
+            elapsed = time.perf_counter() - start_time
+
+        with open(parser.db_file, newline='', encoding='utf-8') as f:
+            rows = sum(1 for _ in csv.reader(f)) - 1
+        requests_made = site.requests_served - requests_before
+        return {
+            'engine': engine,
+            'ok': ok,
+            'lots': rows,
+            'requests': requests_made,
+            'seconds': elapsed,
+            'lots_per_sec': rows / elapsed if elapsed else 0,
+            'requests_per_sec': requests_made / elapsed if elapsed else 0,
+        }
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--lots", type=int, default=96)
+    arg_parser.add_argument("--latency", type=float, default=0.05, help="задержка ответа сервера, с")
+    arg_parser.add_argument("--concurrency", type=int, default=16)
+    arg_parser.add_argument("--requests-per-second", help='"auto" или число запросов в секунду (по умолчанию без лимита)')
+    arg_parser.add_argument("--shared-limiter", action="store_true", help="готовый лимитер вместо числа/\"auto\"")
+    args = arg_parser.parse_args()
+    if args.shared_limiter and not args.requests_per_second:
+        arg_parser.error("--shared-limiter требует --requests-per-second")
+
+    print(f"🧪 Имитатор: {args.lots} лотов, задержка {args.latency * 1000:.0f} мс, параллельно {args.concurrency}")
+    print("="*60)
+
+    results = []
+    with FakeTennantsSite(lot_count=args.lots, latency=args.latency) as site:
+        for engine in ("threads", "async"):
+            result = run_engine(site, engine, args.concurrency,
+                                make_limit(args.requests_per_second, args.shared_limiter))
+            result['passed'] = result['ok'] and result['lots'] == args.lots
+            results.append(result)
+            status = "✅" if result['passed'] else "❌"
+            print(f"{status} {engine:<8} | лотов {result['lots']:>4} | запросов {result['requests']:>5} | "
+                  f"{result['seconds']:>6.2f}с | {result['lots_per_sec']:>6.1f} лот/с | "
+                  f"{result['requests_per_sec']:>7.1f} запр/с")
+
+    threads, async_result = results
+    if threads['seconds'] and async_result['seconds']:
+        print(f"\n⚡ Ускорение async относительно threads: {threads['seconds'] / async_result['seconds']:.2f}x")
+
+    return 0 if all(result['passed'] for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Сверка и замер скорости извлечения данных лота: BeautifulSoup против lxml
+
+Сохраненные страницы (--pages-dir) с ожидаемым результатом <имя>.json рядом
+сверяются с ним для обоих движков; без JSON - движки сверяются друг с другом.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from fake_tennants_site import render_lot_page
+from lxml_extractor import extract_lot_data_lxml
+from parse_full_auction import FullAuctionParser
+
+# Сохраненные страницы лотов с ожидаемыми данными
+GOLDEN_PAGES_DIR = Path(__file__).resolve().parent / "tennants_perfect_data" / "lot_pages"
+
+# Поломки разметки, при которых срабатывают резервные ветки extract_lot_data
+FALLBACK_VARIANTS = [
+    ('class="estimate"', 'class="estimate-old"'),
+    ('class="buyers-premium"', 'class="premium-old"'),
+    ('id="condition"', 'id="condition-old"'),
+    ('class="auction-title"', 'class="auction-old"'),
+    ('class="lot-number"', 'class="lot-old"'),
+    ('class="lot-desc"', 'class="desc-old"'),
+    ('\n', '\r\n'),
+    ('<div class="estimate">Estimate &#163;200 - &#163;250</div>', ''),
+]
+
+
+def synthetic_pages(count):
+    """Страницы лотов имитатора сайта + варианты для резервных веток"""
+    base_url = "https://www.tennants.co.uk"
+    auction_id = 14251
+    pages = []
+    for lot_number in range(1, count + 1):
+        lot_id = auction_id * 1000 + lot_number
+        url = f"{base_url}/auction/lot/lot-{lot_number}?au={auction_id}&lot={lot_id}"
+        html = render_lot_page(base_url, auction_id, lot_id, revision=lot_number % 3)
+        pages.append((url, html.encode('utf-8')))
+        old, new = FALLBACK_VARIANTS[lot_number % len(FALLBACK_VARIANTS)]
+        pages.append((url, html.replace(old, new).encode('utf-8')))
+    return pages
+
+
+def saved_pages(pages_dir):
+    """Сохраненные страницы лотов (*.html): (url, html, путь к JSON с ожидаемыми данными)
+
+    URL берется из ожидаемых данных, без них - восстанавливается из имени файла.
+    """
+    pages = []
+    for path in sorted(Path(pages_dir).glob('*.html')):
+        expected_file = path.with_suffix('.json')
+        if expected_file.exists():
+            url = json.loads(expected_file.read_text(encoding='utf-8'))['url']
+        else:
+            lot_match = re.search(r'(\d+)', path.stem)
+            url = f"https://www.tennants.co.uk/auction/lot/{path.stem}?lot={lot_match.group(1) if lot_match else ''}"
+        pages.append((url, path.read_bytes(), expected_file))
+    return pages
+
+
+def differing_fields(expected, actual):
+    """Поля с разными значениями (порядок ключей тоже должен совпадать)"""
+    differing = [key for key in expected.keys() | actual.keys() if expected.get(key) != actual.get(key)]
+    if not differing and list(expected) != list(actual):
+        differing = ['порядок ключей']
+    return sorted(differing)
+
+
+def time_extractor(extract, pages, repeat):
+    """Время на страницу (мс) по каждому прогону"""
+    timings = []
+    for _ in range(repeat):
+        for url, html in pages:
+            start_time = time.perf_counter()
+            extract(url, html)
+            timings.append((time.perf_counter() - start_time) * 1000)
+    return timings
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--pages-dir", help="папка с сохраненными страницами лотов (*.html)")
+    arg_parser.add_argument("--lots", type=int, default=100, help="сколько синтетических лотов, если нет --pages-dir")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--golden", action="store_true",
+                            help=f"только сверка сохраненных страниц (--pages-dir, по умолчанию {GOLDEN_PAGES_DIR.name})")
+    arg_parser.add_argument("--update-expected", action="store_true",
+                            help="записать ожидаемые данные страниц --pages-dir по результату bs4")
+    args = arg_parser.parse_args()
+
+    pages_dir = args.pages_dir or (GOLDEN_PAGES_DIR if args.golden or args.update_expected else None)
+    pages = saved_pages(pages_dir) if pages_dir else [(url, html, None) for url, html in synthetic_pages(args.lots)]
+    print(f"🧪 Страниц для сверки: {len(pages)}")
+    print("="*60)
+
+    workdir = tempfile.mkdtemp(prefix="tennants_extract_")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            parser = FullAuctionParser("Benchmark", "2025")
+
+        def extract_bs4(url, html):
+            return parser.extract_lot_data_bs4(url, html)
+
+        def extract_lxml(url, html):
+            return extract_lot_data_lxml(parser, url, html)
+
+        # Эталонная сверка: словари должны совпадать полностью, кроме времени;
+        # с ожидаемыми данными страницы с ними сверяются оба движка
+        mismatches = 0
+        for url, html, expected_file in pages:
+            results = {}
+            for name, extract in (("bs4", extract_bs4), ("lxml", extract_lxml)):
+                results[name] = extract(url, html)
+                results[name].pop('timestamp')
+
+            if args.update_expected:
+                expected_file.write_text(json.dumps(results['bs4'], ensure_ascii=False, indent=2) + "\n", encoding='utf-8')
+            label = expected_file.stem if expected_file else url
+            if expected_file and expected_file.exists():
+                expected = json.loads(expected_file.read_text(encoding='utf-8'))
+                checks = [(name, differing_fields(expected, actual)) for name, actual in results.items()]
+            else:
+                checks = [("lxml", differing_fields(results['bs4'], results['lxml']))]
+            failed = [(name, differing) for name, differing in checks if differing]
+            if failed:
+                mismatches += 1
+                for name, differing in failed:
+                    print(f"❌ {label} ({name}): отличаются поля {', '.join(differing)}")
+
+        if args.update_expected:
+            print(f"💾 Ожидаемые данные записаны: {len(pages)} страниц в {pages_dir}")
+        if mismatches:
+            print(f"❌ Расхождений: {mismatches}/{len(pages)}")
+        else:
+            print(f"✅ Результаты совпадают на всех {len(pages)} страницах")
+        if args.golden or args.update_expected:
+            return mismatches == 0
+
+        pages = [(url, html) for url, html, _ in pages]
+        results = {}
+        for name, extract in (("bs4", extract_bs4), ("lxml", extract_lxml)):
+            timings = time_extractor(extract, pages, args.repeat)
+            results[name] = statistics.mean(timings)
+            print(f"⏱️ {name:<5} | среднее {statistics.mean(timings):>6.2f} мс/стр | "
+                  f"медиана {statistics.median(timings):>6.2f} мс/стр | {1000 / statistics.mean(timings):>7.1f} стр/с")
+
+        print(f"\n⚡ Ускорение lxml относительно bs4: {results['bs4'] / results['lxml']:.2f}x")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return mismatches == 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Замер памяти парсера на большом синтетическом аукционе: список лотов против потока (low_memory)
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from fake_tennants_site import FakeTennantsSite
+
+# Доли пройденных лотов, на которых снимается RSS
+CHECKPOINTS = (0.1, 0.5, 1.0)
+
+
+def current_rss_mb():
+    """Текущий RSS процесса (Linux - /proc/self/statm, иначе пиковый ru_maxrss)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_worker(auction_url, lots, concurrency, low_memory, images):
+    """Один iter_lots в этом процессе: RSS по ходу обхода и пиковый"""
+    from parse_full_auction import FullAuctionParser
+    from lot_sinks import ImageSink, StorageSink
+    from run_log import RunLog
+
+    workdir = tempfile.mkdtemp(prefix="tennants_memory_")
+    try:
+        rss = {'start': current_rss_mb()}
+        checkpoints = {max(1, round(lots * share)): share for share in CHECKPOINTS}
+        seen = parsed = 0
+        with contextlib.redirect_stdout(io.StringIO()):
+            parser = FullAuctionParser("Benchmark", "2025", working_dir=Path(workdir) / "run",
+                                       log=RunLog(level="error"), metrics=False)
+            sinks = [ImageSink(downstream=[StorageSink()])] if images else [StorageSink()]
+            started_at = time.perf_counter()
+            for result in parser.iter_lots(auction_url, concurrency=concurrency, low_memory=low_memory, sinks=sinks):
+                seen += 1
+                parsed += result.status == "parsed"
+                if seen in checkpoints:
+                    rss[f"{round(checkpoints[seen] * 100)}%"] = current_rss_mb()
+            seconds = time.perf_counter() - started_at
+        return {
+            'lots': parsed,
+            'seconds': seconds,
+            'rss_mb': rss,
+            # ru_maxrss в Linux - в КБ
+            'peak_rss_mb': max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, *rss.values()),
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run_case(lots, concurrency, low_memory, images, latency, timeout=3600):
+    """Имитатор в этом процессе, парсер - в отдельном (его память не смешивается с сервером)"""
+    with FakeTennantsSite(lot_count=lots, latency=latency, image_size=2000) as site:
+        command = [sys.executable, os.path.abspath(__file__), "--worker", site.auction_url(),
+                   "--lots", str(lots), "--concurrency", str(concurrency)]
+        if low_memory:
+            command.append("--worker-low-memory")
+        if images:
+            command.append("--images")
+        completed = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+        if completed.returncode:
+            raise RuntimeError(f"{lots} лотов, low_memory={low_memory}: {completed.stderr.strip()[-500:]}")
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        result.update(size=lots, concurrency=concurrency, low_memory=low_memory)
+        return result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--sizes", default="1000,10000", help="размеры аукционов через запятую")
+    arg_parser.add_argument("--concurrency", default="8,32", help="окна загрузки через запятую")
+    arg_parser.add_argument("--mode", action="append", choices=["list", "low-memory"],
+                            help="режим (можно несколько; по умолчанию оба)")
+    arg_parser.add_argument("--images", action="store_true", help="скачивать изображения (ImageSink)")
+    arg_parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа имитатора, с")
+    arg_parser.add_argument("--tolerance", type=float, default=0.25,
+                            help="допустимый рост пикового RSS от меньшего аукциона к большему, доля")
+    arg_parser.add_argument("--output", help="результаты в JSON")
+    arg_parser.add_argument("--worker", help=argparse.SUPPRESS)
+    arg_parser.add_argument("--worker-low-memory", action="store_true", help=argparse.SUPPRESS)
+    arg_parser.add_argument("--lots", type=int, help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.lots, int(args.concurrency), args.worker_low_memory, args.images)))
+        return 0
+
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+    windows = [int(concurrency) for concurrency in args.concurrency.split(",")]
+    modes = args.mode or ["list", "low-memory"]
+
+    print(f"🧪 ЗАМЕР ПАМЯТИ: аукционы {sizes} лотов, окна {windows}, изображения {'да' if args.images else 'нет'}")
+    print("="*60)
+
+    results = []
+    for concurrency in windows:
+        for mode in modes:
+            for size in sizes:
+                result = run_case(size, concurrency, mode == "low-memory", args.images, args.latency)
+                results.append(result)
+                status = "✅" if result['lots'] == size else "⚠️"
+                progress = ", ".join(f"{point} {value:.0f}" for point, value in result['rss_mb'].items())
+                print(f"{status} {mode:<10} окно {concurrency:>3} | лотов {result['lots']:>6} | {result['seconds']:>7.1f}с | "
+                      f"RSS МБ: {progress} | пик {result['peak_rss_mb']:.0f}")
+
+    # Память не должна расти с размером аукциона: пик большего против пика меньшего
+    flat = True
+    if len(sizes) > 1:
+        print(f"\n📏 Рост пикового RSS {sizes[0]} -> {sizes[-1]} лотов (допуск {args.tolerance * 100:.0f}%):")
+        for concurrency in windows:
+            for mode in modes:
+                peaks = {result['size']: result['peak_rss_mb'] for result in results
+                         if result['concurrency'] == concurrency and result['low_memory'] == (mode == "low-memory")}
+                growth = (peaks[sizes[-1]] - peaks[sizes[0]]) / peaks[sizes[0]]
+                ok = growth <= args.tolerance
+                if mode == "low-memory":
+                    flat = flat and ok
+                print(f"   {'✅' if ok else '📈'} {mode:<10} окно {concurrency:>3}: "
+                      f"{peaks[sizes[0]]:.0f} -> {peaks[sizes[-1]]:.0f} МБ ({growth * 100:+.0f}%)")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"💾 Результаты записаны: {args.output}")
+
+    return 0 if flat else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
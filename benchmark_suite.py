@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Воспроизводимый набор замеров FullAuctionParser на локальном имитаторе сайта с помехами
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from fake_tennants_site import FakeTennantsSite
+
+# Помехи имитатора по сценариям (параметры FakeTennantsSite)
+SCENARIOS = {
+    'clean': {'latency': 0.02},
+    'slow': {'latency': 0.05, 'latency_jitter': 0.2},
+    'flaky': {'latency': 0.02, 'error_rate': 0.05},
+    'throttled': {'latency': 0.02, 'throttle_rate': 0.05},
+}
+
+RESULTS_FILE = "benchmark_results.jsonl"
+
+# Метрика -> True, если больше - лучше (для поиска регрессий)
+COMPARED = {'lots_per_sec': True, 'bytes_per_sec': True, 'cpu_ms_per_lot': False, 'peak_rss_mb': False}
+
+
+def run_worker(auction_url, engine, concurrency, requests_per_second):
+    """Один parse_auction в этом процессе: время, CPU и пиковая память только парсера"""
+    from parse_full_auction import FullAuctionParser
+
+    workdir = tempfile.mkdtemp(prefix="tennants_bench_")
+    try:
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        with contextlib.redirect_stdout(io.StringIO()):
+            parser = FullAuctionParser("Benchmark", "2025", working_dir=Path(workdir) / "run")
+            usage_before = resource.getrusage(resource.RUSAGE_SELF)
+            started_at = time.perf_counter()
+            parser.parse_auction(auction_url, concurrency=concurrency, engine=engine,
+                                 requests_per_second=requests_per_second)
+            seconds = time.perf_counter() - started_at
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+
+        stages = parser.metrics.snapshot()['timings'] if parser.metrics else {}
+        return {
+            'seconds': seconds,
+            'lots': parser.run_stats['parsed'],
+            'errors': parser.run_stats['error'],
+            'cpu_seconds': (usage.ru_utime - usage_before.ru_utime) + (usage.ru_stime - usage_before.ru_stime),
+            # ru_maxrss в Linux - в КБ
+            'rss_before_mb': rss_before / 1024,
+            'peak_rss_mb': usage.ru_maxrss / 1024,
+            'stages': {stage: {'p50': timing['p50'], 'p95': timing['p95']} for stage, timing in stages.items()
+                       if stage in ('lot_parse', 'page_fetch', 'extract_lot', 'image_fetch', 'lot_save')},
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run_scenario(name, lots, engine, concurrency, requests_per_second, seed, timeout=600):
+    """Имитатор в этом процессе, парсер - в отдельном (его CPU и память не смешиваются с сервером)"""
+    with FakeTennantsSite(lot_count=lots, fault_seed=seed, **SCENARIOS[name]) as site:
+        command = [sys.executable, os.path.abspath(__file__), "--worker", site.auction_url(),
+                   "--engine", engine, "--concurrency", str(concurrency)]
+        if requests_per_second:
+            command += ["--requests-per-second", str(requests_per_second)]
+        completed = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+        if completed.returncode:
+            raise RuntimeError(f"сценарий {name}/{engine}: {completed.stderr.strip()[-500:]}")
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+
+        seconds = result['seconds']
+        result.update(
+            scenario=name, engine=engine,
+            requests=site.requests_served, bytes=site.bytes_served,
+            server_429=site.throttled_served, server_500=site.errors_served,
+            lots_per_sec=result['lots'] / seconds if seconds else 0,
+            bytes_per_sec=site.bytes_served / seconds if seconds else 0,
+            cpu_ms_per_lot=result['cpu_seconds'] * 1000 / result['lots'] if result['lots'] else None,
+        )
+        return result
+
+
+def code_version():
+    """Версия кода для истории замеров: git describe или 'unknown'"""
+    try:
+        completed = subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+                                   cwd=os.path.dirname(os.path.abspath(__file__)), timeout=30)
+        return completed.stdout.strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+def load_previous(results_file, params):
+    """Последний записанный прогон с теми же параметрами"""
+    previous = None
+    if not os.path.exists(results_file):
+        return None
+    with open(results_file, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get('params') == params:
+                previous = record
+    return previous
+
+
+def find_regressions(results, previous, threshold):
+    """Ухудшения больше threshold (доля) относительно прошлого прогона"""
+    if not previous:
+        return []
+    previous_results = {(result['scenario'], result['engine']): result for result in previous['results']}
+    regressions = []
+    for result in results:
+        before = previous_results.get((result['scenario'], result['engine']))
+        if not before:
+            continue
+        for metric, higher_is_better in COMPARED.items():
+            old, new = before.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > threshold:
+                regressions.append(f"{result['scenario']}/{result['engine']} {metric}: "
+                                   f"{old:.4g} -> {new:.4g} ({change * 100:+.0f}%)")
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                            help="сценарий (можно несколько; по умолчанию все)")
+    arg_parser.add_argument("--engine", action="append", choices=["threads", "async"],
+                            help="движок (можно несколько; по умолчанию оба)")
+    arg_parser.add_argument("--lots", type=int, default=200)
+    arg_parser.add_argument("--concurrency", type=int, default=8)
+    arg_parser.add_argument("--requests-per-second", help='"auto" или число запросов в секунду')
+    arg_parser.add_argument("--seed", type=int, default=0, help="выбор задержек и сбоев имитатора")
+    arg_parser.add_argument("--results", default=RESULTS_FILE, help="история замеров (JSON Lines)")
+    arg_parser.add_argument("--threshold", type=float, default=0.1, help="допустимое ухудшение, доля")
+    arg_parser.add_argument("--fail-on-regression", action="store_true", help="код возврата 1 при регрессии")
+    arg_parser.add_argument("--no-record", action="store_true", help="не дописывать результаты в историю")
+    arg_parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    requests_per_second = args.requests_per_second
+    if requests_per_second and requests_per_second != "auto":
+        requests_per_second = float(requests_per_second)
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, (args.engine or ["threads"])[0], args.concurrency, requests_per_second)))
+        return 0
+
+    scenarios = args.scenario or list(SCENARIOS)
+    engines = args.engine or ["threads", "async"]
+    params = {'lots': args.lots, 'concurrency': args.concurrency, 'requests_per_second': requests_per_second,
+              'seed': args.seed, 'scenarios': {name: SCENARIOS[name] for name in scenarios}}
+
+    print(f"🧪 НАБОР ЗАМЕРОВ: {args.lots} лотов, параллельно {args.concurrency}, "
+          f"лимит {requests_per_second or 'нет'}, seed {args.seed}")
+    print("="*60)
+
+    results = []
+    for name in scenarios:
+        for engine in engines:
+            result = run_scenario(name, args.lots, engine, args.concurrency, requests_per_second, args.seed)
+            results.append(result)
+            status = "✅" if result['lots'] == args.lots else "⚠️"
+            cpu = f"{result['cpu_ms_per_lot']:.1f}" if result['cpu_ms_per_lot'] is not None else "-"
+            print(f"{status} {name:<10} {engine:<8} | лотов {result['lots']:>5} | {result['seconds']:>6.2f}с | "
+                  f"{result['lots_per_sec']:>6.1f} лот/с | {result['bytes_per_sec'] / 1024 / 1024:>5.2f} МБ/с | "
+                  f"CPU {cpu} мс/лот | RSS {result['peak_rss_mb']:.0f} МБ | "
+                  f"429: {result['server_429']}, 500: {result['server_500']}")
+
+    previous = load_previous(args.results, params)
+    regressions = find_regressions(results, previous, args.threshold)
+    if previous:
+        print(f"\n📏 Сравнение с {previous['version']} ({previous['recorded_at']}):")
+        for regression in regressions:
+            print(f"   📉 {regression}")
+        if not regressions:
+            print(f"   ✅ Ухудшений больше {args.threshold * 100:.0f}% нет")
+
+    if not args.no_record:
+        record = {
+            'recorded_at': datetime.now().isoformat(timespec='seconds'),
+            'version': code_version(),
+            'python': platform.python_version(),
+            'machine': f"{platform.system()} {platform.machine()}, CPU: {os.cpu_count()}",
+            'params': params,
+            'results': results,
+        }
+        with open(args.results, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        print(f"💾 Результаты записаны: {args.results}")
+
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Обход всех найденных аукционов Tennants без участия пользователя под общим бюджетом запросов
+"""
+
+import argparse
+import contextlib
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from find_upcoming_auctions import AUCTION_INDEX_FILE, TennantsAuctionFinder
+from html_archive import HTMLArchive
+from http_cache import HTTPCache
+from image_store import ImageStore
+from lot_sinks import ConsoleSink, ImageSink, StorageSink
+from metrics import Metrics
+from parse_full_auction import FullAuctionParser, fetch_auction_info
+from rate_limit import AdaptiveRateLimiter, CircuitBreaker, RateLimiter
+from run_log import LEVELS, RunLog
+
+
+def soonest_first(auction):
+    """Ближайшие торги первыми, аукционы без даты - в конце"""
+    return (0, auction['sale_date']) if auction.get('sale_date') else (1, "")
+
+
+def catalog_order(auction):
+    return 0
+
+
+PRIORITIES = {'soonest': soonest_first, 'catalog': catalog_order}
+
+
+class CrawlOrchestrator:
+    """Параллельный обход нескольких аукционов с одним бюджетом запросов и соединений
+
+    Аукционы запускаются по приоритету (priority - 'soonest', 'catalog' или
+    функция-ключ сортировки), одновременно - не больше max_auctions.
+    engine="async" - все парсеры работают через один AsyncAuctionEngine
+    (общий пул соединений, лимит и предохранитель); engine="threads" - у
+    каждого аукциона свои concurrency потоков, но лимитер и предохранитель
+    общие. Папки результатов: <output_dir>/<run_name>/<аукцион>; повторный
+    запуск с тем же run_name продолжает прерванный обход. Метрики всех
+    парсеров и движка общие: metrics.json в папке обхода, metrics_port -
+    текущие значения для Prometheus во время обхода.
+    """
+
+    def __init__(self, output_dir="tennants_crawls", run_name=None, max_auctions=3, concurrency=8,
+                 requests_per_second="auto", engine="async", priority="soonest", max_lots=None,
+                 incremental_state_dir=None, parser_options=None, metrics_port=None, low_memory=False):
+        self.run_dir = Path(output_dir) / (run_name or datetime.now().strftime("%Y-%m-%d"))
+        self.max_auctions = max_auctions
+        self.concurrency = concurrency
+        self.requests_per_second = requests_per_second
+        self.engine = engine
+        self.priority = PRIORITIES[priority] if isinstance(priority, str) else priority
+        self.max_lots = max_lots
+        self.incremental_state_dir = incremental_state_dir
+        self.low_memory = low_memory
+
+        # Кэш, архив и хранилище изображений - по одному объекту на все парсеры
+        self.parser_options = dict(parser_options or {})
+        for option, factory in (('http_cache', HTTPCache), ('html_archive', HTMLArchive), ('image_store', ImageStore)):
+            if isinstance(self.parser_options.get(option), (str, Path)):
+                self.parser_options[option] = factory(self.parser_options[option])
+
+        self.parser_options.setdefault('metrics', Metrics())
+        self.metrics = self.parser_options['metrics']
+        # Журнал обхода - общий с парсерами (без него - только предупреждения и итоги)
+        self.log = self.parser_options['log'] = self.parser_options.get('log') or RunLog(level="warning")
+        self.metrics_port = metrics_port
+
+        self.rate_limiter = None
+        self.circuit_breaker = None
+        self.async_engine = None
+        self.engine_lock = threading.Lock()
+
+    def find_auctions(self, finder=None):
+        """Аукционы TennantsAuctionFinder с датой торгов sale_date ("YYYY-MM-DD" или "")"""
+        auctions = (finder or TennantsAuctionFinder()).find_upcoming_auctions()
+        return [dict(auction, sale_date=auction['date']) for auction in auctions]
+
+    def prioritize(self, auctions):
+        return sorted(auctions, key=self.priority)
+
+    def crawl(self, auctions=None):
+        """Обход аукционов (по умолчанию - найденных find_auctions); итоги по аукционам"""
+        if auctions is None:
+            auctions = self.find_auctions()
+        if not auctions:
+            self.log.error('no_auctions', "❌ Нет аукционов для обхода")
+            return []
+        auctions = self.prioritize(auctions)
+        self.run_dir.mkdir(parents=True, exist_ok=True)
+
+        # Лимитер и предохранитель общие для сессий всех парсеров и асинхронного движка:
+        # страницы аукционов и списки лотов идут в тот же бюджет, что и лоты
+        if self.requests_per_second == "auto":
+            self.rate_limiter = AdaptiveRateLimiter()
+            self.circuit_breaker = CircuitBreaker(log=self.log)
+        elif self.requests_per_second:
+            self.rate_limiter = RateLimiter(self.requests_per_second)
+
+        lines = [f"🗓️ ОБХОД {len(auctions)} АУКЦИОНОВ: одновременно {self.max_auctions}, "
+                 f"движок {self.engine}, лимит запросов {self.requests_per_second or 'нет'}", "="*60]
+        for i, auction in enumerate(auctions, 1):
+            lines.append(f"{i}. [{auction.get('sale_date') or 'без даты'}] {auction['title']} ({auction['url']})")
+        self.log.report('crawl_start', "\n".join(lines), engine=self.engine, max_auctions=self.max_auctions,
+                        auctions=[auction['url'] for auction in auctions])
+
+        if self.metrics and self.metrics_port:
+            self.metrics.serve(self.metrics_port, log=self.log)
+        started_at = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_auctions, thread_name_prefix="auction") as executor:
+                # Пул берет задачи по порядку отправки - порядок запуска соответствует приоритету
+                summaries = list(executor.map(self.crawl_auction, auctions))
+        finally:
+            if self.async_engine:
+                self.async_engine.close()
+            if self.metrics:
+                self.metrics.stop_serving()
+
+        self.write_summary(summaries, time.perf_counter() - started_at)
+        return summaries
+
+    def shared_engine(self, parser):
+        """Один асинхронный движок на весь обход (создается с заголовками первого парсера)"""
+        with self.engine_lock:
+            if self.async_engine is None:
+                from async_engine import AsyncAuctionEngine
+                self.async_engine = AsyncAuctionEngine(requests_per_second=self.rate_limiter,
+                                                       headers=dict(parser.session.headers), metrics=self.metrics,
+                                                       log=self.log, circuit_breaker=self.circuit_breaker)
+            return self.async_engine
+
+    def auction_dir(self, auction):
+        """Папка аукциона в каталоге обхода: существующая с тем же id (продолжение) или по названию и дате"""
+        existing = sorted(path for path in self.run_dir.glob(f"*_{auction['id']}") if path.is_dir())
+        if existing:
+            return existing[0]
+        name = FullAuctionParser.clean_filename(f"{auction['title']}_{auction.get('sale_date', '')}")
+        return self.run_dir / f"{name}_{auction['id']}"
+
+    def crawl_auction(self, auction):
+        """Полный обход одного аукциона; ошибка не останавливает остальные"""
+        summary = {
+            'id': auction['id'], 'title': auction['title'], 'sale_date': auction.get('sale_date', ''),
+            'url': auction['url'], 'status': 'failed', 'failure': '',
+        }
+        started_at = time.perf_counter()
+        try:
+            parser = FullAuctionParser(auction_title=auction['title'], auction_date=auction.get('sale_date', ''),
+                                       working_dir=self.auction_dir(auction), verbose=False, **self.parser_options)
+            if self.rate_limiter:
+                parser.http_adapter.set_throttling(self.rate_limiter, self.circuit_breaker)
+            title, sale_date = fetch_auction_info(auction['url'], session=parser.session)
+            title = title or auction['title']
+            sale_date = sale_date or auction.get('sale_date', '')
+
+            engine = self.shared_engine(parser) if self.engine == "async" else self.engine
+            results = parser.iter_lots(auction['url'], max_lots=self.max_lots, concurrency=self.concurrency,
+                                       requests_per_second=self.rate_limiter, engine=engine,
+                                       incremental_state_dir=self.incremental_state_dir,
+                                       sinks=[ImageSink(downstream=[StorageSink()]), ConsoleSink()],
+                                       circuit_breaker=self.circuit_breaker, low_memory=self.low_memory)
+            for _ in results:
+                pass
+
+            stats = parser.run_stats
+            summary.update({key: stats.get(key, 0) for key in
+                            ('discovered', 'queued', 'parsed', 'unchanged', 'error', 'new', 'changed', 'withdrawn')})
+            summary.update(title=title, sale_date=sale_date, working_dir=str(parser.working_dir),
+                           output=str(parser.db_file or ''))
+            if not stats.get('discovered'):
+                summary.update(status='failed', failure='лоты не найдены')
+            else:
+                summary['status'] = 'ok' if not stats['error'] else 'partial'
+        except Exception as e:
+            summary['failure'] = str(e)
+
+        summary['seconds'] = round(time.perf_counter() - started_at, 1)
+        icon = {'ok': '✅', 'partial': '⚠️'}.get(summary['status'], '❌')
+        self.log.report('auction_finish', "%s %s: лотов %d/%d, ошибок %d, %sс %s", icon, summary['title'],
+                        summary.get('parsed', 0), summary.get('queued', 0), summary.get('error', 0),
+                        summary['seconds'], summary['failure'], **summary)
+        return summary
+
+    def write_summary(self, summaries, seconds):
+        """Итоги по аукционам в консоль и в crawl_summary.json папки обхода"""
+        lines = [f"\n🗓️ ИТОГИ ОБХОДА ({seconds:.1f}с)", "="*60]
+        for summary in summaries:
+            lines.append(f"{summary['status']:>8}  [{summary['sale_date'] or 'без даты'}] {summary['title']}: "
+                         f"найдено {summary.get('discovered', 0)}, сохранено {summary.get('parsed', 0)}, "
+                         f"без изменений {summary.get('unchanged', 0)}, ошибок {summary.get('error', 0)} "
+                         f"({summary['seconds']}с) {summary['failure']}")
+
+        throttle = None
+        if isinstance(self.rate_limiter, AdaptiveRateLimiter):
+            throttle = dict(self.rate_limiter.stats, final_rate=self.rate_limiter.rate)
+        if throttle:
+            lines.append(f"🚦 Адаптивный лимит: итог {throttle['final_rate']:.1f} запр/с (пик {throttle['peak_rate']:.1f}), "
+                         f"429/503: {throttle['throttled']}")
+        self.log.report('crawl_summary', "\n".join(lines), seconds=round(seconds, 1), throttle=throttle)
+
+        if self.metrics:
+            self.metrics.print_summary(log=self.log)
+            self.metrics.write_json(self.run_dir / "metrics.json")
+
+        summary_file = self.run_dir / "crawl_summary.json"
+        with open(summary_file, 'w', encoding='utf-8') as f:
+            json.dump({'finished_at': datetime.now().isoformat(), 'seconds': round(seconds, 1),
+                       'throttle': throttle, 'auctions': summaries}, f, ensure_ascii=False, indent=2)
+        self.log.report('crawl_summary_saved', "📄 Итоги: %s", summary_file, path=summary_file)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--output-dir", default="tennants_crawls")
+    arg_parser.add_argument("--run-name", help="папка обхода (по умолчанию - сегодняшняя дата)")
+    arg_parser.add_argument("--max-auctions", type=int, default=3, help="аукционов одновременно")
+    arg_parser.add_argument("--concurrency", type=int, default=8, help="лотов одновременно в аукционе")
+    arg_parser.add_argument("--requests-per-second", default="auto", help='"auto" или число запросов в секунду')
+    arg_parser.add_argument("--engine", choices=["async", "threads"], default="async")
+    arg_parser.add_argument("--priority", choices=sorted(PRIORITIES), default="soonest")
+    arg_parser.add_argument("--max-lots", type=int, help="лотов на аукцион (для проверки)")
+    arg_parser.add_argument("--incremental-state-dir")
+    arg_parser.add_argument("--output-format", choices=sorted(FullAuctionParser.OUTPUT_EXTENSIONS), default="csv")
+    arg_parser.add_argument("--http-cache")
+    arg_parser.add_argument("--image-store")
+    arg_parser.add_argument("--list-url", action="append", help="страница со списком аукционов (можно несколько)")
+    arg_parser.add_argument("--auction-index", default=AUCTION_INDEX_FILE, help="кэш индекса аукционов")
+    arg_parser.add_argument("--auction-index-ttl", type=float, default=3600, help="срок кэша индекса, с")
+    arg_parser.add_argument("--metrics-port", type=int, help="порт метрик Prometheus (/metrics) на время обхода")
+    arg_parser.add_argument("--log-level", choices=sorted(LEVELS, key=LEVELS.get), default="warning",
+                            help="info - краткая запись на лот, debug - полная диагностика")
+    arg_parser.add_argument("--log-json", help='журнал в JSON Lines (путь или "-" - stdout)')
+    arg_parser.add_argument("--detail-sample", type=float, default=0.0, help="доля лотов с полной диагностикой полей")
+    arg_parser.add_argument("--quiet", action="store_true", help="в консоль только предупреждения и ошибки")
+    arg_parser.add_argument("--low-memory", action="store_true", help="лоты каталога потоком, без списка в памяти")
+    args = arg_parser.parse_args()
+
+    requests_per_second = args.requests_per_second
+    if requests_per_second != "auto":
+        requests_per_second = float(requests_per_second) or None
+
+    run_log = RunLog(level=args.log_level, quiet=args.quiet, json_file=args.log_json, detail_sample=args.detail_sample)
+    parser_options = {'output_format': args.output_format, 'log': run_log}
+    if args.http_cache:
+        parser_options['http_cache'] = args.http_cache
+    if args.image_store:
+        parser_options['image_store'] = args.image_store
+
+    orchestrator = CrawlOrchestrator(output_dir=args.output_dir, run_name=args.run_name, max_auctions=args.max_auctions,
+                                     concurrency=args.concurrency, requests_per_second=requests_per_second,
+                                     engine=args.engine, priority=args.priority, max_lots=args.max_lots,
+                                     incremental_state_dir=args.incremental_state_dir, parser_options=parser_options,
+                                     metrics_port=args.metrics_port, low_memory=args.low_memory)
+    # JSON Lines в stdout: остальной текст (поиск аукционов, архив HTML) - в stderr
+    console = contextlib.redirect_stdout(sys.stderr) if args.log_json == "-" else contextlib.nullcontext()
+    try:
+        with console:
+            finder = TennantsAuctionFinder(args.list_url, cache_file=args.auction_index, cache_ttl=args.auction_index_ttl)
+            summaries = orchestrator.crawl(orchestrator.find_auctions(finder))
+    finally:
+        run_log.close()
+
+    # Код возврата для планировщика: 1 - хотя бы один аукцион не обойден
+    return 0 if summaries and all(summary['status'] != 'failed' for summary in summaries) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
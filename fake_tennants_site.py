@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Локальный имитатор сайта Tennants для проверки и замеров парсера без сети
+"""
+
+import hashlib
+import io
+import random
+import re
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+DESCRIPTIONS = [
+    "A Wedgwood Jasper Copy of the Portland Vase, 20th century, dark blue, impressed marks, 20.5cm high",
+    "A George III Mahogany Bureau, circa 1780, with brass handles, 102cm wide",
+    "A Pair of Chinese Porcelain Vases, 19th century, painted with figures, 35cm high",
+    "A French Gilt Bronze Mantel Clock by Japy Freres, Paris, 1880, 42 x 28 x 15 cm",
+    "An Oak Refectory Table, English, 17th c. and later, 240cm long",
+    "A Silver Tea Service, Sheffield 1912, comprising teapot, sugar bowl and milk jug",
+    "After John Constable, Landscape with Cottage, oil on canvas, signed Smith, 60 x 80 cm",
+    "A Victorian Walnut and Marquetry Card Table, circa 1860, 90cm wide",
+]
+
+
+def lot_number_for(auction_id, lot_id):
+    """Номер лота по системному ID (лоты нумеруются подряд)"""
+    return lot_id - auction_id * 1000
+
+
+def render_lot_page(base_url, auction_id, lot_id, auction_title="Antiques & Interiors, to include Designer Fashion",
+                    revision=0):
+    """HTML страницы лота в тех же DOM-формах, что и на сайте
+
+    revision > 0 имитирует пересмотр оценки каталогом
+    """
+    lot_number = lot_number_for(auction_id, lot_id)
+    description = DESCRIPTIONS[lot_number % len(DESCRIPTIONS)]
+    stock_id = 3000000 + lot_id % 1000000
+    low = 50 * (1 + lot_number % 20) + 10 * revision
+    condition_images = "".join(
+        f'<img src="{base_url}/stock/{stock_id}-{i}-small.jpg?v=6388816705{i}">'
+        for i in range(1, 1 + lot_number % 4)
+    )
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+<title>Lot {lot_number} - {description[:40]} | Tennants Auctioneers</title>
+<meta name="description" content="Lot {lot_number} - {description}">
+<script>var dataLayer = [{{"year": "2019"}}];</script>
+</head>
+<body>
+<ol class="breadcrumb"><li><a href="/">Home</a></li>
+<li><a href="/auction/details/?au={auction_id}">{auction_title}</a></li></ol>
+<h4 class="auction-title"><a href="/auction/search?au={auction_id}">{auction_title}</a></h4>
+<p class="date-title">18th Jul, 2025</p>
+<h1 class="lot-title cat-{400 + lot_number % 80}"><span class="lot-number">Lot {lot_number}</span></h1>
+<div class="lot-image-wrap">
+<img id="lot-image" src="{base_url}/stock/{stock_id}-0-medium.jpg?v=63887473351200" alt="">
+</div>
+<div class="lot-desc"><p>{description}</p><p></p></div>
+<div class="estimate">Estimate &#163;{low} - &#163;{low + 50}</div>
+<div class="buyers-premium">Buyer's premium 22.00% (26.40% inc. VAT)</div>
+<div class="tab-content">
+<div id="condition">
+<p>{"Some wear commensurate with age, minor scratches to the surface" if lot_number % 3 else ""}</p>
+<p>We are happy to provide Condition Reports to Prospective Buyers.</p>
+{condition_images}
+</div>
+<div id="auctiondetails"><a href="/auction/search?au={auction_id}">{auction_title}</a></div>
+</div>
+<select><option>All categories</option><option>Ceramics &amp; Glass</option></select>
+<input type="hidden" id="AppendText" value="Lot {lot_number} ({auction_title}, 2025)">
+</body>
+</html>
+"""
+
+
+def render_auction_page(base_url, auction_id, lot_count, page_size=96, page_number=1, withdrawn=(),
+                        auction_title="Antiques &amp; Interiors", date_text="18th Jul, 2025"):
+    """HTML страницы результатов аукциона со ссылками на лоты (без снятых лотов)"""
+    first = (page_number - 1) * page_size + 1
+    last = min(lot_count, page_number * page_size)
+    page_count = max(1, -(-lot_count // page_size))
+    links = []
+    for lot_number in range(first, last + 1):
+        if lot_number in withdrawn:
+            continue
+        lot_id = auction_id * 1000 + lot_number
+        href = (f"{base_url}/auction/lot/lot-{lot_number}---fake-lot/?lot={lot_id}&so=0&st=&sto=0"
+                f"&au={auction_id}&ef=&et=&ic=False&sd=0&pp={page_size}&pn={page_number}&g=1")
+        links.append(f'<div class="lot"><a href="{href}">Lot {lot_number}</a>'
+                     f'<a href="{href}"><img src="x.jpg"></a></div>')
+    # Пагинация показывает только окно соседних страниц, как на сайте
+    pagination = "".join(
+        f'<li><a href="{base_url}/auction/details/fake-auction/?au={auction_id}&pp={page_size}&pn={n}">{n}</a></li>'
+        for n in range(max(1, page_number - 2), min(page_count, page_number + 2) + 1)
+    )
+    return f"""<!DOCTYPE html>
+<html><head><title>{auction_title} - Tennants Auctioneers</title></head>
+<body>
+<p class="date-title">{date_text}</p>
+<p class="results-count">Showing {first} - {last} of {lot_count} lots</p>
+{''.join(links)}
+<ul class="pagination">{pagination}</ul>
+</body></html>
+"""
+
+
+def render_auction_list(base_url, auctions):
+    """Главная страница: ссылки на аукционы {id: (название, дата)}"""
+    items = "".join(
+        f'<div class="auction"><a href="/auction/details/fake-auction-{auction_id}/?au={auction_id}">{title}</a>'
+        f'<p>{date_text}</p></div>'
+        for auction_id, (title, date_text) in auctions.items()
+    )
+    return f"""<!DOCTYPE html>
+<html><head><title>Tennants Auctioneers</title></head>
+<body>{items}</body></html>
+"""
+
+
+# Доля размера полного изображения для -small / -medium
+IMAGE_TIER_SCALE = {"small": 0.125, "medium": 0.35, "full": 1.0}
+
+
+def render_image(lot_id, size=20000):
+    """Псевдо-JPEG фиксированного размера"""
+    rnd = random.Random(lot_id)
+    return b"\xff\xd8\xff\xe0" + rnd.randbytes(max(0, size - 6)) + b"\xff\xd9"
+
+
+def render_real_image(lot_id, width=1200, height=900):
+    """Настоящий JPEG (нужен Pillow) - для проверки обработки изображений"""
+    from PIL import Image, ImageDraw
+
+    rnd = random.Random(lot_id)
+    image = Image.new("RGB", (width, height), tuple(rnd.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(image)
+    for _ in range(12):
+        x, y = rnd.randrange(width), rnd.randrange(height)
+        draw.ellipse((x, y, x + rnd.randrange(50, 400), y + rnd.randrange(50, 400)),
+                     fill=tuple(rnd.randrange(256) for _ in range(3)))
+    output = io.BytesIO()
+    image.save(output, "JPEG", quality=90)
+    return output.getvalue()
+
+
+class FakeTennantsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        site = self.server.site
+        site.count_request()
+
+        # Сбой сайта и защита от частых запросов (429 с Retry-After)
+        if site.outage:
+            self.respond(500, b"internal error", "text/plain")
+            return
+        if not site.admit():
+            self.respond(429, b"too many requests", "text/plain", {"Retry-After": "1"})
+            return
+
+        latency = site.latency_for(self.path)
+        if latency:
+            time.sleep(latency)
+
+        # Сбои, заданные долей URL (error_rate / throttle_rate)
+        fault = site.fault_for(self.path)
+        if fault == 429:
+            self.respond(429, b"too many requests", "text/plain", {"Retry-After": str(site.retry_after)})
+            return
+        if fault:
+            self.respond(fault, b"internal error", "text/plain")
+            return
+
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+
+        if parsed.path.startswith("/auction/lot/"):
+            auction_id = int(query.get("au", ["0"])[0])
+            lot_id = int(query.get("lot", ["0"])[0])
+            revision = site.revisions.get(lot_number_for(auction_id, lot_id), 0)
+            body = render_lot_page(site.base_url, auction_id, lot_id, revision=revision).encode("utf-8")
+            self.respond(200, body, "text/html; charset=utf-8")
+        elif parsed.path.startswith("/auction/details/"):
+            auction_id = int(query.get("au", ["0"])[0])
+            page_size = min(int(query.get("pp", ["96"])[0]), site.max_page_size)
+            page_number = int(query.get("pn", ["1"])[0])
+            auction_title, date_text = site.auctions.get(auction_id, ("Antiques &amp; Interiors", "18th Jul, 2025"))
+            body = render_auction_page(site.base_url, auction_id, site.lot_count, page_size, page_number,
+                                       site.withdrawn, auction_title, date_text).encode("utf-8")
+            self.respond(200, body, "text/html; charset=utf-8")
+        elif parsed.path == "/":
+            self.respond(200, render_auction_list(site.base_url, site.auctions).encode("utf-8"), "text/html; charset=utf-8")
+        elif parsed.path.startswith("/stock/"):
+            match = re.search(r"(\d+)-(\d+)", parsed.path)
+            seed = int(match.group(1)) * 100 + int(match.group(2)) if match else 0
+            # Размеры как у blob-хранилища: -small / -medium / полный
+            scale = IMAGE_TIER_SCALE[next((tier for tier in ("small", "medium") if f"-{tier}." in parsed.path), "full")]
+            if site.real_images:
+                body = render_real_image(seed, int(1200 * scale), int(900 * scale))
+            else:
+                body = render_image(seed, int(site.image_size * scale))
+            self.respond(200, body, "image/jpeg")
+        else:
+            self.respond(404, b"not found", "text/plain")
+
+    def do_HEAD(self):
+        # Тело ответа GET без тела - для проверки размера изображений
+        self.head_only = True
+        try:
+            self.do_GET()
+        finally:
+            self.head_only = False
+
+    def respond(self, status, body, content_type, headers=None):
+        # ETag как у blob-хранилища: условный запрос с тем же ETag получает 304 без тела
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        if status == 200 and self.headers.get("If-None-Match") == etag:
+            self.server.site.count_not_modified()
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        total = len(body)
+        byte_range = re.match(r"bytes=(\d+)-(\d+)$", self.headers.get("Range", ""))
+        if status == 200 and byte_range:
+            start, end = int(byte_range.group(1)), min(int(byte_range.group(2)), total - 1)
+            body = body[start:end + 1]
+            status = 206
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{total}")
+        if status == 200:
+            self.send_header("ETag", etag)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if getattr(self, "head_only", False):
+            return
+        self.wfile.write(body)
+        self.server.site.count_bytes(len(body))
+
+
+class FakeTennantsServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        # Клиент оборвал загрузку (например, изображение больше лимита) - не ошибка сервера
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+
+class FakeTennantsSite:
+    """Фоновый HTTP-сервер: аукцион, страницы лотов и изображения
+
+    Помехи воспроизводимы при одном fault_seed: задержка latency плюс до
+    latency_jitter секунд, а сбой первых fault_attempts запросов (500 -
+    error_rate, 429 с Retry-After - throttle_rate) выбираются по хэшу URL,
+    а не по порядку запросов, поэтому не зависят от параллельности клиента.
+    """
+
+    def __init__(self, lot_count=96, latency=0.0, image_size=20000, max_page_size=240, host="127.0.0.1", port=0,
+                 real_images=False, max_requests_per_second=None, auction_ids=(14251,), latency_jitter=0.0,
+                 error_rate=0.0, throttle_rate=0.0, fault_attempts=1, retry_after=1, fault_seed=0):
+        self.lot_count = lot_count
+        self.max_page_size = max_page_size
+        # Номер лота -> ревизия страницы; снятые с торгов номера лотов
+        self.revisions = {}
+        self.withdrawn = set()
+        # Аукционы главной страницы: первый - как на сайте, следующие - раньше по дате
+        self.auctions = {
+            auction_id: ("Antiques &amp; Interiors" if i == 0 else f"Fine Art Sale {auction_id}",
+                         f"{18 - i}th Jul, 2025")
+            for i, auction_id in enumerate(auction_ids)
+        }
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.fault_attempts = fault_attempts
+        self.retry_after = retry_after
+        self.fault_seed = fault_seed
+        self.attempts = {}
+        self.errors_served = 0
+        self.image_size = image_size
+        self.real_images = real_images
+        # Запросов в секунду, после которых сайт отвечает 429; outage=True - все запросы 500
+        self.max_requests_per_second = max_requests_per_second
+        self.recent_requests = deque()
+        self.outage = False
+        self.throttled_served = 0
+        self.requests_served = 0
+        self.not_modified_served = 0
+        self.bytes_served = 0
+        self.lock = threading.Lock()
+
+        self.server = FakeTennantsServer((host, port), FakeTennantsHandler)
+        self.server.site = self
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def auction_url(self, auction_id=14251):
+        return f"{self.base_url}/auction/details/fake-auction/?au={auction_id}"
+
+    def count_request(self):
+        with self.lock:
+            self.requests_served += 1
+
+    def admit(self):
+        """False - запрос сверх max_requests_per_second за последнюю секунду"""
+        if not self.max_requests_per_second:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            while self.recent_requests and self.recent_requests[0] <= now - 1.0:
+                self.recent_requests.popleft()
+            if len(self.recent_requests) >= self.max_requests_per_second:
+                self.throttled_served += 1
+                return False
+            self.recent_requests.append(now)
+            return True
+
+    def draw(self, path, salt):
+        """Псевдослучайное число [0, 1) для URL - одно и то же при каждом запуске"""
+        digest = hashlib.md5(f"{self.fault_seed}:{salt}:{path}".encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+    def latency_for(self, path):
+        if not self.latency_jitter:
+            return self.latency
+        return self.latency + self.latency_jitter * self.draw(path, "latency")
+
+    def fault_for(self, path):
+        """Статус сбоя (500 / 429) для очередной попытки запроса URL или None"""
+        if not (self.error_rate or self.throttle_rate):
+            return None
+        draw = self.draw(path, "fault")
+        if draw >= self.error_rate + self.throttle_rate:
+            return None
+        with self.lock:
+            attempt = self.attempts[path] = self.attempts.get(path, 0) + 1
+            if attempt > self.fault_attempts:
+                return None
+            if draw < self.error_rate:
+                self.errors_served += 1
+                return 500
+            self.throttled_served += 1
+            return 429
+
+    def count_not_modified(self):
+        with self.lock:
+            self.not_modified_served += 1
+
+    def count_bytes(self, size):
+        with self.lock:
+            self.bytes_served += size
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Извлечение полей из текста описания лота: предкомпилированные шаблоны и поиск ключевых слов
+
+Результаты совпадают с прежними методами FullAuctionParser.extract_*:
+объединенные шаблоны дают те же совпадения, а порядок восстанавливается
+сортировкой по номеру исходного шаблона. Здесь же - обработка значений
+страницы лота, общая для движков BeautifulSoup и lxml: движки только
+находят элементы и их текст.
+"""
+
+import re
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# 🚀 РАЗМЕРЫ
+# Шаблоны "N cm high/wide/deep/long/diameter" начинаются одинаково, поэтому объединены
+# в один проход; номер группы слова после cm - номер исходного шаблона
+DIMENSION_CM_PATTERN = re.compile(
+    r'(\d+(?:\.\d+)?)\s*cm\s+(?:'
+    r'(high|height|h)\b|(wide|width|w)\b|(deep|depth|d)\b|(long|length|l)\b|(diameter|diam)\b)',
+    re.IGNORECASE
+)
+DIMENSION_XYZ_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*x\s*(\d+(?:\.\d+)?)\s*(?:x\s*(\d+(?:\.\d+)?))?\s*cm', re.IGNORECASE)
+DIMENSION_INCH_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*(?:(inches?)|("))\s+(?:high|wide|deep|long)', re.IGNORECASE)
+
+# 🚀 ДАТИРОВКА
+CENTURY_PATTERN = re.compile(r'(\d+)(?:st|nd|rd|th)\s+(?:(century)|(c\.))', re.IGNORECASE)
+# Шаблоны дат пересекаются (circa 1880 совпадает и с \b\d{4}\b), поэтому идут по отдельности
+DATE_PATTERNS = [
+    re.compile(r'circa\s+(\d{4})', re.IGNORECASE),
+    re.compile(r'c\.\s*(\d{4})', re.IGNORECASE),
+    re.compile(r'\b(\d{4})\b', re.IGNORECASE),
+    re.compile(r'(\d{4})\s*-\s*(\d{4})', re.IGNORECASE),
+]
+DIGIT_PATTERN = re.compile(r'\d')
+
+# 🚀 ХУДОЖНИКИ И ПРОИЗВОДИТЕЛИ
+MAKER_PATTERNS = [
+    re.compile(r'by\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)'),
+    re.compile(r'([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*),\s+(?:Paris|London|Berlin|Vienna)'),
+    re.compile(r'(?:signed|attributed to|after)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)'),
+]
+
+# 🚀 МАТЕРИАЛЫ
+# Распространенные материалы в аукционах
+MATERIALS = [
+    'brass', 'bronze', 'copper', 'silver', 'gold', 'platinum',
+    'wood', 'oak', 'mahogany', 'walnut', 'pine', 'teak', 'ebony',
+    'glass', 'crystal', 'ceramic', 'porcelain', 'earthenware', 'stoneware', 'jasper',
+    'marble', 'stone', 'granite', 'slate',
+    'fabric', 'silk', 'cotton', 'wool', 'linen', 'velvet', 'leather',
+    'plastic', 'resin', 'bakelite',
+    'ivory', 'bone', 'mother of pearl',
+    'enamel', 'lacquer', 'gilt', 'gilded'
+]
+MATERIAL_TITLES = [material.title() for material in MATERIALS]
+
+# 🚀 СТРАНЫ
+COUNTRIES = [
+    'French', 'English', 'British', 'German', 'Italian', 'Spanish',
+    'Chinese', 'Japanese', 'American', 'Austrian', 'Dutch', 'Belgian',
+    'Russian', 'Scandinavian', 'European'
+]
+
+
+def build_material_automaton():
+    """Автомат Ахо-Корасик по списку материалов (если установлен pyahocorasick)"""
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for index, material in enumerate(MATERIALS):
+        automaton.add_word(material, index)
+    automaton.make_automaton()
+    return automaton
+
+
+MATERIAL_AUTOMATON = build_material_automaton()
+
+
+def extract_dimensions(description_text):
+    """Извлечение размеров из текста описания"""
+    text_lower = description_text.lower()
+    # Все шаблоны требуют "cm", "inch" или кавычку - большинство описаний отсекается сразу
+    if 'cm' not in text_lower and 'nch' not in text_lower and '"' not in description_text:
+        return ""
+
+    dimensions = []
+
+    cm_matches = sorted(
+        ((match.lastindex, match.group(1)) for match in DIMENSION_CM_PATTERN.finditer(description_text)),
+        key=lambda item: item[0]
+    )
+    dimensions.extend(f"{value} cm" for _, value in cm_matches)
+
+    for match in DIMENSION_XYZ_PATTERN.findall(description_text):
+        # Для сложных размеров (например, 10x20x30 cm)
+        dimensions.append(' x '.join([d for d in match if d]) + ' cm')
+
+    inch_matches = sorted(
+        ((match.lastindex, match.group(1)) for match in DIMENSION_INCH_PATTERN.finditer(description_text)),
+        key=lambda item: item[0]
+    )
+    dimensions.extend(f"{value} cm" for _, value in inch_matches)
+
+    return '; '.join(dimensions) if dimensions else ""
+
+
+def extract_materials(description_text):
+    """Извлечение материалов из текста описания"""
+    text_lower = description_text.lower()
+
+    if MATERIAL_AUTOMATON is not None:
+        found = {index for _, index in MATERIAL_AUTOMATON.iter(text_lower)}
+        found_materials = [MATERIAL_TITLES[index] for index in sorted(found)]
+    else:
+        found_materials = [title for material, title in zip(MATERIALS, MATERIAL_TITLES) if material in text_lower]
+
+    return ', '.join(found_materials) if found_materials else ""
+
+
+def extract_period_dating(description_text):
+    """Извлечение периода и датировки"""
+    # Все шаблоны начинаются с цифр
+    if not DIGIT_PATTERN.search(description_text):
+        return ""
+
+    periods = []
+
+    century_matches = sorted(
+        ((match.lastindex, match.group(1)) for match in CENTURY_PATTERN.finditer(description_text)),
+        key=lambda item: item[0]
+    )
+    periods.extend(f"{value} century" for _, value in century_matches)
+
+    for pattern in DATE_PATTERNS:
+        for match in pattern.findall(description_text):
+            if isinstance(match, tuple):
+                periods.append(f"{match[0]}-{match[1]}")
+            else:
+                periods.append(match)
+
+    return ', '.join(periods) if periods else ""
+
+
+def extract_artist_maker(description_text):
+    """Извлечение имен художников и производителей"""
+    makers = []
+    for pattern in MAKER_PATTERNS:
+        makers.extend(pattern.findall(description_text))
+
+    # Удаляем дубликаты
+    unique_makers = list(dict.fromkeys(makers))
+    return ', '.join(unique_makers) if unique_makers else ""
+
+
+def extract_origin_country(description_text):
+    """Извлечение страны происхождения"""
+    text_words = set(description_text.split())
+    found_countries = [country for country in COUNTRIES if country in text_words]
+    return ', '.join(found_countries) if found_countries else ""
+
+
+# 🚀 ДАТА АУКЦИОНА
+AUCTION_MONTHS = {
+    'Jan': '01', 'Feb': '02', 'Mar': '03', 'Apr': '04',
+    'May': '05', 'Jun': '06', 'Jul': '07', 'Aug': '08',
+    'Sep': '09', 'Oct': '10', 'Nov': '11', 'Dec': '12'
+}
+AUCTION_DATE_PATTERN = re.compile(r'(\d{1,2})\w*\s+([A-Za-z]{3})\w*,?\s+(\d{4})')
+
+
+def parse_auction_date(date_text):
+    """Дата аукциона "18th Jul, 2025" / "18 July 2025" -> "2025-07-18" ("" - не распознана)"""
+    date_match = AUCTION_DATE_PATTERN.search(date_text or "")
+    if not date_match:
+        return ""
+    day, month, year = date_match.groups()
+    month_num = AUCTION_MONTHS.get(month.title())
+    if not month_num:
+        return ""
+    return f"{year}-{month_num}-{day.zfill(2)}"
+
+
+# 🚀 ПОЛЯ СТРАНИЦЫ ЛОТА (общие для extract_lot_data_bs4 и extract_lot_data_lxml)
+AUCTION_ID_PATTERN = re.compile(r'au=(\d+)')
+LOT_ID_PATTERN = re.compile(r'lot=(\d+)')
+LOT_NUMBER_PATTERN = re.compile(r'Lot\s+(\d+)')
+APPEND_TEXT_TITLE_PATTERN = re.compile(r'\(([^,]+,[^)]+)\)')
+META_LOT_PREFIX_PATTERN = re.compile(r'^Lot\s+\d+\s*[-:]?\s*')
+YEAR_PATTERN = re.compile(r'20\d{2}')
+ESTIMATE_PREFIX_PATTERN = re.compile(r'^Estimate\s*', re.IGNORECASE)
+ESTIMATE_TEXT_PATTERN = re.compile(r'Estimate[:\s]*£[\d,\s-]+', re.IGNORECASE)
+PREMIUM_PATTERN = re.compile(r'(\d+(?:\.\d+)?)%')
+CONDITION_TEXT_PATTERN = re.compile(r'[^.]*condition report[^.]*\.', re.IGNORECASE)
+
+IMAGE_HOST = 'https://tennants.blob.core.windows.net'
+DEFAULT_BUYER_PREMIUM = "22.00%"
+CONDITION_DISCLAIMERS = ('We are happy to provide', 'We cannot guarantee')
+NO_CONDITION_REPORT = "There is no condition report for this lot. Click the 'Ask a question' button below to request further information."
+DEFAULT_CONDITION_REPORT = "We are happy to provide Condition Reports to Prospective Buyers, but would welcome your request as soon as possible, preferably at least 48 hours before the Day of Sale."
+CATEGORY_KEYWORDS = ['ceramics', 'glass', 'furniture', 'art', 'jewelry']
+
+
+def lot_url_ids(lot_url):
+    """(auction_id, lot_system_id) из URL лота, "" - нет в URL"""
+    auction_id_match = AUCTION_ID_PATTERN.search(lot_url)
+    lot_id_match = LOT_ID_PATTERN.search(lot_url)
+    return (auction_id_match.group(1) if auction_id_match else "",
+            lot_id_match.group(1) if lot_id_match else "")
+
+
+def lot_number_from_text(text):
+    """Номер из текста "Lot 12" ("" - нет)"""
+    lot_match = LOT_NUMBER_PATTERN.search(text)
+    return lot_match.group(1) if lot_match else ""
+
+
+def auction_title_from_append_text(value):
+    """Название аукциона из скрытого поля AppendText ("Lot 1 (Antiques & Interiors, ...)")"""
+    match = APPEND_TEXT_TITLE_PATTERN.search(value)
+    return match.group(1).replace('&amp;', '&') if match else ""
+
+
+def description_from_meta(content):
+    """Описание из meta description без "Lot X - " в начале"""
+    return META_LOT_PREFIX_PATTERN.sub('', content)
+
+
+def auction_year(page_text):
+    year_match = YEAR_PATTERN.search(page_text)
+    return year_match.group(0) if year_match else "2025"
+
+
+def absolute_image_url(src):
+    """Полный URL изображения из src ("//host/..." или "/stock/...")"""
+    if src.startswith('//'):
+        return 'https:' + src
+    if src.startswith('/'):
+        return IMAGE_HOST + src
+    return src
+
+
+def image_fields(src):
+    """image_url и image_high_res_url (без -medium) основного изображения"""
+    if not src:
+        return {'image_url': "", 'image_high_res_url': ""}
+    image_url = absolute_image_url(src)
+    return {'image_url': image_url, 'image_high_res_url': image_url.replace('-medium', '')}
+
+
+def additional_image_url(src):
+    """Изображение высокого разрешения из condition report (None - не изображение лота)"""
+    if not src or 'stock' not in src:
+        return None
+    return absolute_image_url(src.replace('-small', '').replace('-medium', ''))
+
+
+def clean_estimate(text):
+    """Текст блока estimate без слова Estimate"""
+    return ESTIMATE_PREFIX_PATTERN.sub('', text).replace('&#163;', '£')
+
+
+def estimate_from_text(page_text):
+    """Оценка из текста страницы ("" - не найдена)"""
+    estimate_match = ESTIMATE_TEXT_PATTERN.search(page_text)
+    return estimate_match.group(0).replace('Estimate', '').strip(' :') if estimate_match else ""
+
+
+def premium_from_text(text):
+    """Комиссия покупателя "22.00%" из текста ("" - нет процента)"""
+    premium_match = PREMIUM_PATTERN.search(text)
+    return f"{premium_match.group(1)}%" if premium_match else ""
+
+
+def is_condition_text(text):
+    """Абзац отчета о состоянии (не пустой и не стандартная оговорка)"""
+    return bool(text) and not text.startswith(CONDITION_DISCLAIMERS)
+
+
+def condition_report_from_text(page_text):
+    """Отчет о состоянии по тексту страницы, когда таба condition нет"""
+    text_lower = page_text.lower()
+    if "no condition report" in text_lower:
+        return NO_CONDITION_REPORT
+    if "condition report" in text_lower:
+        condition_match = CONDITION_TEXT_PATTERN.search(page_text)
+        return condition_match.group(0) if condition_match else DEFAULT_CONDITION_REPORT
+    return DEFAULT_CONDITION_REPORT
+
+
+def category_from_classes(classes):
+    """Класс cat-N заголовка лота ("" - нет)"""
+    return next((cls for cls in classes if cls.startswith('cat-')), "")
+
+
+def is_category_option(text):
+    text_lower = text.lower()
+    return any(keyword in text_lower for keyword in CATEGORY_KEYWORDS)
+
+
+def full_lot_info(lot_data):
+    """Сводный текст лота: заголовок, описание, оценка, размеры, материалы, период"""
+    full_info = f"Lot {lot_data.get('lot_number', 'N/A')} ({lot_data.get('auction_title', 'Unknown Auction')}, {lot_data.get('auction_date', 'Unknown Date')})\n"
+    full_info += lot_data.get('lot_description', '')
+    if lot_data.get('lot_estimate'):
+        full_info += f"\nEstimate: {lot_data['lot_estimate']}"
+    if lot_data.get('dimensions'):
+        full_info += f"\nDimensions: {lot_data['dimensions']}"
+    if lot_data.get('materials'):
+        full_info += f"\nMaterials: {lot_data['materials']}"
+    if lot_data.get('period_dating'):
+        full_info += f"\nPeriod: {lot_data['period_dating']}"
+    return full_info
@@ -5,122 +5,175 @@
 
 import requests
 from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
 import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from pathlib import Path
 import re
+from urllib.parse import urljoin
+
+from field_extractors import parse_auction_date
+
+# Страницы со списками аукционов (по порядку, до первой со ссылками)
+AUCTION_LIST_URLS = [
+    "https://auctions.tennants.co.uk/",
+    "https://auctions.tennants.co.uk/forthcoming-auctions/",
+    "https://auctions.tennants.co.uk/live-auctions/",
+    "https://auctions.tennants.co.uk/current-auctions/",
+    "https://www.tennants.co.uk/auctions/",
+    "https://www.tennants.co.uk/"
+]
+
+# Ссылки на аукционы и дата рядом со ссылкой ("18th Jul, 2025")
+AUCTION_LINK_PATTERN = re.compile(r'/auction/', re.IGNORECASE)
+# Ссылки на лоты тоже содержат /auction/ и au=, но это не страницы аукционов
+LOT_LINK_PATTERN = re.compile(r'/auction/lot/|[?&]lot=', re.IGNORECASE)
+DATE_TEXT_PATTERN = re.compile(r'\d{1,2}(?:st|nd|rd|th)?[^\w]+\w+[^\w]+20\d{2}')
+
+# Кэш индекса аукционов для main()
+AUCTION_INDEX_FILE = ".tennants_auction_index.json"
 
 class TennantsAuctionFinder:
-    def __init__(self):
+    """Поиск аукционов по страницам со списками
+
+    Все страницы urls загружаются одновременно, ссылки объединяются в один
+    индекс по ID аукциона с датами в формате ISO. Индекс кэшируется на
+    cache_ttl секунд - в памяти и, если задан cache_file, в JSON-файле.
+    """
+
+    def __init__(self, urls=None, cache_file=None, cache_ttl=3600, timeout=30):
+        self.urls = urls or AUCTION_LIST_URLS
+        self.cache_file = Path(cache_file) if cache_file else None
+        self.cache_ttl = cache_ttl
+        self.timeout = timeout
+        self.index = None
+        self.index_time = 0
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'en-US,en;q=0.5',
         })
+        # Соединений в пуле - по числу страниц, загружаемых одновременно
+        adapter = HTTPAdapter(pool_connections=len(self.urls), pool_maxsize=len(self.urls))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
         
-    def find_upcoming_auctions(self):
-        """Поиск предстоящих аукционов"""
-        print("🔍 Ищем ближайшие аукционы на Tennants...")
+    def find_upcoming_auctions(self, refresh=False):
+        """Предстоящие аукционы [{id, title, date ("YYYY-MM-DD" или ""), date_text, url}]
+
+        refresh=True - загрузить страницы заново, не глядя на кэш
+        """
+        if not refresh:
+            auctions = self.cached_index()
+            if auctions is not None:
+                print(f"💾 Индекс аукционов из кэша: {len(auctions)}")
+                return auctions
         
-        # Пробуем разные URL
-        possible_urls = [
-            "https://auctions.tennants.co.uk/",
-            "https://auctions.tennants.co.uk/forthcoming-auctions/",
-            "https://auctions.tennants.co.uk/live-auctions/",
-            "https://auctions.tennants.co.uk/current-auctions/",
-            "https://www.tennants.co.uk/auctions/",
-            "https://www.tennants.co.uk/"
-        ]
+        print(f"🔍 Ищем аукционы на Tennants: {len(self.urls)} страниц одновременно...")
+        with ThreadPoolExecutor(max_workers=len(self.urls)) as executor:
+            pages = list(executor.map(self.fetch_listing, self.urls))
         
-        for url in possible_urls:
-            try:
-                print(f"🔍 Пробуем URL: {url}")
-                response = self.session.get(url, timeout=30)
-                response.raise_for_status()
-                
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                auctions = []
-                
-                # Ищем различные типы ссылок на аукционы
-                auction_links = []
-                
-                # Вариант 1: Прямые ссылки на аукционы
-                auction_links.extend(soup.find_all('a', href=re.compile(r'/auction/')))
-                
-                # Вариант 2: Ссылки содержащие "auction"
-                auction_links.extend(soup.find_all('a', href=re.compile(r'auction', re.IGNORECASE)))
-                
-                print(f"🔗 Найдено ссылок на аукционы: {len(auction_links)}")
-                
-                seen_urls = set()
-                
-                for link in auction_links:
-                    try:
-                        auction_url = link.get('href')
-                        if not auction_url:
-                            continue
-                            
-                        # Делаем абсолютный URL
-                        if auction_url.startswith('/'):
-                            base_url = url.rstrip('/')
-                            auction_url = base_url + auction_url
-                        elif not auction_url.startswith('http'):
-                            continue
-                        
-                        # Пропускаем дубликаты
-                        if auction_url in seen_urls:
-                            continue
-                        seen_urls.add(auction_url)
-                        
-                        # Проверяем что это действительно ссылка на аукцион
-                        if '/auction/' not in auction_url.lower():
-                            continue
-                        
-                        # Получаем название
-                        title = link.get_text(strip=True)
-                        if not title or len(title) < 3:
-                            continue
-                        
-                        # Ищем дату в тексте рядом с ссылкой
-                        parent = link.parent
-                        date_text = ""
-                        if parent:
-                            parent_text = parent.get_text()
-                            date_match = re.search(r'\d{1,2}[^\w]+\w+[^\w]+20\d{2}', parent_text)
-                            if date_match:
-                                date_text = date_match.group()
-                        
-                        # Извлекаем ID аукциона
-                        auction_id = ""
-                        id_match = re.search(r'/auction/(\d+)', auction_url)
-                        if id_match:
-                            auction_id = id_match.group(1)
-                        
-                        auction_info = {
-                            'id': auction_id,
-                            'title': title,
-                            'date': date_text,
-                            'url': auction_url
-                        }
-                        
-                        auctions.append(auction_info)
-                        
-                    except Exception as e:
-                        continue
-                
-                if auctions:
-                    print(f"✅ Найдено аукционов на {url}: {len(auctions)}")
-                    return auctions
-                else:
-                    print(f"❌ Аукционы не найдены на {url}")
-                    
-            except Exception as e:
-                print(f"❌ Ошибка для {url}: {e}")
+        # Один аукцион бывает на нескольких страницах - объединяем по ID
+        index = {}
+        for auction in (auction for page in pages for auction in page):
+            key = auction['id'] or auction['url']
+            known = index.setdefault(key, auction)
+            for field in ('title', 'date', 'date_text'):
+                if not known[field] and auction[field]:
+                    known[field] = auction[field]
+        
+        auctions = list(index.values())
+        if auctions:
+            print(f"✅ Найдено аукционов: {len(auctions)}")
+            self.store_index(auctions)
+        else:
+            print("❌ Не удалось найти аукционы ни на одном из URLs")
+        return auctions
+    
+    def fetch_listing(self, url):
+        """Аукционы одной страницы со списком (один проход по ссылкам)"""
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+        except Exception as e:
+            print(f"❌ Ошибка для {url}: {e}")
+            return []
+        
+        soup = BeautifulSoup(response.content, 'html.parser')
+        auctions = []
+        seen_urls = set()
+        
+        for link in soup.find_all('a', href=AUCTION_LINK_PATTERN):
+            auction_url = link.get('href')
+            
+            # Делаем абсолютный URL
+            if auction_url.startswith('/'):
+                auction_url = urljoin(url, auction_url)
+            elif not auction_url.startswith('http'):
+                continue
+            if LOT_LINK_PATTERN.search(auction_url):
+                continue
+            
+            # Получаем название (ссылка-картинка без текста не закрывает ссылку с названием)
+            title = link.get_text(strip=True)
+            if not title or len(title) < 3:
                 continue
+            
+            # Пропускаем дубликаты
+            if auction_url in seen_urls:
+                continue
+            seen_urls.add(auction_url)
+            
+            # Ищем дату в тексте рядом с ссылкой
+            date_text = ""
+            if link.parent:
+                date_match = DATE_TEXT_PATTERN.search(link.parent.get_text())
+                if date_match:
+                    date_text = date_match.group()
+            
+            # Извлекаем ID аукциона (/auction/<id> или ?au=<id>)
+            id_match = re.search(r'/auction/(\d+)', auction_url) or re.search(r'[?&]au=(\d+)', auction_url)
+            
+            auctions.append({
+                'id': id_match.group(1) if id_match else "",
+                'title': title,
+                'date': parse_auction_date(date_text),
+                'date_text': date_text,
+                'url': auction_url
+            })
         
-        print("❌ Не удалось найти аукционы ни на одном из URLs")
-        return []
+        print(f"{'✅' if auctions else '❌'} {url}: аукционов {len(auctions)}")
+        return auctions
+    
+    def cached_index(self):
+        """Индекс из памяти или файла, если он не старше cache_ttl; иначе None"""
+        if self.index is None and self.cache_file and self.cache_file.exists():
+            try:
+                with open(self.cache_file, encoding='utf-8') as f:
+                    cached = json.load(f)
+                if cached.get('urls') == list(self.urls):
+                    self.index, self.index_time = cached['auctions'], cached['fetched_at']
+            except (ValueError, KeyError) as e:
+                print(f"⚠️ Кэш индекса аукционов не прочитан: {e}")
+        
+        if self.index is not None and time.time() - self.index_time < self.cache_ttl:
+            return self.index
+        return None
+    
+    def store_index(self, auctions):
+        self.index, self.index_time = auctions, time.time()
+        if not self.cache_file:
+            return
+        # Атомарная запись: прерванный запуск не оставляет битый кэш
+        tmp_file = self.cache_file.with_name(self.cache_file.name + ".tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'fetched_at': self.index_time, 'urls': list(self.urls), 'auctions': auctions},
+                      f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, self.cache_file)
     
     def get_auction_lots(self, auction_url, limit=5):
         """Получение лотов из аукциона"""
@@ -166,7 +219,7 @@ class TennantsAuctionFinder:
             return []
 
 def main():
-    finder = TennantsAuctionFinder()
+    finder = TennantsAuctionFinder(cache_file=AUCTION_INDEX_FILE)
     
     # Находим аукционы
     auctions = finder.find_upcoming_auctions()
@@ -181,7 +234,7 @@ def main():
     for i, auction in enumerate(auctions[:10], 1):
         print(f"{i}. {auction['title']}")
         print(f"   ID: {auction['id']}")
-        print(f"   Дата: {auction['date']}")
+        print(f"   Дата: {auction['date'] or auction['date_text']}")
         print(f"   URL: {auction['url']}")
         print()
     
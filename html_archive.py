@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Архив сырых HTML страниц: сжатые записи в дописываемых сегментах + индекс в SQLite
+"""
+
+import gzip
+import hashlib
+import json
+import mmap
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class HTMLArchive:
+    """Страницы лотов и аукционов в файлах segment_NNNNNN.bin
+
+    Каждая запись - строка JSON-заголовка (url, lot_system_id, время, кодек)
+    и сжатое тело; по заголовкам индекс можно восстановить (rebuild_index).
+    Индекс хранит сегмент/смещение/длину тела, поэтому страница лота читается
+    одним поиском в индексе и срезом mmap сегмента.
+    Повторная загрузка неизмененной страницы добавляет только строку индекса
+    (такие строки rebuild_index не восстанавливает). Недописанная после сбоя
+    запись в конце сегмента отбрасывается при открытии архива на запись.
+    readonly=True - индекс открывается только для чтения (mode=ro).
+    """
+
+    def __init__(self, archive_dir, segment_max_bytes=256 * 1024 ** 2, compression=None, level=None,
+                 readonly=False):
+        self.archive_dir = Path(archive_dir)
+        self.segment_max_bytes = segment_max_bytes
+        self.compression = compression or ('zstd' if zstandard else 'gzip')
+        if self.compression == 'zstd' and zstandard is None:
+            raise ValueError("Для сжатия zstd установите пакет zstandard")
+        self.level = level
+        self.readonly = readonly
+
+        self.lock = threading.Lock()
+        self.segment_maps = {}
+
+        if readonly:
+            index_uri = (self.archive_dir / "index.sqlite3").resolve().as_uri() + "?mode=ro"
+            self.db = sqlite3.connect(index_uri, uri=True, check_same_thread=False)
+        else:
+            self.archive_dir.mkdir(parents=True, exist_ok=True)
+            self.db = sqlite3.connect(self.archive_dir / "index.sqlite3", check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    id INTEGER PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    lot_system_id TEXT,
+                    kind TEXT NOT NULL,
+                    fetched_at TEXT NOT NULL,
+                    segment INTEGER NOT NULL,
+                    offset INTEGER NOT NULL,
+                    length INTEGER NOT NULL,
+                    codec TEXT NOT NULL,
+                    raw_size INTEGER NOT NULL,
+                    sha1 TEXT NOT NULL
+                )
+            """)
+            self.db.execute("CREATE INDEX IF NOT EXISTS pages_lot ON pages(lot_system_id, fetched_at)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS pages_url ON pages(url, fetched_at)")
+            self.db.commit()
+            self.truncate_incomplete_tail()
+
+        self.segment, self.segment_size = self.last_segment()
+        self.stats = {'stored': 0, 'deduplicated': 0, 'raw_bytes': 0, 'stored_bytes': 0}
+
+    # ---------- сегменты ----------
+
+    def segment_path(self, segment):
+        return self.archive_dir / f"segment_{segment:06d}.bin"
+
+    def last_segment(self):
+        segments = sorted(self.archive_dir.glob("segment_*.bin"))
+        if not segments:
+            return 1, 0
+        path = segments[-1]
+        return int(path.stem.split('_')[1]), path.stat().st_size
+
+    @staticmethod
+    def segment_records(path, start=0):
+        """([(заголовок, смещение тела)], конец последней целой записи) сегмента от позиции start
+
+        Чтение останавливается на записи, оборванной сбоем: строка заголовка
+        без перевода строки, нечитаемый заголовок или тело за концом файла.
+        """
+        records = []
+        size = path.stat().st_size
+        end = start
+        with open(path, 'rb') as f:
+            f.seek(start)
+            while True:
+                header_line = f.readline()
+                if not header_line.endswith(b"\n"):
+                    break
+                try:
+                    header = json.loads(header_line)
+                    length = int(header['length'])
+                except (ValueError, KeyError, TypeError):
+                    break
+                offset = end + len(header_line)
+                if offset + length > size:
+                    break
+                records.append((header, offset))
+                end = offset + length
+                f.seek(end)
+        return records, end
+
+    def truncate_tail(self, path, end):
+        size = path.stat().st_size
+        if end < size:
+            print(f"✂️ Отбрасываем недописанную запись в конце {path.name}: {size - end} байт")
+            os.truncate(path, end)
+
+    def truncate_incomplete_tail(self):
+        """Обрезка оборванной записи в конце последнего сегмента (проверяется только неиндексированный хвост)"""
+        segments = sorted(self.archive_dir.glob("segment_*.bin"))
+        if not segments:
+            return
+        path = segments[-1]
+        indexed_end = self.db.execute("SELECT MAX(offset + length) FROM pages WHERE segment = ?",
+                                      (int(path.stem.split('_')[1]),)).fetchone()[0]
+        _, end = self.segment_records(path, indexed_end or 0)
+        self.truncate_tail(path, end)
+
+    def compress(self, body):
+        if self.compression == 'zstd':
+            return zstandard.ZstdCompressor(level=self.level or 10).compress(body)
+        return gzip.compress(body, compresslevel=self.level or 6)
+
+    @staticmethod
+    def decompress(codec, payload):
+        if codec == 'zstd':
+            if zstandard is None:
+                raise ValueError("Запись сжата zstd - установите пакет zstandard")
+            return zstandard.ZstdDecompressor().decompress(payload)
+        return gzip.decompress(payload)
+
+    def segment_map(self, segment, end):
+        """mmap сегмента; текущий сегмент растет, поэтому при нехватке отображаем заново"""
+        mapped = self.segment_maps.get(segment)
+        if mapped is None or len(mapped) < end:
+            if mapped is not None:
+                mapped.close()
+            with open(self.segment_path(segment), 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.segment_maps[segment] = mapped
+        return mapped
+
+    # ---------- запись ----------
+
+    def put(self, url, body, kind='lot', lot_system_id=None, fetched_at=None):
+        """Сохранение страницы; возвращает запись индекса"""
+        if self.readonly:
+            raise ValueError("Архив открыт только для чтения")
+
+        fetched_at = fetched_at or datetime.now().isoformat()
+        digest = hashlib.sha1(body).hexdigest()
+
+        with self.lock:
+            previous = self.db.execute(
+                "SELECT segment, offset, length, codec, raw_size, sha1 FROM pages WHERE url = ? "
+                "ORDER BY fetched_at DESC LIMIT 1", (url,)
+            ).fetchone()
+
+            if previous and previous[5] == digest:
+                # Страница не изменилась - новая строка индекса на то же тело
+                segment, offset, length, codec, raw_size, _ = previous
+                self.stats['deduplicated'] += 1
+            else:
+                payload = self.compress(body)
+                codec = self.compression
+                raw_size = len(body)
+                header = json.dumps({'url': url, 'lot_system_id': lot_system_id, 'kind': kind,
+                                     'fetched_at': fetched_at, 'codec': codec, 'length': len(payload),
+                                     'raw_size': raw_size, 'sha1': digest}, ensure_ascii=False).encode('utf-8') + b"\n"
+
+                if self.segment_size and self.segment_size + len(header) + len(payload) > self.segment_max_bytes:
+                    self.segment += 1
+                    self.segment_size = 0
+
+                segment = self.segment
+                offset = self.segment_size + len(header)
+                length = len(payload)
+                with open(self.segment_path(segment), 'ab') as f:
+                    f.write(header + payload)
+                self.segment_size += len(header) + len(payload)
+
+                self.stats['stored'] += 1
+                self.stats['raw_bytes'] += raw_size
+                self.stats['stored_bytes'] += length
+
+            self.db.execute(
+                "INSERT INTO pages (url, lot_system_id, kind, fetched_at, segment, offset, length, codec, raw_size, sha1) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, lot_system_id, kind, fetched_at, segment, offset, length, codec, raw_size, digest)
+            )
+            self.db.commit()
+
+        return {'url': url, 'lot_system_id': lot_system_id, 'kind': kind, 'fetched_at': fetched_at,
+                'segment': segment, 'offset': offset, 'length': length, 'codec': codec}
+
+    # ---------- чтение ----------
+
+    ENTRY_COLUMNS = "url, lot_system_id, kind, fetched_at, segment, offset, length, codec"
+
+    def entry_from_row(self, row):
+        return dict(zip(['url', 'lot_system_id', 'kind', 'fetched_at', 'segment', 'offset', 'length', 'codec'], row))
+
+    def read(self, entry):
+        """Тело страницы по записи индекса"""
+        with self.lock:
+            mapped = self.segment_map(entry['segment'], entry['offset'] + entry['length'])
+            payload = mapped[entry['offset']:entry['offset'] + entry['length']]
+        return self.decompress(entry['codec'], payload)
+
+    def find(self, lot_system_id=None, url=None, at=None):
+        """Запись индекса: последняя версия или последняя на момент at (ISO-время)"""
+        column, value = ('lot_system_id', str(lot_system_id)) if lot_system_id is not None else ('url', url)
+        query = f"SELECT {self.ENTRY_COLUMNS} FROM pages WHERE {column} = ?"
+        params = [value]
+        if at:
+            query += " AND fetched_at <= ?"
+            params.append(at)
+        query += " ORDER BY fetched_at DESC LIMIT 1"
+        with self.lock:
+            row = self.db.execute(query, params).fetchone()
+        return self.entry_from_row(row) if row else None
+
+    def get_lot(self, lot_system_id, at=None):
+        entry = self.find(lot_system_id=lot_system_id, at=at)
+        return self.read(entry) if entry else None
+
+    def get_url(self, url, at=None):
+        entry = self.find(url=url, at=at)
+        return self.read(entry) if entry else None
+
+    def history(self, lot_system_id):
+        """Все загрузки страницы лота по времени"""
+        with self.lock:
+            rows = self.db.execute(
+                f"SELECT {self.ENTRY_COLUMNS} FROM pages WHERE lot_system_id = ? ORDER BY fetched_at",
+                (str(lot_system_id),)
+            ).fetchall()
+        return [self.entry_from_row(row) for row in rows]
+
+    def latest_entries(self, kind='lot'):
+        """Последняя версия каждой страницы данного вида"""
+        with self.lock:
+            rows = self.db.execute(
+                f"SELECT {self.ENTRY_COLUMNS} FROM pages p WHERE kind = ? AND id = "
+                "(SELECT id FROM pages WHERE url = p.url ORDER BY fetched_at DESC, id DESC LIMIT 1) ORDER BY url",
+                (kind,)
+            ).fetchall()
+        return [self.entry_from_row(row) for row in rows]
+
+    def rebuild_index(self):
+        """Восстановление индекса по заголовкам записей в сегментах (оборванная запись в конце отбрасывается)"""
+        if self.readonly:
+            raise ValueError("Архив открыт только для чтения")
+        with self.lock:
+            self.db.execute("DELETE FROM pages")
+            for path in sorted(self.archive_dir.glob("segment_*.bin")):
+                segment = int(path.stem.split('_')[1])
+                records, end = self.segment_records(path)
+                for header, offset in records:
+                    self.db.execute(
+                        "INSERT INTO pages (url, lot_system_id, kind, fetched_at, segment, offset, length, codec, raw_size, sha1) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (header['url'], header['lot_system_id'], header['kind'], header['fetched_at'], segment,
+                         offset, header['length'], header['codec'], header['raw_size'], header['sha1'])
+                    )
+                self.truncate_tail(path, end)
+            self.db.commit()
+            self.segment, self.segment_size = self.last_segment()
+
+    def close(self):
+        with self.lock:
+            for mapped in self.segment_maps.values():
+                mapped.close()
+            self.segment_maps = {}
+            self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Дисковый HTTP-кэш с условной ревалидацией для requests-сессии парсера
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from rate_limit import ThrottledHTTPAdapter
+
+# Заголовки, которые не имеют смысла для тела, уже раскодированного requests
+SKIPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection'}
+
+
+class HTTPCache:
+    """Тела ответов на диске + индекс в SQLite (ETag, Last-Modified, LRU)
+
+    page_ttl  - сколько секунд страница считается свежей без запроса к сайту
+                (0 = всегда проверять условным запросом)
+    image_ttl - то же для изображений без версии
+    Изображения с параметром ?v= считаются неизменяемыми и не перепроверяются.
+    """
+
+    def __init__(self, cache_dir, page_ttl=0, image_ttl=24 * 3600, max_size_bytes=2 * 1024 ** 3,
+                 versioned_immutable=True):
+        self.cache_dir = Path(cache_dir)
+        self.bodies_dir = self.cache_dir / "bodies"
+        self.bodies_dir.mkdir(parents=True, exist_ok=True)
+
+        self.page_ttl = page_ttl
+        self.image_ttl = image_ttl
+        self.max_size_bytes = max_size_bytes
+        self.versioned_immutable = versioned_immutable
+
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(self.cache_dir / "index.sqlite3", check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                key TEXT NOT NULL,
+                headers TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries(last_access)")
+        self.db.commit()
+        self.total_size = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'bytes_saved': 0, 'bytes_downloaded': 0}
+
+    def body_path(self, key):
+        return self.bodies_dir / key[:2] / key
+
+    def is_immutable(self, url):
+        """Версионированные URL (…jpg?v=63887473351200) никогда не меняются"""
+        return self.versioned_immutable and 'v' in parse_qs(urlparse(url).query)
+
+    def ttl_for(self, url, headers):
+        if self.is_immutable(url):
+            return float('inf')
+        content_type = headers.get('Content-Type', '')
+        if content_type.startswith('image/') or urlparse(url).path.lower().endswith(('.jpg', '.jpeg', '.png')):
+            return self.image_ttl
+        return self.page_ttl
+
+    def lookup(self, url):
+        """Запись кэша для URL или None"""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT key, headers, etag, last_modified, stored_at, size FROM entries WHERE url = ?", (url,)
+            ).fetchone()
+        if not row:
+            return None
+
+        key, headers, etag, last_modified, stored_at, size = row
+        path = self.body_path(key)
+        if not path.exists():
+            self.delete(url)
+            return None
+
+        return {
+            'url': url,
+            'key': key,
+            'headers': CaseInsensitiveDict(json.loads(headers)),
+            'etag': etag,
+            'last_modified': last_modified,
+            'stored_at': stored_at,
+            'size': size,
+        }
+
+    def is_fresh(self, entry):
+        return time.time() - entry['stored_at'] < self.ttl_for(entry['url'], entry['headers'])
+
+    def read_body(self, entry):
+        with open(self.body_path(entry['key']), 'rb') as f:
+            return f.read()
+
+    def temp_path(self, url):
+        """Временный файл тела рядом с постоянным (для store / commit)"""
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        path = self.body_path(key)
+        path.parent.mkdir(exist_ok=True)
+        return path.with_name(f"{key}.{threading.get_ident()}.tmp")
+
+    def store(self, url, headers, body):
+        """Сохранение тела ответа (атомарно) и его валидаторов"""
+        tmp_path = self.temp_path(url)
+        with open(tmp_path, 'wb') as f:
+            f.write(body)
+        self.commit(url, headers, tmp_path, len(body))
+
+    def commit(self, url, headers, tmp_path, size):
+        """Готовый временный файл тела (temp_path) становится записью кэша"""
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        os.replace(tmp_path, self.body_path(key))
+
+        stored_headers = {k: v for k, v in headers.items() if k.lower() not in SKIPPED_HEADERS}
+        now = time.time()
+        with self.lock:
+            old = self.db.execute("SELECT size FROM entries WHERE url = ?", (url,)).fetchone()
+            self.db.execute(
+                "INSERT OR REPLACE INTO entries (url, key, headers, etag, last_modified, stored_at, last_access, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, key, json.dumps(stored_headers), headers.get('ETag'), headers.get('Last-Modified'),
+                 now, now, size)
+            )
+            self.db.commit()
+            self.total_size += size - (old[0] if old else 0)
+
+        if self.total_size > self.max_size_bytes:
+            self.evict()
+
+    def touch(self, entry, headers=None):
+        """Продление свежести после 304 и отметка использования для LRU"""
+        now = time.time()
+        with self.lock:
+            if headers is not None:
+                self.db.execute(
+                    "UPDATE entries SET stored_at = ?, last_access = ?, "
+                    "etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) WHERE url = ?",
+                    (now, now, headers.get('ETag'), headers.get('Last-Modified'), entry['url'])
+                )
+            else:
+                self.db.execute("UPDATE entries SET last_access = ? WHERE url = ?", (now, entry['url']))
+            self.db.commit()
+
+    def delete(self, url):
+        with self.lock:
+            row = self.db.execute("SELECT key, size FROM entries WHERE url = ?", (url,)).fetchone()
+            if row:
+                self.db.execute("DELETE FROM entries WHERE url = ?", (url,))
+                self.db.commit()
+                self.total_size -= row[1]
+        if row:
+            self.body_path(row[0]).unlink(missing_ok=True)
+
+    def evict(self):
+        """LRU-вытеснение до 90% лимита размера"""
+        target = self.max_size_bytes * 0.9
+        with self.lock:
+            rows = self.db.execute("SELECT url, key, size FROM entries ORDER BY last_access").fetchall()
+            evicted = []
+            for url, key, size in rows:
+                if self.total_size <= target:
+                    break
+                self.total_size -= size
+                evicted.append((url, key))
+            self.db.executemany("DELETE FROM entries WHERE url = ?", [(url,) for url, _ in evicted])
+            self.db.commit()
+
+        for _, key in evicted:
+            self.body_path(key).unlink(missing_ok=True)
+
+    def count(self, stat, value=1):
+        with self.lock:
+            self.stats[stat] += value
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+class CachingStream:
+    """Тело потокового ответа (stream=True), которое пишется в кэш по мере чтения
+
+    Запись кэша появляется, только если тело прочитано до конца: при обрыве
+    или если вызывающий код прекратил чтение (лимит размера изображения)
+    временный файл удаляется. Остальное делегируется urllib3-ответу.
+    """
+
+    def __init__(self, raw, cache, url, headers):
+        self.raw = raw
+        self.cache = cache
+        self.url = url
+        self.headers = headers
+
+    def stream(self, amt=2 ** 16, decode_content=None):
+        tmp_path = self.cache.temp_path(self.url)
+        size = 0
+        complete = False
+        try:
+            with open(tmp_path, 'wb') as f:
+                for chunk in self.raw.stream(amt, decode_content=decode_content):
+                    f.write(chunk)
+                    size += len(chunk)
+                    yield chunk
+            complete = True
+        finally:
+            if complete:
+                self.cache.commit(self.url, self.headers, tmp_path, size)
+                self.cache.count('misses')
+                self.cache.count('bytes_downloaded', size)
+            else:
+                tmp_path.unlink(missing_ok=True)
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+
+class CachingHTTPAdapter(ThrottledHTTPAdapter):
+    """Адаптер сессии: свежие ответы из кэша, остальные - условным запросом
+
+    Ответы из кэша не расходуют бюджет запросов RateLimiter. Тело ответа на
+    stream=True не читается целиком: оно попадает в кэш по мере чтения
+    вызывающим кодом (CachingStream). Запросы с Range не кэшируются.
+    """
+
+    def __init__(self, cache, **kwargs):
+        self.cache = cache
+        super().__init__(**kwargs)
+
+    def build_cached_response(self, request, entry, body):
+        response = Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = body
+        response._content_consumed = True
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.elapsed = timedelta(0)
+        response.from_cache = True
+        return response
+
+    def send(self, request, **kwargs):
+        if request.method != 'GET' or 'Range' in request.headers:
+            return super().send(request, **kwargs)
+
+        entry = self.cache.lookup(request.url)
+
+        # Свежая запись - сеть не нужна
+        if entry and self.cache.is_fresh(entry):
+            try:
+                body = self.cache.read_body(entry)
+            except OSError:
+                # Тело вытеснено другим потоком - идем в сеть
+                entry = None
+            else:
+                self.cache.touch(entry)
+                self.cache.count('hits')
+                self.cache.count('bytes_saved', len(body))
+                return self.build_cached_response(request, entry, body)
+
+        # Устаревшая запись - условный запрос
+        if entry:
+            request = request.copy()
+            if entry['etag']:
+                request.headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                request.headers['If-Modified-Since'] = entry['last_modified']
+
+        response = super().send(request, **kwargs)
+
+        if response.status_code == 304 and entry:
+            response.close()
+            try:
+                body = self.cache.read_body(entry)
+            except OSError:
+                # Тело пропало после условного запроса - повторяем без валидаторов
+                self.cache.delete(entry['url'])
+                request.headers.pop('If-None-Match', None)
+                request.headers.pop('If-Modified-Since', None)
+                return self.send(request, **kwargs)
+            self.cache.touch(entry, response.headers)
+            self.cache.count('revalidated')
+            self.cache.count('bytes_saved', len(body))
+            return self.build_cached_response(request, entry, body)
+
+        if response.status_code == 200 and kwargs.get('stream'):
+            # Лимит размера применяет вызывающий код - тело не читаем заранее
+            response.raw = CachingStream(response.raw, self.cache, request.url, response.headers)
+        elif response.status_code == 200:
+            body = response.content
+            self.cache.store(request.url, response.headers, body)
+            self.cache.count('misses')
+            self.cache.count('bytes_downloaded', len(body))
+
+        return response
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Выбор разрешения изображений лота и ограничение объема их загрузки
+"""
+
+import re
+import threading
+
+# Размеры изображений stock/<id>-<n>[-small|-medium].jpg от меньшего к большему; full - без суффикса
+TIERS = ['small', 'medium', 'full']
+
+TIER_SUFFIX_PATTERN = re.compile(r'-(?:small|medium)(?=\.\w+(?:\?|$))')
+EXTENSION_PATTERN = re.compile(r'(\.\w+)(\?.*)?$')
+
+
+class ImageTooLarge(Exception):
+    """Изображение больше max_image_bytes"""
+
+
+class ImageBudgetExceeded(Exception):
+    """Исчерпан лимит байт изображений на запуск"""
+
+
+def tier_url(url, tier):
+    """URL изображения Tennants нужного размера"""
+    base = TIER_SUFFIX_PATTERN.sub('', url)
+    if tier == 'full':
+        return base
+    match = EXTENSION_PATTERN.search(base)
+    if not match or 'stock' not in base:
+        return url
+    return f"{base[:match.start()]}-{tier}{match.group(1)}{match.group(2) or ''}"
+
+
+class ImageResolutionPolicy:
+    """Размер изображения по роли (main - основное, additional - из condition report)
+
+    По умолчанию - как раньше: основное medium (как на странице лота),
+    дополнительные в полном размере. max_image_bytes - предел одного файла:
+    больший файл не дочитывается, и берется следующий меньший размер.
+    probe="head" / "range" узнает размер отдельным запросом до загрузки
+    (без него размер берется из Content-Length ответа, а при его отсутствии
+    загрузка обрывается на пределе). max_run_bytes - байт изображений на запуск.
+    """
+
+    def __init__(self, main='medium', additional='full', max_image_bytes=None, max_run_bytes=None, probe=None):
+        for tier in (main, additional):
+            if tier not in TIERS:
+                raise ValueError(f"Неизвестный размер изображения: {tier}")
+        if probe not in (None, 'head', 'range'):
+            raise ValueError(f"Неизвестный способ проверки размера: {probe}")
+        self.tiers = {'main': main, 'additional': additional}
+        self.max_image_bytes = max_image_bytes
+        self.max_run_bytes = max_run_bytes
+        self.probe = probe
+
+        self.lock = threading.Lock()
+        self.run_bytes = 0
+        self.stats = {'oversized': 0, 'over_budget': 0}
+
+    def url_for(self, url, role):
+        return tier_url(url, self.tiers[role])
+
+    def fallbacks(self, url):
+        """URL того же изображения от заданного размера к меньшим"""
+        current = next((tier for tier in ('small', 'medium') if f"-{tier}." in url), 'full')
+        return [tier_url(url, tier) for tier in reversed(TIERS[:TIERS.index(current) + 1])]
+
+    def check_size(self, size):
+        """Проверка известного заранее размера файла"""
+        if self.max_image_bytes and size is not None and size > self.max_image_bytes:
+            raise ImageTooLarge(f"{size} байт > {self.max_image_bytes}")
+
+    def check_budget(self):
+        with self.lock:
+            if self.max_run_bytes and self.run_bytes >= self.max_run_bytes:
+                self.stats['over_budget'] += 1
+                raise ImageBudgetExceeded(f"загружено {self.run_bytes} байт изображений из {self.max_run_bytes}")
+
+    def consume(self, size):
+        with self.lock:
+            self.run_bytes += size
+
+    def count_oversized(self):
+        with self.lock:
+            self.stats['oversized'] += 1
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Обработка скачанных изображений в пуле процессов: размеры, перцептивный хэш, превью
+"""
+
+import io
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from PIL import Image
+
+# Размер dHash: 8x8 сравнений соседних пикселей -> 64 бита
+HASH_SIZE = 8
+
+
+def difference_hash(image):
+    """dHash: у похожих картинок (пересжатие, другой размер) хэши отличаются на несколько бит"""
+    pixels = list(image.convert('L').resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS).getdata())
+    bits = 0
+    for row in range(HASH_SIZE):
+        for col in range(HASH_SIZE):
+            left = pixels[row * (HASH_SIZE + 1) + col]
+            right = pixels[row * (HASH_SIZE + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return f"{bits:016x}"
+
+
+def process_image(body, thumbnail_paths):
+    """Размеры, dHash и превью из байтов изображения (одно декодирование)
+
+    thumbnail_paths - [(наибольшая сторона, путь)]; превью строятся от
+    большего к меньшему, каждое из предыдущего.
+    """
+    image = Image.open(io.BytesIO(body))
+    width, height = image.size
+    # Для JPEG декодер сразу уменьшает картинку до ближайшего масштаба 1/2..1/8 не меньше превью
+    largest = max((size for size, _ in thumbnail_paths), default=HASH_SIZE + 1)
+    image.draft('RGB', (largest, largest))
+    image = image.convert('RGB')
+
+    metadata = {'width': width, 'height': height, 'phash': difference_hash(image), 'thumbnails': []}
+
+    thumbnail = image
+    for size, path in sorted(thumbnail_paths, reverse=True):
+        thumbnail = thumbnail.copy()
+        thumbnail.thumbnail((size, size), Image.LANCZOS)
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.part")
+        thumbnail.save(tmp_path, 'JPEG', quality=85)
+        os.replace(tmp_path, path)
+        metadata['thumbnails'].append(str(path))
+
+    return metadata
+
+
+class ImagePostProcessor:
+    """Пул процессов для process_image; изображения передаются байтами сразу после загрузки
+
+    thumbnail_sizes - наибольшая сторона превью в пикселях. Пул создается
+    при первой задаче и после shutdown() может быть создан заново.
+    """
+
+    def __init__(self, workers=None, thumbnail_sizes=(256,)):
+        self.workers = workers or os.cpu_count()
+        self.thumbnail_sizes = tuple(thumbnail_sizes)
+        self.pool = None
+        self.lock = threading.Lock()
+
+    def thumbnail_paths(self, filepath):
+        """Превью рядом с изображением: <папка лота>/thumbnails/<имя>_<размер>.jpg"""
+        filepath = Path(filepath)
+        return [(size, str(filepath.parent / "thumbnails" / f"{filepath.stem}_{size}.jpg")) for size in self.thumbnail_sizes]
+
+    def submit(self, body, filepath):
+        """Future с метаданными изображения (см. process_image)"""
+        with self.lock:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self.pool.submit(process_image, body, self.thumbnail_paths(filepath))
+
+    def shutdown(self):
+        with self.lock:
+            if self.pool is not None:
+                self.pool.shutdown(wait=True)
+                self.pool = None
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Общая очередь загрузки изображений лотов на весь запуск
+"""
+
+import os
+import queue
+import shutil
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+
+from image_policy import ImageBudgetExceeded, ImageTooLarge
+
+
+class LotImages:
+    """Изображения одного лота в очереди; on_complete(lot_data, paths) - когда скачаны все"""
+
+    def __init__(self, lot_data, total, on_complete=None):
+        self.lot_data = lot_data
+        self.total = total
+        self.remaining = total
+        self.paths = []
+        self.metadata = {}
+        self.on_complete = on_complete
+        self.done = threading.Event()
+
+    def result(self, timeout=None):
+        """Пути скачанных изображений (ждет окончания загрузки лота)"""
+        self.done.wait(timeout)
+        return self.paths
+
+
+class ImageDownloadScheduler:
+    """Долгоживущие потоки загрузки изображений для всех лотов запуска
+
+    Очередь ограничена queue_size изображениями: submit_lot ждет, пока
+    потоки освободят место, и парсинг не убегает далеко вперед загрузки.
+    Одновременно к одному хосту - не больше per_host_limit запросов.
+    Один URL скачивается один раз за запуск: повторы (те же фото у снова
+    выставленного лота) получают жесткую ссылку или копию уже скачанного файла.
+    С parser.image_processor байты скачанного изображения сразу уходят в пул
+    процессов, а метаданные попадают в lot_data до on_complete.
+    """
+
+    def __init__(self, parser, workers=8, per_host_limit=4, queue_size=200, retries=3, backoff_factor=0.5):
+        self.parser = parser
+        self.per_host_limit = per_host_limit
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+
+        self.tasks = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.host_slots = {}
+        self.downloaded = {}   # url -> путь скачанного файла
+        self.in_flight = {}    # url -> [(изображение, путь, LotImages)] ожидающих того же URL
+        self.post_processing = 0
+        self.post_processed = threading.Condition(self.lock)
+        self.stats = {'downloaded': 0, 'deduplicated': 0, 'on_disk': 0, 'from_store': 0, 'failed': 0, 'skipped': 0}
+
+        self.workers = [threading.Thread(target=self.work, name=f"image-worker-{i}", daemon=True) for i in range(workers)]
+        for worker in self.workers:
+            worker.start()
+
+    def submit_lot(self, lot_data, on_complete=None):
+        """Постановка всех изображений лота в очередь; возвращает LotImages"""
+        images = self.parser.collect_lot_images(lot_data)
+        lot_images = LotImages(lot_data, len(images), on_complete)
+
+        if not images:
+            self.parser.log("📷 Нет изображений для лота #%s", lot_data.get('lot_number', ''))
+            self.finish_lot(lot_images)
+            return lot_images
+
+        for image in images:
+            filepath = self.parser.get_image_path(
+                image['url'], image['lot_id'], image['lot_number'],
+                image['lot_description'], image['is_main'], image['image_index']
+            )
+            self.tasks.put((image, filepath, lot_images))
+        return lot_images
+
+    def work(self):
+        while True:
+            task = self.tasks.get()
+            try:
+                if task is None:
+                    return
+                self.process(*task)
+            except Exception as e:
+                # Поток не должен умирать: изображение считаем нескачанным
+                self.parser.run_log.warning('image_error', "❌ Ошибка обработки изображения %s: %s", task[0]['url'], e,
+                                           url=task[0]['url'], error=str(e))
+                self.count('failed')
+                self.image_done(task[2], None)
+            finally:
+                self.tasks.task_done()
+
+    def process(self, image, filepath, lot_images):
+        url = image['url']
+        # Файлы пишутся атомарно, поэтому существующий файл всегда целый
+        if filepath.exists() and filepath.stat().st_size > 0:
+            self.parser.log("⏭️ Изображение уже на диске: %s", filepath)
+            self.count('on_disk')
+            self.image_ready(lot_images, image, filepath)
+            return
+
+        # Известный URL - ссылка на файл хранилища изображений без запроса
+        if self.parser.image_from_store(url, filepath):
+            self.count('from_store')
+            self.image_ready(lot_images, image, filepath)
+            return
+
+        with self.lock:
+            source = self.downloaded.get(url)
+            if source is None:
+                if url in self.in_flight:
+                    # Тот же URL уже качается для другого лота - дождемся его
+                    self.in_flight[url].append((image, filepath, lot_images))
+                    return
+                self.in_flight[url] = []
+
+        if source is not None:
+            self.image_ready(lot_images, image, self.link_copy(source, filepath))
+            return
+
+        path = body = None
+        try:
+            path, body = self.download(url, filepath)
+        finally:
+            # URL освобождается и при исключении: ожидающие лоты получают None, а не висят
+            with self.lock:
+                if path:
+                    self.downloaded[url] = path
+                waiters = self.in_flight.pop(url)
+            for waiter_image, waiter_path, waiter_lot in waiters:
+                self.image_ready(waiter_lot, waiter_image, self.link_copy(path, waiter_path) if path else None)
+
+        self.image_ready(lot_images, image, path, body)
+
+    def download(self, url, filepath):
+        """Загрузка с повторами; файл больше лимита parser.image_policy - меньший размер того же изображения"""
+        for candidate in self.parser.image_policy.fallbacks(url):
+            if candidate != url and self.parser.image_from_store(candidate, filepath):
+                self.count('from_store')
+                return filepath, None
+            try:
+                return self.download_with_retries(candidate, filepath)
+            except ImageTooLarge as e:
+                self.parser.image_policy.count_oversized()
+                self.parser.log("📏 Изображение больше лимита (%s): %s", e, candidate)
+            except ImageBudgetExceeded as e:
+                self.parser.log("⛔ Изображение пропущено: %s", e)
+                self.count('skipped')
+                return None, None
+
+        self.count('skipped')
+        return None, None
+
+    def download_with_retries(self, url, filepath):
+        """Повторы с паузой backoff_factor * 2^попытка"""
+        host = urlparse(url).netloc
+        with self.lock:
+            slots = self.host_slots.setdefault(host, threading.Semaphore(self.per_host_limit))
+
+        for attempt in range(self.retries + 1):
+            try:
+                with slots:
+                    body = self.parser.fetch_image(url, filepath)
+                self.parser.log("🖼️ Изображение сохранено: %s", filepath)
+                self.count('downloaded')
+                return filepath, body
+            except (requests.RequestException, OSError) as e:
+                if attempt >= self.retries:
+                    self.parser.run_log.warning('image_error', "❌ Ошибка скачивания изображения: %s", e, url=url, error=str(e))
+                    self.count('failed')
+                    return None, None
+                time.sleep(self.backoff_factor * (2 ** attempt))
+
+    def link_copy(self, source, filepath):
+        """Файл уже скачанного URL под именем другого лота"""
+        if source is None:
+            return None
+        if filepath != source:
+            try:
+                os.link(source, filepath)
+            except FileExistsError:
+                pass
+            except OSError:
+                shutil.copyfile(source, filepath)
+        self.parser.log("🔗 Изображение уже скачано для другого лота: %s", filepath)
+        self.count('deduplicated')
+        return filepath
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def image_ready(self, lot_images, image, path, body=None):
+        """Изображение на диске; с обработкой изображений лот ждет и результата пула процессов"""
+        processor = self.parser.image_processor
+        if not path or not processor:
+            self.image_done(lot_images, path)
+            return
+
+        if body is None:
+            with open(path, 'rb') as f:
+                body = f.read()
+        try:
+            future = processor.submit(body, path)
+        except Exception as e:
+            # Пул процессов сломан или закрывается - изображение остается без метаданных
+            self.parser.run_log.warning('image_error', "❌ Ошибка обработки изображения %s: %s", path, e,
+                                       path=str(path), error=str(e))
+            self.image_done(lot_images, path)
+            return
+        # Счетчик - до add_done_callback: у готовой future колбэк вызывается сразу
+        with self.lock:
+            self.post_processing += 1
+        future.add_done_callback(lambda future: self.post_processing_done(future, lot_images, image, path))
+
+    def post_processing_done(self, future, lot_images, image, path):
+        try:
+            metadata = future.result()
+            with self.lock:
+                lot_images.metadata[image['image_index']] = metadata
+        except Exception as e:
+            self.parser.run_log.warning('image_error', "❌ Ошибка обработки изображения %s: %s", path, e,
+                                       path=str(path), error=str(e))
+        finally:
+            self.image_done(lot_images, path)
+            with self.lock:
+                self.post_processing -= 1
+                self.post_processed.notify_all()
+
+    def image_done(self, lot_images, path):
+        with self.lock:
+            if path:
+                lot_images.paths.append(str(path))
+            lot_images.remaining -= 1
+            finished = lot_images.remaining == 0
+        if finished:
+            self.finish_lot(lot_images)
+
+    def finish_lot(self, lot_images):
+        lot_number = lot_images.lot_data.get('lot_number', '')
+        if lot_images.metadata:
+            self.parser.apply_image_metadata(lot_images.lot_data, lot_images.metadata)
+        if lot_images.total:
+            self.parser.log("📷 Скачано %s/%s изображений для лота #%s", len(lot_images.paths), lot_images.total, lot_number)
+        try:
+            if lot_images.on_complete:
+                lot_images.on_complete(lot_images.lot_data, lot_images.paths)
+        except Exception as e:
+            self.parser.run_log.error('lot_error', "❌ Ошибка обработки лота #%s после загрузки изображений: %s", lot_number, e,
+                                      lot_number=lot_number, error=str(e))
+        finally:
+            lot_images.done.set()
+
+    def close(self):
+        """Дождаться загрузки и обработки всей очереди и остановить потоки"""
+        self.tasks.join()
+        with self.lock:
+            self.post_processed.wait_for(lambda: self.post_processing == 0)
+        for _ in self.workers:
+            self.tasks.put(None)
+        for worker in self.workers:
+            worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
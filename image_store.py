@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Хранилище изображений по содержимому: один файл на картинку для всех запусков
+"""
+
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+
+class ImageStore:
+    """Файлы blobs/ab/<sha256>.<ext> + индекс URL -> sha256 в SQLite
+
+    Изображения в папках лотов - жесткие ссылки на файлы хранилища (если
+    жесткая ссылка невозможна, например на другом диске, - символическая,
+    иначе копия), поэтому повторный парсинг того же аукциона не занимает
+    места. URL изображений Tennants версионированы (?v=...), и известный URL
+    берется из хранилища без запроса к сайту.
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = Path(store_dir)
+        self.blobs_dir = self.store_dir / "blobs"
+        self.blobs_dir.mkdir(parents=True, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(self.store_dir / "index.sqlite3", check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS images (
+                url TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                ext TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at TEXT NOT NULL
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS images_sha256 ON images(sha256)")
+        self.db.commit()
+
+        self.stats = {'linked': 0, 'added': 0, 'deduplicated': 0, 'bytes_saved': 0}
+
+    def blob_path(self, digest, ext):
+        return self.blobs_dir / digest[:2] / f"{digest}{ext}"
+
+    def lookup(self, url):
+        """Файл хранилища для URL или None"""
+        with self.lock:
+            row = self.db.execute("SELECT sha256, ext FROM images WHERE url = ?", (url,)).fetchone()
+        if not row:
+            return None
+        blob = self.blob_path(*row)
+        return blob if blob.exists() else None
+
+    def link_into(self, url, filepath):
+        """Изображение известного URL в папку лота без загрузки; False - URL не в хранилище"""
+        blob = self.lookup(url)
+        if blob is None:
+            return False
+        self.place(blob, filepath)
+        self.count('linked')
+        self.count('bytes_saved', blob.stat().st_size)
+        return True
+
+    def add(self, url, filepath, body=None):
+        """Скачанный файл - в хранилище; одинаковое содержимое хранится один раз
+
+        body - байты файла, если они уже в памяти (тогда файл не перечитывается)
+        """
+        digest = hashlib.sha256()
+        if body is not None:
+            digest.update(body)
+        else:
+            with open(filepath, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+        digest = digest.hexdigest()
+        blob = self.blob_path(digest, filepath.suffix)
+        size = filepath.stat().st_size
+
+        if blob.exists():
+            # Та же картинка под другим URL - файл лота заменяем ссылкой на хранилище
+            self.place(blob, filepath)
+            self.count('deduplicated')
+            self.count('bytes_saved', size)
+        else:
+            blob.parent.mkdir(exist_ok=True)
+            try:
+                os.link(filepath, blob)
+            except FileExistsError:
+                pass
+            except OSError:
+                tmp_blob = blob.with_name(f"{blob.name}.{threading.get_ident()}.part")
+                shutil.copyfile(filepath, tmp_blob)
+                os.replace(tmp_blob, blob)
+            self.count('added')
+
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO images (url, sha256, ext, size, stored_at) VALUES (?, ?, ?, ?, ?)",
+                (url, digest, filepath.suffix, size, datetime.now().isoformat())
+            )
+            self.db.commit()
+        return digest
+
+    def place(self, blob, filepath):
+        """Атомарная ссылка на файл хранилища под именем filepath"""
+        tmp_path = filepath.with_name(f"{filepath.name}.{threading.get_ident()}.part")
+        try:
+            os.link(blob, tmp_path)
+        except OSError:
+            try:
+                os.symlink(blob.resolve(), tmp_path)
+            except OSError:
+                shutil.copyfile(blob, tmp_path)
+        os.replace(tmp_path, filepath)
+
+    def count(self, stat, value=1):
+        with self.lock:
+            self.stats[stat] += value
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
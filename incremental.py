@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Инкрементальный повторный обход: отпечатки страниц лотов и журнал изменений
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import lxml.html
+
+# Маркер лота, страница которого не изменилась с прошлого обхода
+UNCHANGED = object()
+
+# Области страницы лота, от которых зависят извлекаемые поля
+FINGERPRINT_XPATHS = [
+    "//h4[contains(concat(' ', normalize-space(@class), ' '), ' auction-title ')]",
+    "//span[contains(concat(' ', normalize-space(@class), ' '), ' lot-number ')]",
+    "//h1[contains(@class, 'lot-title')]/@class",
+    "//div[contains(concat(' ', normalize-space(@class), ' '), ' lot-desc ')]",
+    "//img[@id='lot-image']/@src",
+    "//div[contains(concat(' ', normalize-space(@class), ' '), ' estimate ')]",
+    "//div[contains(concat(' ', normalize-space(@class), ' '), ' buyers-premium ')]",
+    "//div[@id='condition']",
+    # Результаты торгов появляются после аукциона
+    "//*[contains(@class, 'sold') or contains(@class, 'hammer') or contains(@class, 'lot-status')]",
+]
+
+# Поля, изменения которых попадают в журнал
+TRACKED_FIELDS = [
+    'lot_number',
+    'lot_description',
+    'lot_estimate',
+    'lot_sold_price',
+    'lot_status',
+    'buyer_premium',
+    'condition_report',
+    'image_url',
+    'additional_images_count',
+]
+
+
+def lot_fingerprint(html):
+    """SHA-1 значимых областей страницы лота (без рекламы, счетчиков и т.п.)"""
+    tree = lxml.html.fromstring(html)
+    digest = hashlib.sha1()
+    for xpath in FINGERPRINT_XPATHS:
+        for node in tree.xpath(xpath):
+            digest.update(xpath.encode('utf-8'))
+            if isinstance(node, str):
+                digest.update(node.encode('utf-8'))
+            else:
+                digest.update(lxml.html.tostring(node, encoding='utf-8'))
+    return digest.hexdigest()
+
+
+class IncrementalState:
+    """Отпечатки и ключевые поля лотов одного аукциона между обходами"""
+
+    def __init__(self, state_dir, auction_id):
+        self.state_dir = Path(state_dir)
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        self.auction_id = auction_id or "unknown"
+        self.state_file = self.state_dir / f"auction_{self.auction_id}.json"
+        self.changes_file = self.state_dir / f"auction_{self.auction_id}_changes.jsonl"
+        self.run_started_at = datetime.now().isoformat()
+        self.lots = {}
+        # Новые версии лотов до записи их строк в вывод (confirm)
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.dirty = False
+
+        if self.state_file.exists():
+            with open(self.state_file, encoding='utf-8') as f:
+                self.lots = json.load(f).get('lots', {})
+
+    @staticmethod
+    def auction_id_from_url(url):
+        match = re.search(r'au=(\d+)', url)
+        return match.group(1) if match else ""
+
+    def is_unchanged(self, lot_id, fingerprint):
+        known = self.lots.get(lot_id)
+        return bool(known) and known['fingerprint'] == fingerprint and not known.get('withdrawn')
+
+    def record(self, lot_data):
+        """Запись журнала изменений для новой версии лота
+
+        Отпечаток сохраняется только после confirm - когда строка лота записана;
+        иначе лот с несохраненной строкой в следующий раз считался бы неизмененным.
+        """
+        lot_id = lot_data.get('lot_system_id', '')
+        fields = {field: lot_data.get(field, '') for field in TRACKED_FIELDS}
+        with self.lock:
+            previous = self.lots.get(lot_id)
+
+        change = {
+            'run': self.run_started_at,
+            'change': 'new' if not previous or previous.get('withdrawn') else 'changed',
+            'lot_system_id': lot_id,
+            'lot_number': lot_data.get('lot_number', ''),
+            'lot_url': lot_data.get('url', ''),
+        }
+        if previous and not previous.get('withdrawn'):
+            change['fields'] = {
+                field: {'old': previous['fields'].get(field, ''), 'new': value}
+                for field, value in fields.items()
+                if str(previous['fields'].get(field, '')) != str(value)
+            }
+
+        with self.lock:
+            self.pending[lot_id] = {
+                'fingerprint': lot_data.get('content_fingerprint', ''),
+                'fields': fields,
+                'updated_at': lot_data.get('timestamp', self.run_started_at),
+            }
+        return change
+
+    def confirm(self, lot_ids):
+        """Строки лотов записаны в вывод - их новые версии становятся состоянием"""
+        with self.lock:
+            for lot_id in lot_ids:
+                known = self.pending.pop(lot_id, None)
+                if known is not None:
+                    self.lots[lot_id] = known
+                    self.dirty = True
+
+    def mark_withdrawn(self, current_lot_ids):
+        """Лоты из прошлого обхода, которых больше нет в каталоге"""
+        changes = []
+        for lot_id, known in self.lots.items():
+            if lot_id not in current_lot_ids and not known.get('withdrawn'):
+                known['withdrawn'] = True
+                changes.append({
+                    'run': self.run_started_at,
+                    'change': 'withdrawn',
+                    'lot_system_id': lot_id,
+                    'lot_number': known['fields'].get('lot_number', ''),
+                })
+        if changes:
+            self.dirty = True
+        return changes
+
+    def log_changes(self, changes):
+        """Дописывает изменения в журнал аукциона (JSON Lines)"""
+        if not changes:
+            return
+        with open(self.changes_file, 'a', encoding='utf-8') as f:
+            for change in changes:
+                f.write(json.dumps(change, ensure_ascii=False) + "\n")
+
+    def save(self):
+        """Атомарная запись состояния (только если что-то изменилось)"""
+        if not self.dirty:
+            return
+        tmp_file = self.state_file.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'auction_id': self.auction_id, 'saved_at': datetime.now().isoformat(), 'lots': self.lots},
+                      f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.state_file)
+        self.dirty = False
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Результаты потока лотов FullAuctionParser.iter_lots и подключаемые потребители (sinks)
+"""
+
+import threading
+from collections import namedtuple
+from concurrent.futures import Future
+
+from image_scheduler import ImageDownloadScheduler
+
+# Статусы результата
+PARSED = 'parsed'
+UNCHANGED_STATUS = 'unchanged'
+ERROR = 'error'
+
+# lot - запись каталога ({'id', 'url', ...}); lot_data - извлеченные поля (None без извлечения);
+# change - 'new' / 'changed' в инкрементальном режиме
+LotResult = namedtuple('LotResult', ['lot', 'lot_data', 'status', 'change', 'error'], defaults=(None, None))
+
+
+class LotSink:
+    """Потребитель результатов iter_lots
+
+    Методы вызываются в потоке iter_lots по порядку лотов, до того как
+    результат получит вызывающий код; исключение в on_lot делает результат
+    ошибкой. Если лот обрабатывается позже (ImageSink), on_lot возвращает
+    concurrent.futures.Future: iter_lots отдает результат только после ее
+    завершения, а исключение в ней тоже делает результат ошибкой.
+    close(completed) вызывается и при прерывании обхода.
+    """
+
+    def open(self, parser, lots, engine):
+        self.parser = parser
+
+    def on_lot(self, result):
+        pass
+
+    def close(self, completed):
+        pass
+
+
+class ImageSink(LotSink):
+    """Изображения лотов через общую очередь ImageDownloadScheduler
+
+    Парсинг следующих лотов идет, пока изображения качаются в фоне. Лот
+    передается в downstream (например, StorageSink), только когда все его
+    изображения на диске, - сохраненный лот не остается без изображений
+    при продолжении после сбоя. Порядок лотов в downstream - как в on_lot:
+    лот, изображения которого скачались раньше, ждет предыдущих. on_lot
+    возвращает Future, завершенную после downstream (с его исключением).
+    Асинхронный движок скачивает изображения сам в окне загрузки, и лот
+    передается дальше сразу.
+    """
+
+    downloads_images = True
+
+    def __init__(self, downstream=(), **scheduler_options):
+        self.downstream = list(downstream)
+        self.scheduler_options = scheduler_options
+        self.downstream_lock = threading.Lock()
+
+    def open(self, parser, lots, engine):
+        super().open(parser, lots, engine)
+        for sink in self.downstream:
+            sink.open(parser, lots, engine)
+        self.scheduler = None if engine is not None else ImageDownloadScheduler(parser, **self.scheduler_options)
+        # Буфер восстановления порядка: номер лота в on_lot -> готовый результат
+        self.submitted = 0
+        self.passed = 0
+        self.ready = {}
+
+    def on_lot(self, result):
+        if self.scheduler is None:
+            self.pass_downstream(result)
+            return
+
+        sequence = self.submitted
+        self.submitted += 1
+        future = Future()
+        if result.status != PARSED:
+            self.lot_ready(sequence, result, future)
+            return future
+        try:
+            self.scheduler.submit_lot(result.lot_data,
+                                      on_complete=lambda lot_data, paths: self.lot_ready(sequence, result, future))
+        except Exception:
+            # Лот не попал в очередь - его место в порядке освобождается
+            self.lot_ready(sequence, None, future)
+            raise
+        return future
+
+    def lot_ready(self, sequence, result, future):
+        """Лот готов (None - пропущен); вызывается и из потоков загрузки"""
+        with self.downstream_lock:
+            self.ready[sequence] = (result, future)
+            while self.passed in self.ready:
+                result, future = self.ready.pop(self.passed)
+                self.passed += 1
+                if result is None:
+                    continue
+                try:
+                    for sink in self.downstream:
+                        sink.on_lot(result)
+                except Exception as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+
+    def pass_downstream(self, result):
+        with self.downstream_lock:
+            for sink in self.downstream:
+                sink.on_lot(result)
+
+    def close(self, completed):
+        try:
+            if self.scheduler:
+                self.scheduler.close()
+        finally:
+            for sink in self.downstream:
+                sink.close(completed)
+
+
+class StorageSink(LotSink):
+    """Запись лотов в вывод парсера (CSV / Parquet / SQLite) с контрольными точками"""
+
+    def on_lot(self, result):
+        if result.status == PARSED:
+            lot_data = result.lot_data
+            self.parser.save_lot_data(lot_data, lot_key=lot_data.get('lot_system_id') or result.lot['id'])
+
+    def close(self, completed):
+        self.parser.close_lot_writer()
+
+
+class ConsoleSink(LotSink):
+    """Журнал обработки лотов (parser.run_log): краткая запись на лот и прогресс
+
+    Полная проверка заполненности полей печатается только для лотов из
+    выборки run_log.detail (или на уровне debug); статистика полей
+    считается для всех лотов.
+    """
+
+    def open(self, parser, lots, engine):
+        super().open(parser, lots, engine)
+        self.total = len(lots)
+        self.seen = 0
+        self.success_count = 0
+        self.error_count = 0
+
+    def on_lot(self, result):
+        self.seen += 1
+        lot, lot_data = result.lot, result.lot_data
+        run_log = self.parser.run_log
+
+        if result.status == PARSED:
+            self.success_count += 1
+            lot_number = lot_data.get('lot_number', lot['id'])
+
+            # 🔍 ПРОВЕРЯЕМ ЗАПОЛНЕННОСТЬ ПОЛЕЙ
+            check = self.parser.check_lot_fields(lot_data)
+            if run_log.detail(lot['id']):
+                self.parser.print_lot_fields_report(lot_number, check)
+
+            missing = check['missing_required']
+            run_log.info('lot', "%s Лот #%s: %.60s | %s | полей %d/%d",
+                         "⚠️" if missing else "✅", lot_number, lot_data.get('lot_description', ''),
+                         lot_data.get('lot_estimate') or 'N/A', check['filled'], check['required'],
+                         auction_id=lot_data.get('auction_id', ''), lot_id=lot['id'], lot_number=lot_number, status=result.status,
+                         estimate=lot_data.get('lot_estimate', ''), fields_filled=check['filled'],
+                         missing=missing)
+
+        elif result.status == ERROR:
+            self.error_count += 1
+            run_log.error('lot', "❌ Ошибка парсинга лота %s", lot['id'], lot_id=lot['id'], status=result.status,
+                          error=result.error)
+
+        else:
+            run_log.debug('lot', "⏸️ Лот %s без изменений", lot['id'], lot_id=lot['id'], status=result.status)
+
+        # Прогресс
+        # В потоковом режиме (low_memory) число лотов - оценка и может быть превышено
+        total = max(self.total, self.seen)
+        if self.seen % 10 == 0 or self.seen == self.total:
+            run_log.info('progress', "📊 ПРОГРЕСС: %d/%d (%.1f%%), успешно %d, ошибок %d",
+                         self.seen, total, self.seen / total * 100, self.success_count, self.error_count,
+                         seen=self.seen, total=total, parsed=self.success_count, errors=self.error_count)
+
+
+class QueueSink(LotSink):
+    """Передача результатов в queue.Queue другого потребителя
+
+    put блокируется на заполненной очереди (maxsize), и обход ждет потребителя.
+    После обхода в очередь кладется None.
+    """
+
+    def __init__(self, queue, statuses=(PARSED,)):
+        self.queue = queue
+        self.statuses = statuses
+
+    def on_lot(self, result):
+        if result.status in self.statuses:
+            self.queue.put(result)
+
+    def close(self, completed):
+        self.queue.put(None)
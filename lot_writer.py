@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Буферизованная запись лотов: CSV, открытый на весь запуск, и общая основа для других хранилищ
+"""
+
+import csv
+import io
+import threading
+import time
+
+
+class BufferedLotWriter:
+    """Записи копятся в памяти и пишутся в хранилище пачками
+
+    Буфер сбрасывается при max_rows записей или max_bytes символов, раз в
+    flush_interval секунд (фоновым потоком) и при close(). После записи пачки
+    вызывается on_flush(keys) - там парсер фиксирует контрольную точку,
+    поэтому лот считается сохраненным только когда он уже в хранилище.
+    Все методы можно вызывать из нескольких потоков.
+
+    Наследники реализуют buffer_record (возвращает размер записи),
+    write_batch (запись буфера) и close_output.
+    """
+
+    def __init__(self, max_rows=200, max_bytes=1024 * 1024, flush_interval=5.0, on_flush=None):
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+
+        self.pending_keys = []
+        self.pending_size = 0
+        self.last_flush = time.monotonic()
+        self.rows_written = 0
+        # Metrics парсера (задается после создания): время записи пачек
+        self.metrics = None
+
+        self.lock = threading.RLock()
+        self.closed = threading.Event()
+        self.flusher = None
+
+    def start_flusher(self):
+        if self.flush_interval:
+            self.flusher = threading.Thread(target=self.flush_periodically, name="lot-writer-flusher", daemon=True)
+            self.flusher.start()
+
+    def buffer_record(self, record):
+        raise NotImplementedError
+
+    def write_batch(self):
+        raise NotImplementedError
+
+    def close_output(self):
+        pass
+
+    def write(self, record, key=None):
+        with self.lock:
+            if self.closed.is_set():
+                raise ValueError(f"Вывод уже закрыт: {self}")
+            self.pending_size += self.buffer_record(record)
+            self.pending_keys.append(key)
+            if len(self.pending_keys) >= self.max_rows or self.pending_size >= self.max_bytes:
+                self.flush()
+
+    def flush(self):
+        """Запись накопленного буфера в хранилище"""
+        with self.lock:
+            self.last_flush = time.monotonic()
+            if not self.pending_keys:
+                return
+            started_at = time.perf_counter()
+            self.write_batch()
+            if self.metrics:
+                self.metrics.observe('output_flush', time.perf_counter() - started_at)
+            self.pending_size = 0
+
+            keys = self.pending_keys
+            self.pending_keys = []
+            self.rows_written += len(keys)
+            if self.on_flush:
+                self.on_flush(keys)
+
+    def flush_periodically(self):
+        while not self.closed.wait(self.flush_interval / 2):
+            if time.monotonic() - self.last_flush >= self.flush_interval:
+                self.flush()
+
+    def close(self):
+        with self.lock:
+            if self.closed.is_set():
+                return
+            self.flush()
+            self.closed.set()
+            self.close_output()
+        if self.flusher:
+            self.flusher.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class BufferedCSVWriter(BufferedLotWriter):
+    """CSV, открытый один раз на запуск; to_row(record) превращает lot_data в строку CSV"""
+
+    def __init__(self, path, max_rows=200, max_bytes=1024 * 1024, flush_interval=5.0, on_flush=None, to_row=None):
+        super().__init__(max_rows, max_bytes, flush_interval, on_flush)
+        self.path = path
+        self.to_row = to_row
+
+        self.file = open(path, 'a', newline='', encoding='utf-8')
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+        self.start_flusher()
+
+    def __str__(self):
+        return str(self.path)
+
+    def buffer_record(self, record):
+        row = self.to_row(record) if self.to_row else record
+        return self.writer.writerow(row)
+
+    def write_batch(self):
+        self.file.write(self.buffer.getvalue())
+        self.file.flush()
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+
+    def close_output(self):
+        self.file.close()
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Извлечение данных лота через lxml за один проход по дереву страницы
+
+Правила выбора элементов повторяют BeautifulSoup-версию extract_lot_data_bs4
+(первый подходящий элемент в порядке документа, get_text(strip=True) без
+script/style/template), а значения полей обрабатываются теми же функциями
+field_extractors, поэтому lot_data получается тем же самым.
+"""
+
+import re
+from datetime import datetime
+
+import lxml.html
+from bs4 import BeautifulSoup
+from bs4.dammit import UnicodeDammit
+
+import field_extractors
+
+# Строки внутри этих тегов BeautifulSoup не считает текстом страницы
+NON_TEXT_TAGS = {'script', 'style', 'template', 'rt', 'rp'}
+
+AUCTION_SEARCH_HREF = re.compile(r'auction/search\?au=')
+AUCTION_DETAILS_HREF = re.compile(r'auction/details')
+STOCK_MEDIUM_SRC = re.compile(r'stock.*medium')
+LOT_CATEGORY_CLASS = re.compile(r'lot-title.*cat-\d+')
+
+
+def iter_events(root):
+    """('start'|'end', узел) в порядке документа, включая комментарии"""
+    yield 'start', root
+    stack = [(root, iter(root))]
+    while stack:
+        node, children = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            yield 'end', node
+        else:
+            yield 'start', child
+            stack.append((child, iter(child)))
+
+
+def is_element(node):
+    return isinstance(node.tag, str)
+
+
+def class_tokens(node):
+    return node.get('class', '').split()
+
+
+def has_class(node, name):
+    tokens = class_tokens(node)
+    return name in tokens or ' '.join(tokens) == name
+
+
+def class_matches(node, pattern):
+    tokens = class_tokens(node)
+    return any(pattern.search(token) for token in tokens) or bool(tokens and pattern.search(' '.join(tokens)))
+
+
+def element_text(root, strip=True):
+    """Аналог Tag.get_text(strip=...) из BeautifulSoup"""
+    parts = []
+    skipped_depth = 0
+    for event, node in iter_events(root):
+        element = is_element(node)
+        if event == 'start':
+            if element and node.tag in NON_TEXT_TAGS:
+                skipped_depth += 1
+            elif element and node.text and not skipped_depth:
+                parts.append(node.text)
+        else:
+            if element and node.tag in NON_TEXT_TAGS:
+                skipped_depth -= 1
+            if node is not root and node.tail and not skipped_depth:
+                parts.append(node.tail)
+    if strip:
+        return ''.join(part.strip() for part in parts if part.strip())
+    return ''.join(parts)
+
+
+def find_first(root, tag, predicate=None):
+    for node in root.iter(tag):
+        if predicate is None or predicate(node):
+            return node
+    return None
+
+
+class LotPageScan:
+    """Все нужные extract_lot_data элементы и текст страницы за один обход"""
+
+    SINGLE_TARGETS = {
+        'auction_h4': ('h4', lambda node: has_class(node, 'auction-title')),
+        'auction_tab': ('div', lambda node: node.get('id') == 'auctiondetails'),
+        'breadcrumb': ('ol', lambda node: has_class(node, 'breadcrumb')),
+        'append_text': ('input', lambda node: node.get('id') == 'AppendText'),
+        'lot_number_span': ('span', lambda node: has_class(node, 'lot-number')),
+        'h3_lot': ('h3', lambda node: has_class(node, 'lot-a-t')),
+        'title': ('title', None),
+        'lot_desc': ('div', lambda node: has_class(node, 'lot-desc')),
+        'meta_description': ('meta', lambda node: node.get('name') == 'description'),
+        'lot_image': ('img', lambda node: node.get('id') == 'lot-image'),
+        'main_image': ('img', lambda node: has_class(node, 'main-image')),
+        'stock_medium_image': ('img', lambda node: node.get('src') is not None and bool(STOCK_MEDIUM_SRC.search(node.get('src')))),
+        'estimate': ('div', lambda node: has_class(node, 'estimate')),
+        'buyers_premium': ('div', lambda node: has_class(node, 'buyers-premium')),
+        'condition': ('div', lambda node: node.get('id') == 'condition'),
+        'category_h1': ('h1', lambda node: class_matches(node, LOT_CATEGORY_CLASS)),
+    }
+
+    def __init__(self, root):
+        self.found = {}
+        self.options = []
+        text_parts = []
+        skipped_depth = 0
+
+        targets_by_tag = {}
+        for name, (tag, predicate) in self.SINGLE_TARGETS.items():
+            targets_by_tag.setdefault(tag, []).append((name, predicate))
+
+        for event, node in iter_events(root):
+            element = is_element(node)
+            if event == 'start':
+                if not element:
+                    continue
+                tag = node.tag
+                for name, predicate in targets_by_tag.get(tag, ()):
+                    if name not in self.found and (predicate is None or predicate(node)):
+                        self.found[name] = node
+                if tag == 'option':
+                    self.options.append(node)
+                if tag in NON_TEXT_TAGS:
+                    skipped_depth += 1
+                elif node.text and not skipped_depth:
+                    text_parts.append(node.text)
+            else:
+                if element and node.tag in NON_TEXT_TAGS:
+                    skipped_depth -= 1
+                if node is not root and node.tail and not skipped_depth:
+                    text_parts.append(node.tail)
+
+        self.page_text = ''.join(text_parts)
+
+    def get(self, name):
+        return self.found.get(name)
+
+
+def parse_html(html):
+    """Дерево lxml из bytes/str с той же кодировкой, что выбирает BeautifulSoup"""
+    if isinstance(html, bytes):
+        html = UnicodeDammit(html, is_html=True).unicode_markup
+    return lxml.html.document_fromstring(html)
+
+
+def extract_lot_data_lxml(parser, lot_url, html):
+    """Данные лота (тот же словарь, что у FullAuctionParser.extract_lot_data_bs4)"""
+    with parser.timer('lxml_parse'):
+        root = parse_html(html)
+    scan = LotPageScan(root)
+    exact_page_text = None
+    # libxml2 заменяет \r\n на \n, html.parser оставляет как есть
+    has_carriage_returns = ('\r' in html) if isinstance(html, str) else (b'\r' in html)
+    page_text = scan.page_text
+
+    def fallback_page_text():
+        # Текст страницы у html.parser и libxml2 отличается только пробелами до <html>
+        # и после </html>; если совпадение может их захватить - берем текст bs4
+        nonlocal exact_page_text
+        if exact_page_text is None:
+            soup = BeautifulSoup(html, 'html.parser')
+            exact_page_text = soup.get_text()
+            soup.decompose()
+        return exact_page_text
+
+    lot_data = {}
+    lot_data['url'] = lot_url
+    lot_data['timestamp'] = datetime.now().isoformat()
+
+    lot_data['auction_id'], lot_data['lot_system_id'] = field_extractors.lot_url_ids(lot_url)
+
+    # Название аукциона
+    auction_title = ""
+    auction_h4 = scan.get('auction_h4')
+    if auction_h4 is not None:
+        auction_link = find_first(auction_h4, 'a')
+        if auction_link is not None:
+            auction_title = element_text(auction_link).replace('&amp;', '&')
+
+    if not auction_title:
+        auction_tab = scan.get('auction_tab')
+        if auction_tab is not None:
+            auction_link = find_first(auction_tab, 'a', lambda node: node.get('href') is not None and bool(AUCTION_SEARCH_HREF.search(node.get('href'))))
+            if auction_link is not None:
+                auction_title = element_text(auction_link).replace('&amp;', '&')
+
+    if not auction_title:
+        breadcrumb = scan.get('breadcrumb')
+        if breadcrumb is not None:
+            auction_link = find_first(breadcrumb, 'a', lambda node: node.get('href') is not None and bool(AUCTION_DETAILS_HREF.search(node.get('href'))))
+            if auction_link is not None:
+                auction_title = element_text(auction_link)
+
+    if not auction_title:
+        append_text_input = scan.get('append_text')
+        if append_text_input is not None:
+            auction_title = field_extractors.auction_title_from_append_text(append_text_input.get('value', ''))
+
+    lot_data['auction_title'] = auction_title
+
+    # Дата аукциона
+    lot_data['auction_date'] = field_extractors.auction_year(page_text)
+
+    # Номер лота
+    lot_number = ""
+    lot_number_span = scan.get('lot_number_span')
+    if lot_number_span is not None:
+        lot_number = field_extractors.lot_number_from_text(element_text(lot_number_span))
+
+    if not lot_number:
+        h3_lot = scan.get('h3_lot')
+        if h3_lot is not None:
+            lot_number = element_text(h3_lot)
+
+    if not lot_number:
+        title_tag = scan.get('title')
+        if title_tag is not None:
+            lot_number = field_extractors.lot_number_from_text(element_text(title_tag))
+
+    lot_data['lot_number'] = lot_number
+    lot_data['lot_title'] = lot_number
+
+    # Описание лота
+    lot_description = ""
+    lot_desc_div = scan.get('lot_desc')
+    if lot_desc_div is not None:
+        paragraphs = list(lot_desc_div.iter('p'))
+        # iter() включает сам элемент, find_all - только потомков
+        paragraphs = [p for p in paragraphs if p is not lot_desc_div]
+        if paragraphs:
+            desc_parts = []
+            for p in paragraphs:
+                text = element_text(p)
+                if text:
+                    desc_parts.append(text)
+            lot_description = ' '.join(desc_parts)
+        else:
+            lot_description = element_text(lot_desc_div)
+
+    if not lot_description:
+        meta_desc = scan.get('meta_description')
+        if meta_desc is not None:
+            lot_description = field_extractors.description_from_meta(meta_desc.get('content', ''))
+
+    lot_data['lot_description'] = lot_description
+
+    # Основное изображение
+    main_img = scan.get('lot_image')
+    if main_img is None:
+        main_img = scan.get('main_image')
+    if main_img is None:
+        main_img = scan.get('stock_medium_image')
+    lot_data.update(field_extractors.image_fields(main_img.get('src', '') if main_img is not None else ''))
+
+    # Оценочная стоимость
+    estimate_text = ""
+    estimate_div = scan.get('estimate')
+    if estimate_div is not None:
+        estimate_text = field_extractors.clean_estimate(element_text(estimate_div))
+
+    if not estimate_text:
+        estimate_match = field_extractors.ESTIMATE_TEXT_PATTERN.search(page_text)
+        if has_carriage_returns or (estimate_match and estimate_match.end() == len(page_text)):
+            estimate_text = field_extractors.estimate_from_text(fallback_page_text())
+        elif estimate_match:
+            estimate_text = field_extractors.estimate_from_text(page_text)
+
+    lot_data['lot_estimate'] = estimate_text
+
+    lot_data['lot_sold_price'] = ""
+    lot_data['lot_status'] = ""
+
+    # Комиссия покупателя
+    premium_text = ""
+    premium_div = scan.get('buyers_premium')
+    if premium_div is not None:
+        premium_text = field_extractors.premium_from_text(element_text(premium_div))
+
+    if not premium_text:
+        premium_text = field_extractors.premium_from_text(page_text) or field_extractors.DEFAULT_BUYER_PREMIUM
+
+    lot_data['buyer_premium'] = premium_text
+
+    # Отчет о состоянии
+    condition_report = ""
+    condition_tab = scan.get('condition')
+    if condition_tab is not None:
+        for p in condition_tab.iter('p'):
+            if p is condition_tab:
+                continue
+            text = element_text(p)
+            if field_extractors.is_condition_text(text):
+                condition_report = text
+                break
+
+    if not condition_report:
+        # Совпадение с начала текста может захватить пробелы до <html>
+        condition_match = field_extractors.CONDITION_TEXT_PATTERN.search(page_text)
+        if has_carriage_returns or (condition_match and condition_match.start() == 0):
+            page_text = fallback_page_text()
+        condition_report = field_extractors.condition_report_from_text(page_text)
+
+    lot_data['condition_report'] = condition_report
+
+    # Поля из текста описания
+    parser.extract_description_fields(lot_data)
+
+    # Категория лота
+    lot_category = ""
+    category_h1 = scan.get('category_h1')
+    if category_h1 is not None:
+        lot_category = field_extractors.category_from_classes(class_tokens(category_h1))
+    if not lot_category:
+        for option in scan.options:
+            text = element_text(option)
+            if field_extractors.is_category_option(text):
+                lot_category = text
+                break
+    lot_data['lot_category'] = lot_category
+
+    # Дополнительные изображения из condition report
+    additional_images = []
+    if condition_tab is not None:
+        for img in condition_tab.iter('img'):
+            high_res_url = field_extractors.additional_image_url(img.get('src', ''))
+            if high_res_url:
+                additional_images.append(high_res_url)
+    lot_data['additional_images_count'] = len(additional_images)
+    lot_data['additional_images_urls'] = ' | '.join(additional_images) if additional_images else ""
+
+    # Полная информация о лоте
+    lot_data['full_lot_info'] = field_extractors.full_lot_info(lot_data)
+
+    return lot_data
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Метрики парсера: время стадий, объем загрузки и счетчики - гистограммы, JSON и Prometheus
+"""
+
+import json
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Перцентили в отчетах
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    """Гистограмма с логарифмическими корзинами от lowest до highest
+
+    Память не зависит от числа наблюдений; перцентиль - верхняя граница
+    корзины (точность - шаг growth, по умолчанию 10%), но не больше максимума.
+    """
+
+    def __init__(self, lowest, highest, growth=1.1):
+        steps = math.ceil(math.log(highest / lowest, growth))
+        self.bounds = [lowest * growth ** i for i in range(steps + 1)]
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, q):
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                upper = self.bounds[i] if i < len(self.bounds) else self.max
+                return max(self.min, min(upper, self.max))
+        return self.max
+
+    def snapshot(self):
+        snapshot = {'count': self.count, 'sum': self.sum, 'mean': self.sum / self.count if self.count else None,
+                    'min': self.min, 'max': self.max}
+        for q in QUANTILES:
+            snapshot[f"p{round(q * 100)}"] = self.percentile(q)
+        return snapshot
+
+
+class Metrics:
+    """Потокобезопасный сбор метрик одного запуска (или нескольких парсеров)
+
+    timings - секунды по стадиям (timer / observe), sizes - байты
+    (observe_size), counters - события (increment). snapshot() - словарь с
+    перцентилями и скоростями событий в секунду, write_json() - в файл,
+    serve(port) - текст Prometheus на http://127.0.0.1:<port>/metrics.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timings = {}
+        self.sizes = {}
+        self.counters = {}
+        self.started_at = time.time()
+        self.server = None
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            histogram = self.timings.get(stage)
+            if histogram is None:
+                histogram = self.timings[stage] = Histogram(1e-5, 600)
+            histogram.observe(seconds)
+
+    def observe_size(self, name, size):
+        with self.lock:
+            histogram = self.sizes.get(name)
+            if histogram is None:
+                histogram = self.sizes[name] = Histogram(1, 1 << 30)
+            histogram.observe(size)
+            self.counters[f"{name}_total"] = self.counters.get(f"{name}_total", 0) + size
+
+    def increment(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextmanager
+    def timer(self, stage):
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started_at)
+
+    def snapshot(self):
+        with self.lock:
+            elapsed = time.time() - self.started_at
+            return {
+                'started_at': self.started_at,
+                'elapsed': elapsed,
+                'counters': dict(self.counters),
+                'rates': {name: value / elapsed for name, value in self.counters.items()} if elapsed else {},
+                'timings': {stage: histogram.snapshot() for stage, histogram in sorted(self.timings.items())},
+                'sizes': {name: histogram.snapshot() for name, histogram in sorted(self.sizes.items())},
+            }
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+
+    def print_summary(self, log=None):
+        """Таблица стадий: число, p50/p95/p99, максимум и суммарное время (log - RunLog, иначе в консоль)"""
+        snapshot = self.snapshot()
+        lines = ["\n⏱️ ВРЕМЯ СТАДИЙ (мс): число, p50 / p95 / p99, максимум, всего с"]
+        for stage, timing in snapshot['timings'].items():
+            lines.append(f"   {stage:<28} {timing['count']:>7}  {timing['p50'] * 1000:>9.2f} / {timing['p95'] * 1000:>9.2f} / "
+                         f"{timing['p99'] * 1000:>9.2f}  {timing['max'] * 1000:>9.2f}  {timing['sum']:>8.2f}")
+        for name, size in snapshot['sizes'].items():
+            lines.append(f"   {name:<28} {size['count']:>7}  p50 {size['p50'] / 1024:.1f} КБ, p95 {size['p95'] / 1024:.1f} КБ, "
+                         f"всего {size['sum'] / 1024 / 1024:.1f} МБ")
+        if snapshot['counters']:
+            lines.append("   " + ", ".join(f"{name}: {value} ({snapshot['rates'][name]:.1f}/с)"
+                                           for name, value in sorted(snapshot['counters'].items())))
+        if log is None:
+            print("\n".join(lines))
+        else:
+            log.report('metrics_summary', "\n".join(lines), **snapshot)
+
+    def prometheus_text(self):
+        """Снимок метрик в текстовом формате Prometheus (summary с перцентилями и счетчики)"""
+        snapshot = self.snapshot()
+        lines = []
+        for metric, label, histograms, help_text in (
+                ('tennants_stage_seconds', 'stage', snapshot['timings'], "Время стадии парсинга"),
+                ('tennants_size_bytes', 'name', snapshot['sizes'], "Размер загруженных данных")):
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} summary"]
+            for name, histogram in histograms.items():
+                for q in QUANTILES:
+                    lines.append(f'{metric}{{{label}="{name}",quantile="{q}"}} {histogram[f"p{round(q * 100)}"]}')
+                lines.append(f'{metric}_sum{{{label}="{name}"}} {histogram["sum"]}')
+                lines.append(f'{metric}_count{{{label}="{name}"}} {histogram["count"]}')
+        lines += ["# HELP tennants_events_total События парсинга", "# TYPE tennants_events_total counter"]
+        for name, value in sorted(snapshot['counters'].items()):
+            lines.append(f'tennants_events_total{{event="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1", log=None):
+        """Текущие метрики для Prometheus на http://host:port/metrics (фоновый поток; log - RunLog)"""
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="metrics-server", daemon=True).start()
+        url = f"http://{host}:{self.server.server_address[1]}/metrics"
+        if log is None:
+            print(f"📈 Метрики Prometheus: {url}")
+        else:
+            log.report('metrics_server', "📈 Метрики Prometheus: %s", url, url=url)
+        return self.server
+
+    def stop_serving(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+def timed(metrics, stage):
+    """Таймер стадии; без метрик (metrics=None) ничего не делает"""
+    return metrics.timer(stage) if metrics else nullcontext()
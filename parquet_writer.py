@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Запись лотов в типизированный Parquet (папка-датасет из part-NNNNN.parquet)
+"""
+
+import re
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pyarrow
+import pyarrow.parquet
+
+# Повторяющиеся значения - словарное кодирование
+DICTIONARY_TYPE = pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+
+NUMBER_PATTERN = re.compile(r'\d[\d,]*(?:\.\d+)?')
+
+
+def parse_int(value):
+    value = str(value).strip()
+    return int(value) if value.isdigit() else None
+
+
+def parse_float(value):
+    match = NUMBER_PATTERN.search(str(value))
+    return float(match.group(0).replace(',', '')) if match else None
+
+
+def parse_estimate(text):
+    """'£200 - £250' -> (200.0, 250.0); одно число - нижняя и верхняя граница"""
+    numbers = [float(number.replace(',', '')) for number in NUMBER_PATTERN.findall(str(text))]
+    if not numbers:
+        return None, None
+    return numbers[0], numbers[1] if len(numbers) > 1 else numbers[0]
+
+
+def parse_timestamp(value):
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def text(key):
+    return lambda lot_data: str(lot_data.get(key, '') or '')
+
+
+# Колонки Parquet: (имя, тип, значение из lot_data) - те же, что в CSV, плюс границы оценки
+LOT_SCHEMA_COLUMNS = [
+    ('timestamp', pyarrow.timestamp('us'), lambda lot_data: parse_timestamp(lot_data.get('timestamp'))),
+    ('auction_id', pyarrow.int64(), lambda lot_data: parse_int(lot_data.get('auction_id', ''))),
+    ('auction_title', DICTIONARY_TYPE, text('auction_title')),
+    ('auction_date', DICTIONARY_TYPE, text('auction_date')),
+    ('lot_system_id', pyarrow.int64(), lambda lot_data: parse_int(lot_data.get('lot_system_id', ''))),
+    ('lot_number', pyarrow.string(), text('lot_number')),
+    ('lot_title', pyarrow.string(), text('lot_title')),
+    ('lot_description', pyarrow.string(), text('lot_description')),
+    ('lot_url', pyarrow.string(), text('url')),
+    ('image_url', pyarrow.string(), text('image_url')),
+    ('image_high_res_url', pyarrow.string(), text('image_high_res_url')),
+    ('image_width', pyarrow.int32(), lambda lot_data: parse_int(lot_data.get('image_width', ''))),
+    ('image_height', pyarrow.int32(), lambda lot_data: parse_int(lot_data.get('image_height', ''))),
+    ('image_phash', pyarrow.string(), text('image_phash')),
+    ('image_thumbnail', pyarrow.string(), text('image_thumbnail')),
+    ('additional_images_count', pyarrow.int32(), lambda lot_data: parse_int(lot_data.get('additional_images_count', ''))),
+    ('additional_images_urls', pyarrow.string(), text('additional_images_urls')),
+    ('additional_images_phashes', pyarrow.string(), text('additional_images_phashes')),
+    ('lot_estimate', pyarrow.string(), text('lot_estimate')),
+    ('estimate_low', pyarrow.float64(), lambda lot_data: parse_estimate(lot_data.get('lot_estimate', ''))[0]),
+    ('estimate_high', pyarrow.float64(), lambda lot_data: parse_estimate(lot_data.get('lot_estimate', ''))[1]),
+    ('lot_sold_price', pyarrow.float64(), lambda lot_data: parse_float(lot_data.get('lot_sold_price', ''))),
+    ('lot_status', DICTIONARY_TYPE, text('lot_status')),
+    ('buyer_premium', pyarrow.float64(), lambda lot_data: parse_float(lot_data.get('buyer_premium', ''))),
+    ('condition_report', pyarrow.string(), text('condition_report')),
+    ('dimensions', pyarrow.string(), text('dimensions')),
+    ('materials', DICTIONARY_TYPE, text('materials')),
+    ('period_dating', pyarrow.string(), text('period_dating')),
+    ('artist_maker', pyarrow.string(), text('artist_maker')),
+    ('origin_country', DICTIONARY_TYPE, text('origin_country')),
+    ('lot_category', DICTIONARY_TYPE, text('lot_category')),
+    ('full_lot_info', pyarrow.string(), text('full_lot_info')),
+]
+
+# Результаты обработки изображений - в схеме только с image_metadata=True
+IMAGE_METADATA_COLUMNS = {'image_width', 'image_height', 'image_phash', 'image_thumbnail', 'additional_images_phashes'}
+
+DICTIONARY_COLUMNS = [name for name, column_type, _ in LOT_SCHEMA_COLUMNS if column_type == DICTIONARY_TYPE]
+
+
+def lot_schema_columns(image_metadata=False):
+    return [column for column in LOT_SCHEMA_COLUMNS if image_metadata or column[0] not in IMAGE_METADATA_COLUMNS]
+
+
+class ParquetLotWriter:
+    """Лоты копятся в памяти до row_group_size и пишутся группой строк
+
+    Файл part-NNNNN.parquet закрывается каждые rows_per_file строк и при close();
+    незакрытый файл (без футера) после сбоя не читается, поэтому on_flush(keys)
+    вызывается только для лотов из закрытых файлов, а при продолжении
+    recover() удаляет битые части и собирает lot_system_id из целых.
+    """
+
+    def __init__(self, dataset_dir, row_group_size=5000, rows_per_file=50000, compression='zstd', on_flush=None,
+                 image_metadata=False):
+        self.dataset_dir = Path(dataset_dir)
+        self.dataset_dir.mkdir(parents=True, exist_ok=True)
+        self.row_group_size = row_group_size
+        self.rows_per_file = rows_per_file
+        self.compression = compression
+        self.on_flush = on_flush
+        # Колонки размеров, хэшей и превью изображений - только с их обработкой
+        self.schema_columns = lot_schema_columns(image_metadata)
+        self.schema = pyarrow.schema([(name, column_type) for name, column_type, _ in self.schema_columns])
+
+        self.columns = [[] for _ in self.schema_columns]
+        self.pending_keys = []
+        self.file_keys = []
+        self.file_rows = 0
+        self.rows_written = 0
+        self.writer = None
+        existing_parts = [int(path.stem.split('-')[1]) for path in self.dataset_dir.glob("part-*.parquet")]
+        self.part = max(existing_parts) + 1 if existing_parts else 0
+        self.closed = False
+        self.lock = threading.RLock()
+        # Metrics парсера (задается после создания): время записи групп строк
+        self.metrics = None
+
+    @staticmethod
+    def recover(dataset_dir, log=None):
+        """lot_system_id из целых частей датасета; недописанные части удаляются (log - RunLog)"""
+        completed_ids = set()
+        for path in sorted(Path(dataset_dir).glob("part-*.parquet")):
+            try:
+                table = pyarrow.parquet.read_table(path, columns=['lot_system_id'])
+            except (pyarrow.ArrowInvalid, OSError):
+                if log is None:
+                    print(f"✂️ Удаляем недописанную часть Parquet: {path.name}")
+                else:
+                    log.warning('output_truncated', "✂️ Удаляем недописанную часть Parquet: %s", path.name, path=path)
+                path.unlink()
+                continue
+            completed_ids.update(str(lot_id) for lot_id in table.column('lot_system_id').to_pylist() if lot_id is not None)
+        return completed_ids
+
+    def write(self, lot_data, key=None):
+        with self.lock:
+            if self.closed:
+                raise ValueError(f"Parquet уже закрыт: {self.dataset_dir}")
+            for values, (_, _, value_of) in zip(self.columns, self.schema_columns):
+                values.append(value_of(lot_data))
+            self.pending_keys.append(key if key is not None else lot_data.get('lot_system_id', ''))
+            if len(self.pending_keys) >= self.row_group_size:
+                self.flush()
+
+    def flush(self):
+        """Запись накопленных лотов одной группой строк"""
+        with self.lock:
+            if not self.pending_keys:
+                return
+            started_at = time.perf_counter()
+            if self.writer is None:
+                path = self.dataset_dir / f"part-{self.part:05d}.parquet"
+                self.writer = pyarrow.parquet.ParquetWriter(path, self.schema, compression=self.compression,
+                                                            use_dictionary=DICTIONARY_COLUMNS)
+            table = pyarrow.Table.from_arrays(
+                [pyarrow.array(values, type=column_type) for values, (_, column_type, _) in zip(self.columns, self.schema_columns)],
+                schema=self.schema
+            )
+            self.writer.write_table(table)
+            if self.metrics:
+                self.metrics.observe('output_flush', time.perf_counter() - started_at)
+
+            self.file_rows += len(self.pending_keys)
+            self.file_keys.extend(self.pending_keys)
+            self.columns = [[] for _ in self.schema_columns]
+            self.pending_keys = []
+
+            if self.file_rows >= self.rows_per_file:
+                self.close_part()
+
+    def close_part(self):
+        """Закрытие текущей части - ее лоты теперь на диске целиком"""
+        if self.writer is None:
+            return
+        self.writer.close()
+        self.writer = None
+        self.part += 1
+
+        keys = self.file_keys
+        self.file_keys = []
+        self.file_rows = 0
+        self.rows_written += len(keys)
+        if self.on_flush:
+            self.on_flush(keys)
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.flush()
+            self.close_part()
+            self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
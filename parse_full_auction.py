@@ -10,14 +10,115 @@ import re
 from pathlib import Path
 import csv
 from datetime import datetime
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urljoin, urlparse, urlunparse, parse_qs, urlencode
 import json
+import hashlib
+import os
+import threading
+import asyncio
+from collections import deque
+from contextlib import closing
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
+from metrics import Metrics, timed
+from run_log import RunLog
+from rate_limit import AdaptiveRateLimiter, CircuitBreaker, RateLimiter, ThrottledHTTPAdapter
+from http_cache import HTTPCache, CachingHTTPAdapter
+from incremental import IncrementalState, UNCHANGED, lot_fingerprint
+from lxml_extractor import extract_lot_data_lxml
+from html_archive import HTMLArchive
+from lot_writer import BufferedCSVWriter
+from sqlite_store import SQLiteLotStore
+from image_scheduler import ImageDownloadScheduler
+from image_store import ImageStore
+from image_policy import ImageResolutionPolicy
+from lot_sinks import LotResult, PARSED, UNCHANGED_STATUS, ERROR, ImageSink, StorageSink, ConsoleSink
+import field_extractors
+
+
+class StreamedLots:
+    """Лоты каталога потоком для iter_lots(low_memory=True)
+
+    Итерируется один раз; len() - ожидаемое число лотов для прогресса
+    (по «of N lots» с учетом max_lots и уже сохраненных лотов). По ходу
+    итерации заполняет discovered_ids и run_stats парсера.
+    """
+
+    def __init__(self, parser, lots_iter, first_lot, max_lots=None):
+        self.parser = parser
+        self.lots_iter = lots_iter
+        self.first_lot = first_lot
+        self.max_lots = max_lots
+        self.discovered_ids = set()
+        total = parser.auction_lot_total or 1
+        if max_lots:
+            total = min(total, max_lots)
+        self.expected = max(1, total - len(parser.completed_lot_ids))
+
+    def __len__(self):
+        return self.expected
+
+    def __iter__(self):
+        stats = self.parser.run_stats
+        try:
+            lot = self.first_lot
+            while lot is not None:
+                if self.max_lots and len(self.discovered_ids) >= self.max_lots:
+                    break
+                self.discovered_ids.add(lot['id'])
+                stats['discovered'] = max(stats['discovered'], len(self.discovered_ids))
+                # При продолжении уже сохраненные лоты пропускаются
+                if lot['id'] not in self.parser.completed_lot_ids:
+                    stats['queued'] += 1
+                    yield lot
+                lot = next(self.lots_iter, None)
+        finally:
+            self.lots_iter.close()
+
 
 class FullAuctionParser:
-    def __init__(self, auction_title="", auction_date=""):
+    # Колонки CSV и соответствующие ключи lot_data
+    CSV_COLUMNS = [
+        ('timestamp', 'timestamp'),
+        ('auction_id', 'auction_id'),
+        ('auction_title', 'auction_title'),
+        ('auction_date', 'auction_date'),
+        ('lot_system_id', 'lot_system_id'),
+        ('lot_number', 'lot_number'),
+        ('lot_title', 'lot_title'),
+        ('lot_description', 'lot_description'),
+        ('lot_url', 'url'),
+        ('image_url', 'image_url'),
+        ('image_high_res_url', 'image_high_res_url'),
+        ('image_width', 'image_width'),
+        ('image_height', 'image_height'),
+        ('image_phash', 'image_phash'),
+        ('image_thumbnail', 'image_thumbnail'),
+        ('additional_images_count', 'additional_images_count'),
+        ('additional_images_urls', 'additional_images_urls'),
+        ('additional_images_phashes', 'additional_images_phashes'),
+        ('lot_estimate', 'lot_estimate'),
+        ('lot_sold_price', 'lot_sold_price'),
+        ('lot_status', 'lot_status'),
+        ('buyer_premium', 'buyer_premium'),
+        ('condition_report', 'condition_report'),
+        ('dimensions', 'dimensions'),
+        ('materials', 'materials'),
+        ('period_dating', 'period_dating'),
+        ('artist_maker', 'artist_maker'),
+        ('origin_country', 'origin_country'),
+        ('lot_category', 'lot_category'),
+        ('full_lot_info', 'full_lot_info'),
+    ]
+    # Колонки результатов обработки изображений - в выводе только с image_processing
+    IMAGE_METADATA_COLUMNS = {'image_width', 'image_height', 'image_phash', 'image_thumbnail', 'additional_images_phashes'}
+    
+    # Форматы вывода и расширения файла/папки с данными
+    OUTPUT_EXTENSIONS = {'csv': '.csv', 'parquet': '.parquet', 'sqlite': '.sqlite3'}
+    
+    def __init__(self, auction_title="", auction_date="", http_cache=None, working_dir=None, extractor="bs4",
+                 raw_html_dir=None, html_archive=None, output_format="csv", db_path=None, verbose=True, image_store=None,
+                 image_processing=None, image_policy=None, metrics=True, log=None):
         # 🚀 ОПТИМИЗИРОВАННАЯ СЕССИЯ С ПУЛОМ СОЕДИНЕНИЙ
         self.session = requests.Session()
         
@@ -28,15 +129,27 @@ class FullAuctionParser:
             status_forcelist=[429, 500, 502, 503, 504],
         )
         
-        adapter = HTTPAdapter(
+        adapter_options = dict(
             max_retries=retry_strategy,
             pool_connections=20,  # пул из 20 соединений
             pool_maxsize=20,
             pool_block=False
         )
         
+        # 💾 ДИСКОВЫЙ HTTP-КЭШ (путь к папке или готовый HTTPCache)
+        if isinstance(http_cache, (str, Path)):
+            http_cache = HTTPCache(http_cache)
+        self.http_cache = http_cache
+        
+        # Адаптер с общим бюджетом запросов (RateLimiter задается в parse_auction)
+        if self.http_cache:
+            adapter = CachingHTTPAdapter(self.http_cache, **adapter_options)
+        else:
+            adapter = ThrottledHTTPAdapter(**adapter_options)
+        
         self.session.mount("http://", adapter)
         self.session.mount("https://", adapter)
+        self.http_adapter = adapter
         
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -55,392 +168,696 @@ class FullAuctionParser:
         clean_auction_name = self.clean_filename(auction_title) if auction_title else "Unknown_Auction"
         clean_auction_date = auction_date if auction_date else "Unknown_Date"
         
-        # Создаем уникальное имя папки
+        # Создаем уникальное имя папки (или продолжаем в переданной папке)
         folder_name = f"{clean_auction_name}_{clean_auction_date}_parsed_{parsing_time}"
         
-        self.working_dir = Path(folder_name)
-        self.working_dir.mkdir(exist_ok=True)
-        
+        # 📦 ФОРМАТ ВЫВОДА: CSV, типизированный Parquet (папка-датасет), SQLite
+        # или None - без файлов на диске (только поток iter_lots)
+        if output_format is not None and output_format not in self.OUTPUT_EXTENSIONS:
+            raise ValueError(f"Неизвестный формат вывода: {output_format}")
+        if db_path and output_format != "sqlite":
+            raise ValueError("db_path задается только для output_format='sqlite'")
+        self.output_format = output_format
+        # Колонки размеров, хэшей и превью изображений - только с обработкой изображений
+        self.image_metadata = bool(image_processing)
+        
+        # 📝 ЖУРНАЛ ЗАПУСКА (готовый RunLog: уровень, JSON Lines, выборка диагностики лотов);
+        # без него - краткая запись на лот, verbose=False - только предупреждения и ошибки
+        self.run_log = log or RunLog(level="info" if verbose else "warning")
+        
+        self.working_dir = Path(working_dir) if working_dir else Path(folder_name)
         self.images_dir = self.working_dir / "images"
-        self.images_dir.mkdir(exist_ok=True)
+        self.checkpoint_file = self.working_dir / "checkpoint.json"
+        self.completed_lot_ids = set()
+        self.resumed = False
+        self.db_file = None
+        
+        if output_format is not None:
+            extension = self.OUTPUT_EXTENSIONS[output_format]
+            existing_outputs = sorted(self.working_dir.glob(f"*{extension}"), key=lambda path: path.stat().st_mtime) if self.working_dir.exists() else []
+            self.working_dir.mkdir(exist_ok=True)
+            self.images_dir.mkdir(exist_ok=True)
+            self.resumed = bool(existing_outputs)
+            
+            if db_path:
+                # 🗃️ ОБЩАЯ БАЗА SQLITE ДЛЯ ВСЕХ ЗАПУСКОВ: продолжение - по контрольной точке в папке парсинга
+                self.db_file = Path(db_path)
+                self.db_file.parent.mkdir(parents=True, exist_ok=True)
+                self.resumed = self.checkpoint_file.exists() and self.db_file.exists()
+                if self.resumed:
+                    self.completed_lot_ids = self.recover_output()
+            elif self.resumed:
+                # 🔁 ПРОДОЛЖАЕМ ПРЕРВАННЫЙ ПАРСИНГ В СУЩЕСТВУЮЩЕЙ ПАПКЕ
+                self.db_file = existing_outputs[-1]
+                self.completed_lot_ids = self.recover_output()
+            else:
+                # 🔥 СОЗДАЕМ ИНФОРМАТИВНОЕ ИМЯ ФАЙЛА БАЗЫ ДАННЫХ
+                db_filename = f"{clean_auction_name}_{clean_auction_date}_{parsing_time}{extension}"
+                self.db_file = self.working_dir / db_filename
+            if self.output_format == "csv":
+                self.init_database()
         
-        # 🔥 СОЗДАЕМ ИНФОРМАТИВНОЕ ИМЯ ФАЙЛА БАЗЫ ДАННЫХ
-        db_filename = f"{clean_auction_name}_{clean_auction_date}_{parsing_time}.csv"
-        self.db_file = self.working_dir / db_filename
-        self.init_database()
+        # Буферизованный вывод лотов на время parse_auction (открывается в save_lot_data)
+        self.lot_writer = None
         
         # Статистика заполненности полей
         self.field_stats = {}
         
-        print(f"📁 Создана папка парсинга: {self.working_dir}")
+        # Состояние инкрементального обхода и итоги запуска (задаются в iter_lots)
+        self.incremental_state = None
+        self.run_stats = {}
+
+        
+        # Движок извлечения полей: "bs4" (html.parser) или "lxml" (один проход по дереву)
+        self.extractor = extractor
+        
+        # 🗄️ СЫРЫЕ HTML СТРАНИЦ ЛОТОВ для повторного извлечения без сети (batch_reextract.py)
+        self.raw_html_dir = Path(raw_html_dir) if raw_html_dir else None
+        self.raw_html_lock = threading.Lock()
+        if self.raw_html_dir:
+            self.raw_html_dir.mkdir(parents=True, exist_ok=True)
+        
+        # 🗄️ СЖАТЫЙ АРХИВ СТРАНИЦ ЛОТОВ И АУКЦИОНА (путь к папке или готовый HTMLArchive)
+        if isinstance(html_archive, (str, Path)):
+            html_archive = HTMLArchive(html_archive)
+        self.html_archive = html_archive
+        
+        # 🗃️ ХРАНИЛИЩЕ ИЗОБРАЖЕНИЙ ПО СОДЕРЖИМОМУ (путь к папке или готовый ImageStore):
+        # в папках лотов - ссылки, известные URL не скачиваются повторно
+        if isinstance(image_store, (str, Path)):
+            image_store = ImageStore(image_store)
+        self.image_store = image_store
+        
+        # 🖼️ ОБРАБОТКА ИЗОБРАЖЕНИЙ В ПУЛЕ ПРОЦЕССОВ: размеры, dHash, превью (True или готовый ImagePostProcessor)
+        if image_processing is True:
+            from image_processing import ImagePostProcessor
+            image_processing = ImagePostProcessor()
+        self.image_processor = image_processing or None
+        
+        # 📏 РАЗМЕР ИЗОБРАЖЕНИЙ ПО РОЛИ (small/medium/full) И ЛИМИТЫ БАЙТ
+        self.image_policy = image_policy or ImageResolutionPolicy()
+        
+        # ⏱️ МЕТРИКИ СТАДИЙ (True - свои, готовый Metrics - общие для нескольких парсеров, None - выключены)
+        self.metrics = Metrics() if metrics is True else metrics or None
+        self.http_adapter.metrics = self.metrics
+        
+        if self.resumed:
+            self.run_log.report('run_resume', "🔁 Продолжаем парсинг в папке: %s (уже сохранено лотов: %d)",
+                                self.working_dir, len(self.completed_lot_ids), working_dir=self.working_dir,
+                                completed=len(self.completed_lot_ids))
+        elif output_format is not None:
+            self.run_log.report('run_dir', "📁 Создана папка парсинга: %s", self.working_dir, working_dir=self.working_dir)
+    
+    def timer(self, stage):
+        """Замер времени стадии в self.metrics (без метрик ничего не делает)"""
+        return timed(self.metrics, stage)
+    
+    def log(self, message, *args, level="debug"):
+        """Сообщение о ходе обработки (message % args форматируется, только если уровень включен)"""
+        self.run_log.write(level, 'message', message, *args)
     
-    def clean_filename(self, text):
+    @staticmethod
+    def clean_filename(text):
         """Очистка текста для использования в имени файла/папки"""
         # Убираем специальные символы и заменяем пробелы на подчеркивания
         clean = re.sub(r'[^\w\s-]', '', text)
         clean = re.sub(r'[-\s]+', '_', clean)
         return clean[:50]  # Ограничиваем длину
     
+    @classmethod
+    def offline(cls, extractor="bs4"):
+        """Парсер только для извлечения полей из готового HTML (без сессии, папок и CSV)"""
+        parser = cls.__new__(cls)
+        parser.extractor = extractor
+        parser.incremental_state = None
+        parser.raw_html_dir = None
+        parser.html_archive = None
+        parser.run_log = RunLog(level="warning")
+        parser.metrics = None
+        return parser
+    
+    @classmethod
+    def csv_columns(cls, image_metadata=False):
+        return [column for column in cls.CSV_COLUMNS if image_metadata or column[0] not in cls.IMAGE_METADATA_COLUMNS]
+    
+    @classmethod
+    def csv_headers(cls, image_metadata=False):
+        return [column for column, _ in cls.csv_columns(image_metadata)]
+    
+    @classmethod
+    def csv_row(cls, lot_data, image_metadata=False):
+        return [lot_data.get(key, '') for _, key in cls.csv_columns(image_metadata)]
+    
     def init_database(self):
         """Инициализация CSV базы с правильными полями"""
-        headers = [
-            'timestamp',
-            'auction_id', 
-            'auction_title',
-            'auction_date',
-            'lot_system_id',
-            'lot_number',
-            'lot_title',
-            'lot_description', 
-            'lot_url',
-            'image_url',
-            'image_high_res_url',
-            'additional_images_count',
-            'additional_images_urls',
-            'lot_estimate',
-            'lot_sold_price',
-            'lot_status',
-            'buyer_premium',
-            'condition_report',
-            'dimensions',
-            'materials',
-            'period_dating',
-            'artist_maker',
-            'origin_country',
-            'lot_category',
-            'full_lot_info'
-        ]
+        headers = self.csv_headers(self.image_metadata)
         
         if not self.db_file.exists():
             with open(self.db_file, 'w', newline='', encoding='utf-8') as f:
                 writer = csv.writer(f)
                 writer.writerow(headers)
     
+    @property
+    def run_id(self):
+        """Метка запуска в общей базе SQLite - имя папки парсинга"""
+        return self.working_dir.name
+    
+    def recover_output(self):
+        """Лоты, уже сохраненные в выводе прошлого запуска (недописанное отбрасывается)"""
+        if self.output_format == "parquet":
+            from parquet_writer import ParquetLotWriter
+            return ParquetLotWriter.recover(self.db_file, log=self.run_log)
+        if self.output_format == "sqlite":
+            return SQLiteLotStore.completed_lot_ids(self.db_file, self.run_id)
+        return self.recover_from_checkpoint()
+    
+    def write_checkpoint(self):
+        """Атомарная запись контрольной точки: размер CSV после последнего завершенного лота"""
+        if self.db_file is None:
+            return
+        
+        checkpoint = {
+            'db_file': self.db_file.name,
+            'csv_size': self.db_file.stat().st_size if self.db_file.is_file() else None,
+            'completed_lots': len(self.completed_lot_ids),
+            'updated_at': datetime.now().isoformat(),
+        }
+        
+        tmp_file = self.checkpoint_file.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.checkpoint_file)
+    
+    def recover_from_checkpoint(self):
+        """Восстановление CSV после прерывания: отбрасываем незавершенные и битые строки
+
+        Возвращает множество lot_system_id, которые уже полностью сохранены.
+        """
+        csv_size = None
+        if self.checkpoint_file.exists():
+            try:
+                with open(self.checkpoint_file, encoding='utf-8') as f:
+                    checkpoint = json.load(f)
+                if checkpoint.get('db_file') == self.db_file.name:
+                    csv_size = checkpoint['csv_size']
+            except (ValueError, KeyError) as e:
+                self.run_log.warning('checkpoint_invalid', "⚠️ Контрольная точка повреждена, восстанавливаем по CSV: %s", e,
+                                     error=str(e))
+        
+        # Читаем CSV построчно, запоминая конец последней целой строки
+        consumed = 0
+        valid_end = 0
+        completed_ids = set()
+        
+        with open(self.db_file, 'rb') as f:
+            raw = f.read() if csv_size is None else f.read(csv_size)
+        
+        def lines():
+            # Режем только по \n: переводы строк внутри полей CSV разберет csv.reader
+            nonlocal consumed
+            while consumed < len(raw):
+                end = raw.find(b'\n', consumed)
+                end = len(raw) if end == -1 else end + 1
+                line = raw[consumed:end]
+                consumed = end
+                yield line.decode('utf-8', errors='replace')
+        
+        reader = csv.reader(lines())
+        try:
+            header = next(reader)
+            if 'lot_system_id' in header and consumed and raw[consumed - 1:consumed] == b'\n':
+                valid_end = consumed
+                id_index = header.index('lot_system_id')
+                for row in reader:
+                    # Строка без перевода строки в конце или с другим числом колонок - недописана
+                    if len(row) != len(header) or raw[consumed - 1:consumed] != b'\n':
+                        break
+                    completed_ids.add(row[id_index])
+                    valid_end = consumed
+        except (StopIteration, csv.Error):
+            pass
+        
+        if valid_end < self.db_file.stat().st_size:
+            truncated = self.db_file.stat().st_size - valid_end
+            self.run_log.warning('output_truncated', "✂️ Отбрасываем незавершенные данные CSV: %d байт", truncated,
+                                 path=self.db_file, bytes=truncated)
+            with open(self.db_file, 'r+b') as f:
+                f.truncate(valid_end)
+        
+        # Пустой файл без заголовка пересоздается в init_database
+        if valid_end == 0:
+            self.db_file.unlink()
+        
+        return completed_ids
+    
     def parse_lot_page(self, lot_url):
         """Парсинг страницы лота"""
         try:
-            print(f"🎯 ПАРСИНГ ЛОТА: {lot_url}")
-            
-            response = self.session.get(lot_url, timeout=30)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
+            self.log("🎯 ПАРСИНГ ЛОТА: %s", lot_url)
             
-            # Извлекаем все данные
-            lot_data = {}
-            lot_data['url'] = lot_url
-            lot_data['timestamp'] = datetime.now().isoformat()
+            with self.timer('lot_parse'):
+                html = self.fetch_lot_html(lot_url)
+                return self.process_lot_html(lot_url, html)
             
-            # Auction ID из URL
-            auction_id_match = re.search(r'au=(\d+)', lot_url)
-            lot_data['auction_id'] = auction_id_match.group(1) if auction_id_match else ""
-            
-            # System ID лота из URL
-            lot_id_match = re.search(r'lot=(\d+)', lot_url)
-            lot_data['lot_system_id'] = lot_id_match.group(1) if lot_id_match else ""
-            
-            # Название аукциона из breadcrumb
-            auction_title = ""
-            
-            # 🔥 УЛУЧШЕННОЕ ИЗВЛЕЧЕНИЕ НАЗВАНИЯ АУКЦИОНА
-            # Способ 1: Ищем в H4 с классом auction-title  
-            auction_h4 = soup.find('h4', {'class': 'auction-title'}) or soup.find('H4', {'class': 'auction-title'})
-            if auction_h4:
-                auction_link = auction_h4.find('a')
+        except Exception as e:
+            self.run_log.error('lot_error', "❌ Ошибка парсинга лота: %s", e, url=lot_url, error=str(e))
+            return None
+    
+    def fetch_lot_html(self, lot_url):
+        """Стадия загрузки: HTML страницы лота (копия сохраняется в raw_html_dir / html_archive)"""
+        started_at = time.perf_counter()
+        response = self.session.get(lot_url, timeout=30)
+        response.raise_for_status()
+        if self.metrics:
+            self.record_page_metrics(response, started_at)
+        self.store_raw_html(lot_url, response.content)
+        return response.content
+    
+    def record_page_metrics(self, response, started_at):
+        """Загрузка страницы целиком и тела после заголовков (ответы из HTTP-кэша - без тела)"""
+        finished_at = time.perf_counter()
+        self.metrics.observe('page_fetch', finished_at - started_at)
+        headers_at = getattr(response, 'headers_at', None)
+        if headers_at:
+            self.metrics.observe('page_download', finished_at - headers_at)
+            self.metrics.observe_size('page_bytes', len(response.content))
+    
+    def store_raw_html(self, lot_url, html):
+        """Сохранение загруженной страницы лота в архив и/или папку raw_html_dir"""
+        lot_id_match = re.search(r'lot=(\d+)', lot_url)
+        
+        if self.html_archive:
+            self.html_archive.put(lot_url, html, kind='lot', lot_system_id=lot_id_match.group(1) if lot_id_match else None)
+        
+        if not self.raw_html_dir:
+            return None
+        
+        # Атомарная запись lot_<id>.html и строки в manifest.jsonl
+        lot_key = lot_id_match.group(1) if lot_id_match else hashlib.sha1(lot_url.encode('utf-8')).hexdigest()
+        filepath = self.raw_html_dir / f"lot_{lot_key}.html"
+        
+        tmp_path = filepath.with_name(f"{filepath.name}.{threading.get_ident()}.part")
+        with open(tmp_path, 'wb') as f:
+            f.write(html)
+        os.replace(tmp_path, filepath)
+        
+        entry = {'file': filepath.name, 'url': lot_url, 'fetched_at': datetime.now().isoformat()}
+        with self.raw_html_lock:
+            with open(self.raw_html_dir / "manifest.jsonl", 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return filepath
+    
+    def process_lot_html(self, lot_url, html):
+        """Извлечение данных лота; в инкрементальном режиме неизмененные страницы пропускаются"""
+        if not self.incremental_state:
+            return self.extract_lot_data(lot_url, html)
+        
+        # 🔁 Сравниваем отпечаток значимых областей страницы с прошлым обходом
+        fingerprint = lot_fingerprint(html)
+        lot_id_match = re.search(r'lot=(\d+)', lot_url)
+        if lot_id_match and self.incremental_state.is_unchanged(lot_id_match.group(1), fingerprint):
+            self.log("⏸️ Лот не изменился: %s", lot_url)
+            return UNCHANGED
+        
+        lot_data = self.extract_lot_data(lot_url, html)
+        lot_data['content_fingerprint'] = fingerprint
+        return lot_data
+    
+    def extract_lot_data(self, lot_url, html):
+        """Извлечение данных лота из HTML страницы (без сетевых запросов)"""
+        lot_data = self.extract_lot_fields(lot_url, html)
+        if self.run_log.detail(lot_data.get('lot_system_id', lot_url)):
+            self.print_lot_diagnostics(lot_data)
+        return lot_data
+    
+    def extract_lot_fields(self, lot_url, html):
+        """Поля лота выбранным движком извлечения, без вывода диагностики"""
+        with self.timer('extract_lot'):
+            if self.extractor == "lxml":
+                return extract_lot_data_lxml(self, lot_url, html)
+            return self.extract_lot_data_bs4(lot_url, html)
+    
+    def extract_lot_data_bs4(self, lot_url, html):
+        """Извлечение данных лота через BeautifulSoup (html.parser)"""
+        with self.timer('soup_build'):
+            soup = BeautifulSoup(html, 'html.parser')
+        try:
+            return self.extract_lot_data_soup(lot_url, soup)
+        finally:
+            # Узлы дерева ссылаются друг на друга (parent/children) и без decompose()
+            # живут до прохода сборщика мусора - при concurrency страниц это сотни деревьев
+            soup.decompose()
+    
+    def extract_lot_data_soup(self, lot_url, soup):
+        """Поля лота из готового дерева BeautifulSoup"""
+        # Извлекаем все данные
+        lot_data = {}
+        lot_data['url'] = lot_url
+        lot_data['timestamp'] = datetime.now().isoformat()
+        
+        # Auction ID и System ID лота из URL
+        lot_data['auction_id'], lot_data['lot_system_id'] = field_extractors.lot_url_ids(lot_url)
+        
+        # Название аукциона из breadcrumb
+        auction_title = ""
+        
+        # 🔥 УЛУЧШЕННОЕ ИЗВЛЕЧЕНИЕ НАЗВАНИЯ АУКЦИОНА
+        # Способ 1: Ищем в H4 с классом auction-title  
+        auction_h4 = soup.find('h4', {'class': 'auction-title'}) or soup.find('H4', {'class': 'auction-title'})
+        if auction_h4:
+            auction_link = auction_h4.find('a')
+            if auction_link:
+                auction_title = auction_link.get_text(strip=True)
+                # Убираем HTML entities
+                auction_title = auction_title.replace('&amp;', '&')
+        
+        # Способ 2: Альтернативный поиск в auctiondetails tab
+        if not auction_title:
+            auction_tab = soup.find('div', {'id': 'auctiondetails'})
+            if auction_tab:
+                auction_link = auction_tab.find('a', href=re.compile(r'auction/search\?au='))
+                if auction_link:
+                    auction_title = auction_link.get_text(strip=True).replace('&amp;', '&')
+        
+        # Способ 3: Поиск в breadcrumb (оригинальный метод как резерв)
+        if not auction_title:
+            breadcrumb = soup.find('ol', {'class': 'breadcrumb'}) 
+            if breadcrumb:
+                auction_link = breadcrumb.find('a', href=re.compile(r'auction/details'))
                 if auction_link:
                     auction_title = auction_link.get_text(strip=True)
-                    # Убираем HTML entities
-                    auction_title = auction_title.replace('&amp;', '&')
-            
-            # Способ 2: Альтернативный поиск в auctiondetails tab
-            if not auction_title:
-                auction_tab = soup.find('div', {'id': 'auctiondetails'})
-                if auction_tab:
-                    auction_link = auction_tab.find('a', href=re.compile(r'auction/search\?au='))
-                    if auction_link:
-                        auction_title = auction_link.get_text(strip=True).replace('&amp;', '&')
-            
-            # Способ 3: Поиск в breadcrumb (оригинальный метод как резерв)
-            if not auction_title:
-                breadcrumb = soup.find('ol', {'class': 'breadcrumb'}) 
-                if breadcrumb:
-                    auction_link = breadcrumb.find('a', href=re.compile(r'auction/details'))
-                    if auction_link:
-                        auction_title = auction_link.get_text(strip=True)
-            
-            # Способ 4: Поиск в скрытых полях формы
-            if not auction_title:
-                append_text_input = soup.find('input', {'id': 'AppendText'})
-                if append_text_input:
-                    append_value = append_text_input.get('value', '')
-                    # Извлекаем название аукциона из строки типа "Lot 1 (Antiques & Interiors, to include...)"
-                    match = re.search(r'\(([^,]+,[^)]+)\)', append_value)
-                    if match:
-                        auction_title = match.group(1).replace('&amp;', '&')
-            
-            lot_data['auction_title'] = auction_title
-            
-            # Дата аукциона - ищем в тексте страницы
-            page_text = soup.get_text()
-            year_match = re.search(r'20\d{2}', page_text)
-            lot_data['auction_date'] = year_match.group(0) if year_match else "2025"
-            
-            # 🔥 УЛУЧШЕННОЕ ИЗВЛЕЧЕНИЕ НОМЕРА ЛОТА
-            lot_number = ""
-            # Ищем в span с классом lot-number
-            lot_number_span = soup.find('span', {'class': 'lot-number'})
-            if lot_number_span:
-                lot_text = lot_number_span.get_text(strip=True)
-                lot_match = re.search(r'Lot\s+(\d+)', lot_text)
-                if lot_match:
-                    lot_number = lot_match.group(1)
-            
-            # Альтернативный поиск в H3 с классом lot-a-t
-            if not lot_number:
-                h3_lot = soup.find('h3', {'class': 'lot-a-t'}) or soup.find('H3', {'class': 'lot-a-t'})
-                if h3_lot:
-                    lot_number = h3_lot.get_text(strip=True)
-            
-            # Поиск в title страницы
-            if not lot_number:
-                title_tag = soup.find('title')
-                if title_tag:
-                    title_text = title_tag.get_text(strip=True)
-                    lot_match = re.search(r'Lot\s+(\d+)', title_text)
-                    if lot_match:
-                        lot_number = lot_match.group(1)
-            
-            lot_data['lot_number'] = lot_number
-            lot_data['lot_title'] = lot_number  # Используем номер как заголовок
-            
-            # 🔥 УЛУЧШЕННОЕ ИЗВЛЕЧЕНИЕ ОПИСАНИЯ ЛОТА  
-            lot_description = ""
-            # Ищем в div с классом lot-desc
-            lot_desc_div = soup.find('div', {'class': 'lot-desc'})
-            if lot_desc_div:
-                # Извлекаем текст из всех параграфов
-                paragraphs = lot_desc_div.find_all('p')
-                if paragraphs:
-                    desc_parts = []
-                    for p in paragraphs:
-                        text = p.get_text(strip=True)
-                        if text:
-                            desc_parts.append(text)
-                    lot_description = ' '.join(desc_parts)
-                else:
-                    # Если нет параграфов, берем весь текст
-                    lot_description = lot_desc_div.get_text(strip=True)
-            
-            # Альтернативный поиск в title/meta description
-            if not lot_description:
-                meta_desc = soup.find('meta', {'name': 'description'})
-                if meta_desc:
-                    content = meta_desc.get('content', '')
-                    # Убираем "Lot X - " из начала
-                    desc_clean = re.sub(r'^Lot\s+\d+\s*[-:]?\s*', '', content)
-                    lot_description = desc_clean
-            
-            lot_data['lot_description'] = lot_description
-            
-            # Изображения - ищем main image
-            main_img = soup.find('img', {'id': 'lot-image'}) or soup.find('img', {'class': 'main-image'}) or soup.find('img', src=re.compile(r'stock.*medium'))
-            if main_img:
-                img_src = main_img.get('src', '')
-                if img_src:
-                    # Полный URL
-                    if img_src.startswith('//'):
-                        img_src = 'https:' + img_src
-                    elif img_src.startswith('/'):
-                        img_src = 'https://tennants.blob.core.windows.net' + img_src
-                    
-                    lot_data['image_url'] = img_src
-                    # HD версия (убираем -medium)
-                    lot_data['image_high_res_url'] = img_src.replace('-medium', '')
-                else:
-                    lot_data['image_url'] = ""
-                    lot_data['image_high_res_url'] = ""
-            else:
-                lot_data['image_url'] = ""
-                lot_data['image_high_res_url'] = ""
-            
-            # 🔥 УЛУЧШЕННОЕ ИЗВЛЕЧЕНИЕ ОЦЕНОЧНОЙ СТОИМОСТИ
-            estimate_text = ""
-            # Ищем в div с классом estimate
-            estimate_div = soup.find('div', {'class': 'estimate'})
-            if estimate_div:
-                estimate_text = estimate_div.get_text(strip=True)
-                # Очищаем от "Estimate" и лишних символов
-                estimate_text = re.sub(r'^Estimate\s*', '', estimate_text, flags=re.IGNORECASE)
-                # Заменяем HTML entities
-                estimate_text = estimate_text.replace('&#163;', '£')
-            
-            # Альтернативный поиск в тексте страницы
-            if not estimate_text:
-                estimate_match = re.search(r'Estimate[:\s]*£[\d,\s-]+', page_text, re.IGNORECASE)
-                if estimate_match:
-                    estimate_text = estimate_match.group(0).replace('Estimate', '').strip(' :')
-            
-            lot_data['lot_estimate'] = estimate_text
-            
-            # Цена продажи и статус (обычно пустые для будущих аукционов)
-            lot_data['lot_sold_price'] = ""
-            lot_data['lot_status'] = ""
-            
-            # 🔥 УЛУЧШЕННОЕ ИЗВЛЕЧЕНИЕ КОМИССИИ ПОКУПАТЕЛЯ
-            premium_text = ""
-            # Ищем в div с классом buyers-premium
-            premium_div = soup.find('div', {'class': 'buyers-premium'})
-            if premium_div:
-                premium_full_text = premium_div.get_text(strip=True)
-                # Извлекаем только процент
-                premium_match = re.search(r'(\d+(?:\.\d+)?)%', premium_full_text)
-                if premium_match:
-                    premium_text = f"{premium_match.group(1)}%"
-                
-            # Альтернативный поиск в тексте страницы
-            if not premium_text:
-                premium_match = re.search(r'(\d+(?:\.\d+)?)%', page_text)
-                premium_text = f"{premium_match.group(1)}%" if premium_match else "22.00%"
-            
-            lot_data['buyer_premium'] = premium_text
-            
-            # 🔥 УЛУЧШЕННОЕ ИЗВЛЕЧЕНИЕ ОТЧЕТА О СОСТОЯНИИ
-            condition_report = ""
-            
-            # Ищем в табе condition
-            condition_tab = soup.find('div', {'id': 'condition'})
-            if condition_tab:
-                # Извлекаем первый параграф с текстом
-                condition_paragraphs = condition_tab.find_all('p')
-                for p in condition_paragraphs:
+        
+        # Способ 4: Поиск в скрытых полях формы
+        if not auction_title:
+            append_text_input = soup.find('input', {'id': 'AppendText'})
+            if append_text_input:
+                auction_title = field_extractors.auction_title_from_append_text(append_text_input.get('value', ''))
+        
+        lot_data['auction_title'] = auction_title
+        
+        # Дата аукциона - ищем в тексте страницы
+        page_text = soup.get_text()
+        lot_data['auction_date'] = field_extractors.auction_year(page_text)
+        
+        # 🔥 УЛУЧШЕННОЕ ИЗВЛЕЧЕНИЕ НОМЕРА ЛОТА
+        lot_number = ""
+        # Ищем в span с классом lot-number
+        lot_number_span = soup.find('span', {'class': 'lot-number'})
+        if lot_number_span:
+            lot_number = field_extractors.lot_number_from_text(lot_number_span.get_text(strip=True))
+        
+        # Альтернативный поиск в H3 с классом lot-a-t
+        if not lot_number:
+            h3_lot = soup.find('h3', {'class': 'lot-a-t'}) or soup.find('H3', {'class': 'lot-a-t'})
+            if h3_lot:
+                lot_number = h3_lot.get_text(strip=True)
+        
+        # Поиск в title страницы
+        if not lot_number:
+            title_tag = soup.find('title')
+            if title_tag:
+                lot_number = field_extractors.lot_number_from_text(title_tag.get_text(strip=True))
+        
+        lot_data['lot_number'] = lot_number
+        lot_data['lot_title'] = lot_number  # Используем номер как заголовок
+        
+        # 🔥 УЛУЧШЕННОЕ ИЗВЛЕЧЕНИЕ ОПИСАНИЯ ЛОТА  
+        lot_description = ""
+        # Ищем в div с классом lot-desc
+        lot_desc_div = soup.find('div', {'class': 'lot-desc'})
+        if lot_desc_div:
+            # Извлекаем текст из всех параграфов
+            paragraphs = lot_desc_div.find_all('p')
+            if paragraphs:
+                desc_parts = []
+                for p in paragraphs:
                     text = p.get_text(strip=True)
-                    # Пропускаем пустые и стандартные disclaimer тексты
-                    if text and not text.startswith('We are happy to provide') and not text.startswith('We cannot guarantee'):
-                        condition_report = text
-                        break
-            
-            # Альтернативные фразы
-            if not condition_report:
-                if "no condition report" in page_text.lower():
-                    condition_report = "There is no condition report for this lot. Click the 'Ask a question' button below to request further information."
-                elif "condition report" in page_text.lower():
-                    condition_match = re.search(r'[^.]*condition report[^.]*\.', page_text, re.IGNORECASE)
-                    condition_report = condition_match.group(0) if condition_match else "We are happy to provide Condition Reports to Prospective Buyers, but would welcome your request as soon as possible, preferably at least 48 hours before the Day of Sale."
-                else:
-                    condition_report = "We are happy to provide Condition Reports to Prospective Buyers, but would welcome your request as soon as possible, preferably at least 48 hours before the Day of Sale."
-            
-            lot_data['condition_report'] = condition_report
-            
-            # 🔥 ИЗВЛЕЧЕНИЕ ДОПОЛНИТЕЛЬНЫХ ПОЛЕЙ
-            description_full = lot_data.get('lot_description', '')
-            
-            # Размеры
-            lot_data['dimensions'] = self.extract_dimensions(description_full)
-            
-            # Материалы
-            lot_data['materials'] = self.extract_materials(description_full)
-            
-            # Период и датировка
-            lot_data['period_dating'] = self.extract_period_dating(description_full)
-            
-            # Художник/производитель
-            lot_data['artist_maker'] = self.extract_artist_maker(description_full)
-            
-            # Страна происхождения
-            lot_data['origin_country'] = self.extract_origin_country(description_full)
+                    if text:
+                        desc_parts.append(text)
+                lot_description = ' '.join(desc_parts)
+            else:
+                # Если нет параграфов, берем весь текст
+                lot_description = lot_desc_div.get_text(strip=True)
+        
+        # Альтернативный поиск в title/meta description
+        if not lot_description:
+            meta_desc = soup.find('meta', {'name': 'description'})
+            if meta_desc:
+                lot_description = field_extractors.description_from_meta(meta_desc.get('content', ''))
+        
+        lot_data['lot_description'] = lot_description
+        
+        # Изображения - ищем main image
+        main_img = soup.find('img', {'id': 'lot-image'}) or soup.find('img', {'class': 'main-image'}) or soup.find('img', src=re.compile(r'stock.*medium'))
+        # Полный URL и HD версия (без -medium)
+        lot_data.update(field_extractors.image_fields(main_img.get('src', '') if main_img else ''))
+        
+        # 🔥 УЛУЧШЕННОЕ ИЗВЛЕЧЕНИЕ ОЦЕНОЧНОЙ СТОИМОСТИ
+        estimate_text = ""
+        # Ищем в div с классом estimate
+        estimate_div = soup.find('div', {'class': 'estimate'})
+        if estimate_div:
+            estimate_text = field_extractors.clean_estimate(estimate_div.get_text(strip=True))
+        
+        # Альтернативный поиск в тексте страницы
+        if not estimate_text:
+            estimate_text = field_extractors.estimate_from_text(page_text)
+        
+        lot_data['lot_estimate'] = estimate_text
+        
+        # Цена продажи и статус (обычно пустые для будущих аукционов)
+        lot_data['lot_sold_price'] = ""
+        lot_data['lot_status'] = ""
+        
+        # 🔥 УЛУЧШЕННОЕ ИЗВЛЕЧЕНИЕ КОМИССИИ ПОКУПАТЕЛЯ
+        premium_text = ""
+        # Ищем в div с классом buyers-premium
+        premium_div = soup.find('div', {'class': 'buyers-premium'})
+        if premium_div:
+            # Извлекаем только процент
+            premium_text = field_extractors.premium_from_text(premium_div.get_text(strip=True))
             
-            # Категория лота
+        # Альтернативный поиск в тексте страницы
+        if not premium_text:
+            premium_text = field_extractors.premium_from_text(page_text) or field_extractors.DEFAULT_BUYER_PREMIUM
+        
+        lot_data['buyer_premium'] = premium_text
+        
+        # 🔥 УЛУЧШЕННОЕ ИЗВЛЕЧЕНИЕ ОТЧЕТА О СОСТОЯНИИ
+        condition_report = ""
+        
+        # Ищем в табе condition
+        condition_tab = soup.find('div', {'id': 'condition'})
+        if condition_tab:
+            # Извлекаем первый параграф с текстом
+            condition_paragraphs = condition_tab.find_all('p')
+            for p in condition_paragraphs:
+                text = p.get_text(strip=True)
+                # Пропускаем пустые и стандартные disclaimer тексты
+                if field_extractors.is_condition_text(text):
+                    condition_report = text
+                    break
+        
+        # Альтернативные фразы
+        if not condition_report:
+            condition_report = field_extractors.condition_report_from_text(page_text)
+        
+        lot_data['condition_report'] = condition_report
+        
+        # 🔥 ИЗВЛЕЧЕНИЕ ДОПОЛНИТЕЛЬНЫХ ПОЛЕЙ
+        self.extract_description_fields(lot_data)
+        
+        # Категория лота
+        with self.timer('extract_lot_category'):
             lot_data['lot_category'] = self.extract_lot_category(soup)
-            
-            # Дополнительные изображения
+        
+        # Дополнительные изображения
+        with self.timer('extract_additional_images'):
             additional_images = self.extract_additional_images(soup)
-            lot_data['additional_images_count'] = len(additional_images)
-            lot_data['additional_images_urls'] = ' | '.join(additional_images) if additional_images else ""
-            
-            # Полная информация о лоте
-            full_info = f"Lot {lot_data.get('lot_number', 'N/A')} ({lot_data.get('auction_title', 'Unknown Auction')}, {lot_data.get('auction_date', 'Unknown Date')})\n"
-            full_info += lot_data.get('lot_description', '')
-            if lot_data.get('lot_estimate'):
-                full_info += f"\nEstimate: {lot_data['lot_estimate']}"
-            if lot_data.get('dimensions'):
-                full_info += f"\nDimensions: {lot_data['dimensions']}"
-            if lot_data.get('materials'):
-                full_info += f"\nMaterials: {lot_data['materials']}"
-            if lot_data.get('period_dating'):
-                full_info += f"\nPeriod: {lot_data['period_dating']}"
-            lot_data['full_lot_info'] = full_info
-            
-            # 🔍 ДИАГНОСТИКА ИЗВЛЕЧЕННЫХ ДАННЫХ
-            print(f"✅ ИЗВЛЕЧЕННЫЕ ДАННЫЕ:")
-            important_fields = ['lot_number', 'lot_description', 'lot_estimate', 'buyer_premium']
-            for field in important_fields:
-                value = lot_data.get(field, '')
-                if value:
-                    display_value = str(value)[:100] + "..." if len(str(value)) > 100 else str(value)
-                    print(f"   ✅ {field}: {display_value}")
-                else:
-                    print(f"   ❌ {field}: ПУСТО!")
-            
-            # 🔥 ПОКАЗЫВАЕМ НОВЫЕ ИЗВЛЕЧЕННЫЕ ПОЛЯ
-            new_fields = ['dimensions', 'materials', 'period_dating', 'artist_maker', 'origin_country', 'lot_category', 'additional_images_count']
-            print(f"🔥 ДОПОЛНИТЕЛЬНЫЕ ПОЛЯ:")
-            for field in new_fields:
-                value = lot_data.get(field, '')
-                if value:
-                    display_value = str(value)[:80] + "..." if len(str(value)) > 80 else str(value)
-                    print(f"   🎯 {field}: {display_value}")
-                else:
-                    print(f"   ⚪ {field}: -")
-            
-            # Показываем дополнительные поля
-            other_fields = ['auction_id', 'lot_system_id', 'auction_title', 'image_url', 'condition_report']
-            for field in other_fields:
-                value = lot_data.get(field, '')
-                if value and len(str(value)) > 100:
-                    print(f"   📋 {field}: {str(value)[:50]}...")
-                elif value:
-                    print(f"   📋 {field}: {value}")
-            
-            return lot_data
+        lot_data['additional_images_count'] = len(additional_images)
+        lot_data['additional_images_urls'] = ' | '.join(additional_images) if additional_images else ""
+        
+        # Полная информация о лоте
+        lot_data['full_lot_info'] = field_extractors.full_lot_info(lot_data)
+        
+        return lot_data
+    
+    def extract_description_fields(self, lot_data):
+        """Размеры, материалы, период, автор и страна из описания (общее для bs4 и lxml)"""
+        description_full = lot_data.get('lot_description', '')
+        lot_data['dimensions'] = self.extract_dimensions(description_full)
+        lot_data['materials'] = self.extract_materials(description_full)
+        lot_data['period_dating'] = self.extract_period_dating(description_full)
+        lot_data['artist_maker'] = self.extract_artist_maker(description_full)
+        lot_data['origin_country'] = self.extract_origin_country(description_full)
+    
+    def print_lot_diagnostics(self, lot_data):
+        """🔍 ДИАГНОСТИКА ИЗВЛЕЧЕННЫХ ДАННЫХ (в консоль журнала - не в stdout с JSON Lines)"""
+        print(f"✅ ИЗВЛЕЧЕННЫЕ ДАННЫЕ:", file=self.run_log.console)
+        important_fields = ['lot_number', 'lot_description', 'lot_estimate', 'buyer_premium']
+        for field in important_fields:
+            value = lot_data.get(field, '')
+            if value:
+                display_value = str(value)[:100] + "..." if len(str(value)) > 100 else str(value)
+                print(f"   ✅ {field}: {display_value}", file=self.run_log.console)
+            else:
+                print(f"   ❌ {field}: ПУСТО!", file=self.run_log.console)
+        
+        # 🔥 ПОКАЗЫВАЕМ НОВЫЕ ИЗВЛЕЧЕННЫЕ ПОЛЯ
+        new_fields = ['dimensions', 'materials', 'period_dating', 'artist_maker', 'origin_country', 'lot_category', 'additional_images_count']
+        print(f"🔥 ДОПОЛНИТЕЛЬНЫЕ ПОЛЯ:", file=self.run_log.console)
+        for field in new_fields:
+            value = lot_data.get(field, '')
+            if value:
+                display_value = str(value)[:80] + "..." if len(str(value)) > 80 else str(value)
+                print(f"   🎯 {field}: {display_value}", file=self.run_log.console)
+            else:
+                print(f"   ⚪ {field}: -", file=self.run_log.console)
+        
+        # Показываем дополнительные поля
+        other_fields = ['auction_id', 'lot_system_id', 'auction_title', 'image_url', 'condition_report']
+        for field in other_fields:
+            value = lot_data.get(field, '')
+            if value and len(str(value)) > 100:
+                print(f"   📋 {field}: {str(value)[:50]}...", file=self.run_log.console)
+            elif value:
+                print(f"   📋 {field}: {value}", file=self.run_log.console)
+    
+    def open_lot_writer(self):
+        """Буферизованный вывод лотов в выбранном формате"""
+        if self.output_format is None:
+            raise ValueError("Парсер создан без вывода (output_format=None)")
+        if self.output_format == "parquet":
+            from parquet_writer import ParquetLotWriter
+            return ParquetLotWriter(self.db_file, on_flush=self.on_lot_writer_flush, image_metadata=self.image_metadata)
+        columns = self.csv_columns(self.image_metadata)
+        if self.output_format == "sqlite":
+            return SQLiteLotStore(self.db_file, columns, run_id=self.run_id, on_flush=self.on_lot_writer_flush)
+        return BufferedCSVWriter(self.db_file, to_row=lambda lot_data: [lot_data.get(key, '') for _, key in columns],
+                                 on_flush=self.on_lot_writer_flush)
+    
+    def save_lot_data(self, lot_data, lot_key=None):
+        """Сохранение данных лота (пачками через буферизованный вывод)"""
+        if self.lot_writer is None:
+            self.lot_writer = self.open_lot_writer()
+            self.lot_writer.metrics = self.metrics
+        with self.timer('lot_save'):
+            self.lot_writer.write(lot_data, key=lot_key or lot_data.get('lot_system_id', ''))
+    
+    def on_lot_writer_flush(self, lot_keys):
+        """Пачка лотов на диске - лоты завершены, фиксируем контрольную точку"""
+        self.completed_lot_ids.update(lot_keys)
+        self.write_checkpoint()
+        if self.incremental_state:
+            self.incremental_state.confirm(lot_keys)
+    
+    def close_lot_writer(self):
+        """Сброс оставшихся лотов и закрытие вывода"""
+        if self.lot_writer is not None:
+            self.lot_writer.close()
+            self.run_log.info('output_saved', f"💾 Данные сохранены в {self.db_file} (лотов за запуск: {self.lot_writer.rows_written})",
+                              path=str(self.db_file), rows=self.lot_writer.rows_written)
+            self.lot_writer = None
+    
+    def get_image_path(self, image_url, lot_id, lot_number="", lot_description="", is_main=True, image_index=0):
+        """Путь файла изображения в отдельной папке лота"""
+        # 🔥 СОЗДАЕМ ОТДЕЛЬНУЮ ПАПКУ ДЛЯ ЛОТА
+        clean_lot_desc = self.clean_filename(lot_description)
+        lot_folder_name = f"Lot_{lot_number}_{clean_lot_desc}" if lot_number else f"Lot_ID_{lot_id}"
+        lot_images_dir = self.images_dir / lot_folder_name
+        lot_images_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Определяем расширение файла
+        ext = '.jpg'
+        if '.png' in image_url:
+            ext = '.png'
+        
+        # Создаем имя файла
+        if is_main:
+            filename = f"lot_{lot_id}_main{ext}"
+        else:
+            filename = f"lot_{lot_id}_additional_{image_index}{ext}"
+        
+        return lot_images_dir / filename
+    
+    def fetch_image(self, image_url, filepath):
+        """Загрузка изображения в файл (атомарно); возвращает байты файла, ошибки сети не перехватываются
+
+        Лимиты image_policy: ImageTooLarge - файл больше max_image_bytes (не дочитывается),
+        ImageBudgetExceeded - исчерпан лимит байт на запуск.
+        """
+        with self.timer('image_fetch'):
+            return self.fetch_image_body(image_url, filepath)
+    
+    def fetch_image_body(self, image_url, filepath):
+        """Загрузка изображения для fetch_image (без замера общего времени)"""
+        policy = self.image_policy
+        policy.check_budget()
+        if policy.probe:
+            policy.check_size(self.probe_image_size(image_url))
+        
+        # 🔥 ОПТИМИЗИРОВАННАЯ ЗАГРУЗКА: короткий timeout + stream
+        response = self.session.get(image_url, timeout=10, stream=True)
+        headers_at = time.perf_counter()
+        try:
+            response.raise_for_status()
+            content_length = response.headers.get('Content-Length', '')
+            policy.check_size(int(content_length) if content_length.isdigit() else None)
             
-        except Exception as e:
-            print(f"❌ Ошибка парсинга лота: {e}")
-            return None
+            # Загружаем по частям во временный файл и переименовываем;
+            # байты остаются в памяти для хранилища и обработки изображений без повторного чтения
+            chunks = []
+            size = 0
+            tmp_path = filepath.with_name(f"{filepath.name}.{threading.get_ident()}.part")
+            try:
+                with open(tmp_path, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=8192):
+                        size += len(chunk)
+                        policy.check_size(size)
+                        f.write(chunk)
+                        chunks.append(chunk)
+            except Exception:
+                # Лимит размера или обрыв соединения - недокачанный файл не оставляем
+                tmp_path.unlink(missing_ok=True)
+                raise
+            os.replace(tmp_path, filepath)
+        finally:
+            response.close()
+        
+        body = b''.join(chunks)
+        policy.consume(len(body))
+        if self.metrics:
+            self.metrics.observe('image_download', time.perf_counter() - headers_at)
+            self.metrics.observe_size('image_bytes', len(body))
+        
+        if self.image_store:
+            self.image_store.add(image_url, filepath, body)
+        return body
+    
+    def probe_image_size(self, image_url):
+        """Размер изображения до загрузки: HEAD или Range на первый байт; None - неизвестен"""
+        if self.image_policy.probe == 'head':
+            response = self.session.head(image_url, timeout=10, allow_redirects=True)
+            response.close()
+            size = response.headers.get('Content-Length', '')
+            return int(size) if response.ok and size.isdigit() else None
+        
+        response = self.session.get(image_url, timeout=10, stream=True, headers={'Range': 'bytes=0-0'})
+        response.close()
+        if response.status_code == 206:
+            total = response.headers.get('Content-Range', '').rpartition('/')[2]
+            return int(total) if total.isdigit() else None
+        size = response.headers.get('Content-Length', '')
+        return int(size) if response.ok and size.isdigit() else None
     
-    def save_lot_data(self, lot_data):
-        """Сохранение данных лота в CSV"""
-        with open(self.db_file, 'a', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            row = [
-                lot_data.get('timestamp', ''),
-                lot_data.get('auction_id', ''),
-                lot_data.get('auction_title', ''),
-                lot_data.get('auction_date', ''),
-                lot_data.get('lot_system_id', ''),
-                lot_data.get('lot_number', ''),
-                lot_data.get('lot_title', ''),
-                lot_data.get('lot_description', ''),
-                lot_data.get('url', ''),
-                lot_data.get('image_url', ''),
-                lot_data.get('image_high_res_url', ''),
-                lot_data.get('additional_images_count', ''),
-                lot_data.get('additional_images_urls', ''),
-                lot_data.get('lot_estimate', ''),
-                lot_data.get('lot_sold_price', ''),
-                lot_data.get('lot_status', ''),
-                lot_data.get('buyer_premium', ''),
-                lot_data.get('condition_report', ''),
-                lot_data.get('dimensions', ''),
-                lot_data.get('materials', ''),
-                lot_data.get('period_dating', ''),
-                lot_data.get('artist_maker', ''),
-                lot_data.get('origin_country', ''),
-                lot_data.get('lot_category', ''),
-                lot_data.get('full_lot_info', '')
-            ]
-            writer.writerow(row)
-        
-        print(f"💾 Данные сохранены в {self.db_file}")
+    def image_from_store(self, image_url, filepath):
+        """Изображение уже в хранилище - ссылка в папку лота без запроса к сайту"""
+        if self.image_store and self.image_store.link_into(image_url, filepath):
+            self.log("🗃️ Изображение из хранилища: %s", filepath)
+            return True
+        return False
     
     def download_image(self, image_url, lot_id, lot_number="", lot_description="", is_main=True, image_index=0):
         """Скачивание изображения лота в отдельную папку лота"""
@@ -448,43 +865,41 @@ class FullAuctionParser:
             return None
         
         try:
-            # 🔥 СОЗДАЕМ ОТДЕЛЬНУЮ ПАПКУ ДЛЯ ЛОТА
-            clean_lot_desc = self.clean_filename(lot_description)
-            lot_folder_name = f"Lot_{lot_number}_{clean_lot_desc}" if lot_number else f"Lot_ID_{lot_id}"
-            lot_images_dir = self.images_dir / lot_folder_name
-            lot_images_dir.mkdir(exist_ok=True)
-            
-            # 🔥 ОПТИМИЗИРОВАННАЯ ЗАГРУЗКА: короткий timeout + stream
-            response = self.session.get(image_url, timeout=10, stream=True)
-            response.raise_for_status()
+            filepath = self.get_image_path(image_url, lot_id, lot_number, lot_description, is_main, image_index)
             
-            # Определяем расширение файла
-            ext = '.jpg'
-            if '.png' in image_url:
-                ext = '.png'
+            # Файлы пишутся атомарно, поэтому существующий файл всегда целый
+            if filepath.exists() and filepath.stat().st_size > 0:
+                self.log("⏭️ Изображение уже на диске: %s", filepath)
+                return str(filepath)
             
-            # Создаем имя файла
-            if is_main:
-                filename = f"lot_{lot_id}_main{ext}"
-            else:
-                filename = f"lot_{lot_id}_additional_{image_index}{ext}"
-            
-            filepath = lot_images_dir / filename
-            
-            # Загружаем по частям для лучшей производительности
-            with open(filepath, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
+            if self.image_from_store(image_url, filepath):
+                return str(filepath)
             
-            print(f"🖼️ Изображение сохранено: {filepath}")
+            self.fetch_image(image_url, filepath)
+            self.log("🖼️ Изображение сохранено: %s", filepath)
             return str(filepath)
             
         except Exception as e:
-            print(f"❌ Ошибка скачивания изображения: {e}")
+            self.run_log.warning('image_error', "❌ Ошибка скачивания изображения: %s", e, url=image_url, error=str(e))
             return None
     
-    def download_all_lot_images(self, lot_data):
-        """🚀 ПАРАЛЛЕЛЬНАЯ загрузка всех изображений лота"""
+    def apply_image_metadata(self, lot_data, metadata):
+        """Результаты ImagePostProcessor в поля лота; metadata - {image_index: метаданные}, 0 - основное"""
+        main = metadata.get(0)
+        if main:
+            lot_data['image_width'] = main['width']
+            lot_data['image_height'] = main['height']
+            lot_data['image_phash'] = main['phash']
+            lot_data['image_thumbnail'] = main['thumbnails'][0] if main['thumbnails'] else ''
+        
+        additional_count = len([url for url in lot_data.get('additional_images_urls', '').split(' | ') if url.strip()])
+        if additional_count:
+            lot_data['additional_images_phashes'] = ' | '.join(
+                metadata[i]['phash'] if i in metadata else '' for i in range(1, additional_count + 1)
+            )
+    
+    def collect_lot_images(self, lot_data):
+        """Список изображений лота для загрузки (основное + дополнительные)"""
         lot_id = lot_data.get('lot_system_id', '')
         lot_number = lot_data.get('lot_number', '')
         lot_description = lot_data.get('lot_description', '')
@@ -492,11 +907,11 @@ class FullAuctionParser:
         # Собираем все URL для загрузки
         images_to_download = []
         
-        # Основное изображение
+        # Основное изображение (размер - по image_policy)
         main_image_url = lot_data.get('image_url', '')
         if main_image_url:
             images_to_download.append({
-                'url': main_image_url,
+                'url': self.image_policy.url_for(main_image_url, 'main'),
                 'lot_id': lot_id,
                 'lot_number': lot_number,
                 'lot_description': lot_description,
@@ -511,7 +926,7 @@ class FullAuctionParser:
             for i, url in enumerate(urls_list, 1):
                 if url.strip():
                     images_to_download.append({
-                        'url': url.strip(),
+                        'url': self.image_policy.url_for(url.strip(), 'additional'),
                         'lot_id': lot_id,
                         'lot_number': lot_number,
                         'lot_description': lot_description,
@@ -519,44 +934,21 @@ class FullAuctionParser:
                         'image_index': i
                     })
         
-        if not images_to_download:
-            print(f"📷 Нет изображений для лота #{lot_number}")
-            return []
-        
-        # 🚀 ПАРАЛЛЕЛЬНАЯ ЗАГРУЗКА
-        print(f"📥 Загружаем {len(images_to_download)} изображений для лота #{lot_number}...")
-        start_time = time.time()
-        downloaded_images = []
-        
-        with ThreadPoolExecutor(max_workers=6) as executor:
-            # Запускаем все загрузки параллельно
-            future_to_image = {
-                executor.submit(
-                    self.download_image,
-                    img_data['url'],
-                    img_data['lot_id'],
-                    img_data['lot_number'],
-                    img_data['lot_description'],
-                    img_data['is_main'],
-                    img_data['image_index']
-                ): img_data for img_data in images_to_download
-            }
-            
-            # Собираем результаты по мере завершения
-            for future in as_completed(future_to_image):
-                try:
-                    result = future.result()
-                    if result:
-                        downloaded_images.append(result)
-                except Exception as e:
-                    print(f"❌ Ошибка загрузки изображения: {e}")
-        
-        download_time = time.time() - start_time
-        print(f"📷 Скачано {len(downloaded_images)}/{len(images_to_download)} изображений для лота #{lot_number} за {download_time:.1f}с")
-        return downloaded_images
+        return images_to_download
+    
+    def download_all_lot_images(self, lot_data):
+        """Загрузка всех изображений одного лота (для потока лотов - ImageSink с общей очередью)"""
+        with ImageDownloadScheduler(self, workers=6) as scheduler:
+            return scheduler.submit_lot(lot_data).result()
     
     def validate_lot_data(self, lot_data, lot_number):
-        """Проверка заполненности полей лота"""
+        """Проверка заполненности полей лота с выводом отчета"""
+        check = self.check_lot_fields(lot_data)
+        self.print_lot_fields_report(lot_number, check)
+        return not check['missing_required']  # True если нет критических ошибок
+    
+    def check_lot_fields(self, lot_data):
+        """Заполненность полей лота (учитывается в field_stats) без вывода"""
         # Определяем обязательные поля
         required_fields = {
             'auction_id': 'ID аукциона',
@@ -619,324 +1011,673 @@ class FullAuctionParser:
                     missing_fields.append(f"⏳ {description} (ожидается после аукциона)")
                     self.field_stats[field]['empty'] += 1
         
-        # Выводим результат проверки
-        total_required = len(required_fields)
-        total_filled = len([f for f in filled_fields if "✅" in f])
-        
-        print(f"   📋 Проверка полей лота #{lot_number}:")
-        print(f"      ✅ Основные поля: {total_filled}/{total_required}")
-        
-        if additional_filled:
-            print(f"      🎯 Дополнительные поля: {len(additional_filled)}/{len(additional_fields)}")
-            for field in additional_filled[:3]:  # Показываем первые 3
-                print(f"         {field}")
-        
-        if any("❌" in field for field in missing_fields):
-            print(f"      ⚠️ Пустые обязательные поля:")
-            for field in missing_fields:
-                if "❌" in field:
-                    print(f"         {field}")
-        
-        return len([f for f in missing_fields if "❌" in f]) == 0  # True если нет критических ошибок
+        return {
+            'filled': len(filled_fields),
+            'required': len(required_fields),
+            'additional_filled': additional_filled,
+            'additional': len(additional_fields),
+            'missing_required': [field for field in missing_fields if "❌" in field],
+        }
+    
+    def print_lot_fields_report(self, lot_number, check):
+        """Отчет check_lot_fields в консоль журнала"""
+        print(f"   📋 Проверка полей лота #{lot_number}:", file=self.run_log.console)
+        print(f"      ✅ Основные поля: {check['filled']}/{check['required']}", file=self.run_log.console)
+        
+        if check['additional_filled']:
+            print(f"      🎯 Дополнительные поля: {len(check['additional_filled'])}/{check['additional']}", file=self.run_log.console)
+            for field in check['additional_filled'][:3]:  # Показываем первые 3
+                print(f"         {field}", file=self.run_log.console)
+        
+        if check['missing_required']:
+            print(f"      ⚠️ Пустые обязательные поля:", file=self.run_log.console)
+            for field in check['missing_required']:
+                print(f"         {field}", file=self.run_log.console)
     
     def print_field_statistics(self, total_lots):
-        """Печать итоговой статистики по полям"""
-        print(f"\n📊 СТАТИСТИКА ЗАПОЛНЕННОСТИ ПОЛЕЙ:")
-        print("="*60)
+        """Итоговая статистика по полям (таблица - одной записью журнала)"""
+        lines = ["\n📊 СТАТИСТИКА ЗАПОЛНЕННОСТИ ПОЛЕЙ:", "="*60]
         
         for field, stats in self.field_stats.items():
             filled = stats['filled']
-            empty = stats['empty']
             percentage = (filled / total_lots * 100) if total_lots > 0 else 0
             
             status = "✅" if percentage >= 95 else "⚠️" if percentage >= 80 else "❌"
             
-            print(f"{status} {field:<20} | {filled:>3}/{total_lots:<3} | {percentage:>5.1f}%")
+            lines.append(f"{status} {field:<20} | {filled:>3}/{total_lots:<3} | {percentage:>5.1f}%")
         
         # Находим проблемные поля
         problem_fields = [field for field, stats in self.field_stats.items() 
                          if stats['filled'] / total_lots < 0.95 and field not in ['lot_sold_price', 'lot_status']]
         
         if problem_fields:
-            print(f"\n⚠️ ПОЛЯ С НИЗКОЙ ЗАПОЛНЕННОСТЬЮ:")
+            lines.append("\n⚠️ ПОЛЯ С НИЗКОЙ ЗАПОЛНЕННОСТЬЮ:")
             for field in problem_fields:
                 stats = self.field_stats[field]
                 percentage = stats['filled'] / total_lots * 100
-                print(f"   - {field}: {percentage:.1f}% (проблема в {stats['empty']} лотах)")
+                lines.append(f"   - {field}: {percentage:.1f}% (проблема в {stats['empty']} лотах)")
         else:
-            print(f"\n🎉 ВСЕ ОБЯЗАТЕЛЬНЫЕ ПОЛЯ ЗАПОЛНЯЮТСЯ КОРРЕКТНО!")
+            lines.append("\n🎉 ВСЕ ОБЯЗАТЕЛЬНЫЕ ПОЛЯ ЗАПОЛНЯЮТСЯ КОРРЕКТНО!")
+        
+        self.run_log.report('field_statistics', "\n".join(lines), lots=total_lots, fields=self.field_stats,
+                            problem_fields=problem_fields)
+        
+    def build_results_page_url(self, auction_url, page_number, page_size=None):
+        """URL страницы результатов аукциона с параметрами pn (номер) и pp (размер)"""
+        parts = urlparse(auction_url)
+        query = parse_qs(parts.query, keep_blank_values=True)
+        query['pn'] = [str(page_number)]
+        if page_size:
+            query['pp'] = [str(page_size)]
+        return urlunparse(parts._replace(query=urlencode(query, doseq=True)))
+    
+    def extract_auction_page_lots(self, soup):
+        """Ссылки на лоты со страницы результатов аукциона (без дубликатов)"""
+        lots = []
+        seen_lots = set()
         
-    def get_all_auction_lots(self, auction_url):
-        """Получение всех лотов из аукциона"""
-        print(f"🔍 СКАНИРОВАНИЕ АУКЦИОНА: {auction_url}")
-        print("="*60)
+        # Ищем все ссылки на лотов
+        lot_links = soup.find_all('a', href=re.compile(r'/auction/lot/'))
         
+        for link in lot_links:
+            try:
+                lot_url = link.get('href')
+                if not lot_url.startswith('http'):
+                    lot_url = 'https://auctions.tennants.co.uk' + lot_url
+                
+                # Извлекаем ID лота
+                lot_match = re.search(r'lot=(\d+)', lot_url)
+                if not lot_match:
+                    continue
+                
+                lot_id = lot_match.group(1)
+                
+                # Пропускаем дубликаты
+                if lot_id in seen_lots:
+                    continue
+                seen_lots.add(lot_id)
+                
+                # Получаем текст лота для предварительной информации
+                lot_text = link.get_text(strip=True)
+                
+                lot_info = {
+                    'id': lot_id,
+                    'url': lot_url,
+                    'preview_text': lot_text
+                }
+                
+                lots.append(lot_info)
+                
+            except Exception as e:
+                continue
+        
+        return lots
+    
+    def detect_results_page_numbers(self, soup, lots_on_page):
+        """Номера страниц результатов: по ссылкам пагинации и по тексту «of N lots»"""
+        page_numbers = {1}
+        
+        for link in soup.find_all('a', href=re.compile(r'[?&]pn=\d+')):
+            page_match = re.search(r'[?&]pn=(\d+)', link['href'])
+            page_numbers.add(int(page_match.group(1)))
+        
+        # Общее число лотов дает все страницы сразу, даже если пагинация показывает только окно
+        total_lots = self.detect_results_total(soup)
+        if total_lots and lots_on_page:
+            page_count = -(-total_lots // lots_on_page)
+            page_numbers.update(range(1, page_count + 1))
+        
+        return page_numbers
+    
+    def detect_results_total(self, soup):
+        """Общее число лотов по тексту «of N lots» (None - текста нет)"""
+        total_match = re.search(r'of\s+([\d,]+)\s+(?:lots|results)', soup.get_text(), re.IGNORECASE)
+        return int(total_match.group(1).replace(',', '')) if total_match else None
+    
+    def lot_sort_key(self, lot):
+        """Ключ сортировки по номеру лота (1, 2, 2A, 3...)"""
+        number_match = (re.search(r'/lot-(\d+)([a-z]?)-', lot['url'], re.IGNORECASE)
+                        or re.search(r'Lot\s+(\d+)([A-Z]?)', lot.get('preview_text', ''), re.IGNORECASE))
+        if number_match:
+            return (0, int(number_match.group(1)), number_match.group(2).upper())
+        return (1, 0, "")
+    
+    def fetch_results_page(self, page_url):
+        """Загрузка одной страницы результатов аукциона"""
+        response = self.session.get(page_url, timeout=30)
+        response.raise_for_status()
+        if self.html_archive:
+            self.html_archive.put(page_url, response.content, kind='auction')
+        return BeautifulSoup(response.content, 'html.parser')
+    
+    def fetch_page_lots(self, page_url, lots_on_page=None):
+        """(лоты, номера страниц, всего лотов по «of N lots») страницы результатов без хранения дерева
+
+        lots_on_page - размер страницы для расчета номеров (по умолчанию - число лотов на этой странице)
+        """
+        soup = self.fetch_results_page(page_url)
         try:
-            response = self.session.get(auction_url, timeout=30)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
+            lots = self.extract_auction_page_lots(soup)
+            page_numbers = self.detect_results_page_numbers(soup, lots_on_page or len(lots))
+            return lots, page_numbers, self.detect_results_total(soup)
+        finally:
+            soup.decompose()
+    
+    def get_all_auction_lots(self, auction_url, page_size=None, concurrency=8):
+        """Получение всех лотов из аукциона со всех страниц результатов
+
+        page_size - желаемое число лотов на странице (pp); сайт может ограничить его
+        сам, поэтому фактический размер страницы определяется по первой странице.
+        """
+        self.run_log.info('scan_start', "🔍 СКАНИРОВАНИЕ АУКЦИОНА: %s\n" + "="*60, auction_url, auction_url=auction_url)
+        
+        try:
+            first_url = self.build_results_page_url(auction_url, 1, page_size) if page_size else auction_url
+            first_lots, page_numbers, _ = self.fetch_page_lots(first_url)
             
-            lots = []
-            seen_lots = set()
+            self.run_log.info('scan_page', "🔗 Найдено лотов на странице 1: %d, страниц результатов: %d", len(first_lots),
+                              max(page_numbers), page=1, lots=len(first_lots), pages=max(page_numbers))
             
-            # Ищем все ссылки на лотов
-            lot_links = soup.find_all('a', href=re.compile(r'/auction/lot/'))
+            # Размер страницы для следующих запросов берем из ссылок лотов (pp=96)
+            if not page_size and first_lots:
+                pp_match = re.search(r'[?&]pp=(\d+)', first_lots[0]['url'])
+                page_size = int(pp_match.group(1)) if pp_match else None
             
-            print(f"🔗 Найдено потенциальных ссылок на лотов: {len(lot_links)}")
+            lots_by_page = {1: first_lots}
             
-            for link in lot_links:
-                try:
-                    lot_url = link.get('href')
-                    if not lot_url.startswith('http'):
-                        lot_url = 'https://auctions.tennants.co.uk' + lot_url
-                    
-                    # Извлекаем ID лота
-                    lot_match = re.search(r'lot=(\d+)', lot_url)
-                    if not lot_match:
-                        continue
-                    
-                    lot_id = lot_match.group(1)
-                    
-                    # Пропускаем дубликаты
-                    if lot_id in seen_lots:
-                        continue
-                    seen_lots.add(lot_id)
-                    
-                    # Получаем текст лота для предварительной информации
-                    lot_text = link.get_text(strip=True)
+            # 🚀 ОСТАЛЬНЫЕ СТРАНИЦЫ ЗАГРУЖАЕМ ПАРАЛЛЕЛЬНО
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                while True:
+                    missing_pages = sorted(page_numbers - set(lots_by_page))
+                    if not missing_pages:
+                        break
                     
-                    lot_info = {
-                        'id': lot_id,
-                        'url': lot_url,
-                        'preview_text': lot_text
+                    future_to_page = {
+                        executor.submit(self.fetch_page_lots, self.build_results_page_url(auction_url, page_number, page_size),
+                                        len(first_lots)): page_number
+                        for page_number in missing_pages
                     }
                     
-                    lots.append(lot_info)
-                    
-                except Exception as e:
-                    continue
+                    for future in as_completed(future_to_page):
+                        page_number = future_to_page[future]
+                        try:
+                            lots_by_page[page_number], more_pages, _ = future.result()
+                            # Окно пагинации могло открыть новые страницы
+                            page_numbers |= more_pages
+                        except Exception as e:
+                            lots_by_page[page_number] = []
+                            self.run_log.warning('page_error', "⚠️ Ошибка загрузки страницы %d: %s", page_number, e,
+                                                 page=page_number, error=str(e))
             
-            print(f"✅ Найдено уникальных лотов: {len(lots)}")
+            # Объединяем страницы без дубликатов и сортируем по номеру лота
+            lots = []
+            seen_lots = set()
+            for page_number in sorted(lots_by_page):
+                for lot in lots_by_page[page_number]:
+                    if lot['id'] not in seen_lots:
+                        seen_lots.add(lot['id'])
+                        lots.append(lot)
+            lots.sort(key=self.lot_sort_key)
+            
+            self.run_log.report('scan_finish', "✅ Найдено уникальных лотов: %d (страниц: %d)", len(lots), len(lots_by_page),
+                                lots=len(lots), pages=len(lots_by_page))
             return lots
             
         except Exception as e:
-            print(f"❌ Ошибка при сканировании аукциона: {e}")
+            self.run_log.error('scan_error', "❌ Ошибка при сканировании аукциона: %s", e, auction_url=auction_url, error=str(e))
             return []
     
-    def parse_auction(self, auction_url, max_lots=None, delay=2):
-        """Парсинг полного аукциона"""
-        print(f"🚀 НАЧИНАЕМ ПАРСИНГ ПОЛНОГО АУКЦИОНА")
-        print("="*60)
+    def iter_auction_lots(self, auction_url, page_size=None, prefetch=2):
+        """Лоты аукциона по мере загрузки страниц результатов, без списка всех лотов
+
+        Вперед загружается не больше prefetch страниц; лоты страницы идут по
+        номеру, повторы с прошлых страниц отбрасываются по ID. Число лотов
+        по тексту «of N lots» первой страницы - в self.auction_lot_total.
+        """
+        self.run_log.info('scan_start', "🔍 СКАНИРОВАНИЕ АУКЦИОНА (потоком): %s\n" + "="*60, auction_url, auction_url=auction_url)
         
-        # Получаем все лоты
-        lots = self.get_all_auction_lots(auction_url)
+        self.auction_lot_total = None
+        try:
+            first_url = self.build_results_page_url(auction_url, 1, page_size) if page_size else auction_url
+            first_lots, page_numbers, self.auction_lot_total = self.fetch_page_lots(first_url)
+        except Exception as e:
+            self.run_log.error('scan_error', "❌ Ошибка при сканировании аукциона: %s", e, auction_url=auction_url, error=str(e))
+            return
+        self.run_log.info('scan_page', "🔗 Найдено лотов на странице 1: %d, страниц результатов: %d", len(first_lots),
+                          max(page_numbers), page=1, lots=len(first_lots), pages=max(page_numbers))
         
-        if not lots:
-            print("❌ Не удалось найти лоты в аукционе")
-            return False
+        if not page_size and first_lots:
+            pp_match = re.search(r'[?&]pp=(\d+)', first_lots[0]['url'])
+            page_size = int(pp_match.group(1)) if pp_match else None
         
-        total_lots = len(lots)
-        if max_lots:
-            lots = lots[:max_lots]
-            print(f"🎯 Ограничиваем парсинг до {max_lots} лотов из {total_lots}")
+        seen_lots = set()
         
-        print(f"\n📦 НАЧИНАЕМ ПАРСИНГ {len(lots)} ЛОТОВ")
-        print("="*50)
+        def new_lots(page_lots):
+            for lot in sorted(page_lots, key=self.lot_sort_key):
+                if lot['id'] not in seen_lots:
+                    seen_lots.add(lot['id'])
+                    yield lot
         
-        success_count = 0
-        error_count = 0
+        yield from new_lots(first_lots)
         
-        for i, lot in enumerate(lots, 1):
-            try:
-                print(f"\n[{i}/{len(lots)}] Парсим лот ID: {lot['id']}")
-                print(f"URL: {lot['url']}")
-                
-                # Парсим лот
-                lot_data = self.parse_lot_page(lot['url'])
+        executor = ThreadPoolExecutor(max_workers=prefetch)
+        pending = deque()
+        next_page = 2
+        try:
+            while True:
+                while len(pending) < prefetch and next_page <= max(page_numbers):
+                    page_url = self.build_results_page_url(auction_url, next_page, page_size)
+                    pending.append((next_page, executor.submit(self.fetch_page_lots, page_url, len(first_lots))))
+                    next_page += 1
+                if not pending:
+                    break
                 
-                if lot_data:
-                    # Сохраняем данные
-                    self.save_lot_data(lot_data)
-                    
-                    # Скачиваем изображение
-                    self.download_all_lot_images(lot_data)
-                    
-                    success_count += 1
-                    lot_number = lot_data.get('lot_number', lot['id'])
-                    print(f"✅ Лот #{lot_number} успешно обработан")
-                    
-                    # Показываем краткую информацию
-                    desc = lot_data.get('lot_description', '')
-                    if len(desc) > 100:
-                        desc = desc[:100] + "..."
-                    print(f"   Описание: {desc}")
-                    print(f"   Оценка: {lot_data.get('lot_estimate', 'N/A')}")
-                    
-                    # 🔍 ПРОВЕРЯЕМ ЗАПОЛНЕННОСТЬ ПОЛЕЙ
-                    is_valid = self.validate_lot_data(lot_data, lot_number)
-                    if not is_valid:
-                        print(f"   ⚠️ Лот #{lot_number} имеет незаполненные обязательные поля!")
-                    
+                page_number, future = pending.popleft()
+                try:
+                    page_lots, more_pages, _ = future.result()
+                except Exception as e:
+                    self.run_log.warning('page_error', "⚠️ Ошибка загрузки страницы %d: %s", page_number, e,
+                                         page=page_number, error=str(e))
+                    continue
+                # Окно пагинации могло открыть новые страницы
+                page_numbers |= more_pages
+                yield from new_lots(page_lots)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def print_lot_header(self, i, total, lot):
+        """Заголовок лота в логе прогресса"""
+        self.log("\n[%d/%d] Парсим лот ID: %s\nURL: %s", i, total, lot['id'], lot['url'])
+    
+    def iter_parsed_lots(self, lots, delay=2, concurrency=1):
+        """Парсинг страниц лотов: последовательно с задержкой или пулом потоков
+
+        Результаты всегда отдаются в порядке лотов: (лот, lot_data или None)
+        """
+        if concurrency <= 1:
+            for i, lot in enumerate(lots, 1):
+                self.print_lot_header(i, len(lots), lot)
+                yield lot, self.parse_lot_page(lot['url'])
+
+                # Задержка между запросами (только в последовательном режиме)
+                if i < len(lots) and delay:
+                    time.sleep(delay)
+            return
+
+        # 🚀 ОДНОВРЕМЕННО В РАБОТЕ НЕ БОЛЕЕ concurrency СТРАНИЦ ЛОТОВ
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        lots_iter = enumerate(lots, 1)
+        pending = []
+
+        def submit_next():
+            item = next(lots_iter, None)
+            if item is not None:
+                i, lot = item
+                self.print_lot_header(i, len(lots), lot)
+                pending.append((lot, executor.submit(self.parse_lot_page, lot['url'])))
+
+        try:
+            for _ in range(concurrency):
+                submit_next()
+
+            while pending:
+                lot, future = pending.pop(0)
+                try:
+                    lot_data = future.result()
+                except Exception as e:
+                    self.run_log.error('lot_error', "❌ Ошибка парсинга лота %s: %s", lot['id'], e,
+                                       lot_id=lot['id'], error=str(e))
+                    lot_data = None
+
+                # Освободившееся место сразу занимаем следующим лотом
+                submit_next()
+
+                yield lot, lot_data
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def iter_lots(self, auction_url, max_lots=None, delay=0, concurrency=1, requests_per_second=None, engine="threads",
+                  page_size=None, incremental_state_dir=None, sinks=(), circuit_breaker=None, low_memory=False):
+        """Поток результатов LotResult по лотам аукциона в порядке каталога
+
+        Лот загружается только когда под него есть место в окне concurrency
+        (или окне асинхронного движка): пока вызывающий код не забрал результат,
+        новые страницы не запрашиваются, поэтому память не растет с размером
+        аукциона. Запись, изображения и лог - подключаемые sinks (lot_sinks.py),
+        без них лоты только загружаются и извлекаются.
+        concurrency > 1 включает параллельную загрузку страниц лотов, а
+        requests_per_second задает общий бюджет запросов вместо задержки delay;
+        "auto" - адаптивный бюджет (AdaptiveRateLimiter): частота растет, пока
+        сайт отвечает быстро, и снижается на 429/503, Retry-After и рост задержки,
+        а хост после серии ошибок ставится на паузу (CircuitBreaker).
+        Готовые RateLimiter / AdaptiveRateLimiter и circuit_breaker делят один
+        бюджет между несколькими парсерами (crawl_orchestrator.py).
+        engine="async" (или готовый AsyncAuctionEngine) загружает страницы и
+        изображения через общий асинхронный пул соединений.
+        page_size - размер страницы результатов при поиске лотов (pp).
+        incremental_state_dir - папка с отпечатками лотов прошлых обходов: неизмененные
+        лоты не извлекаются и не записываются, а новые/измененные/снятые попадают в журнал.
+        low_memory=True - лоты каталога не собираются в список, а идут потоком
+        со страниц результатов (iter_auction_lots): в памяти только окно загрузки
+        и ID лотов, порядок - по страницам каталога.
+        Итоги запуска - в self.run_stats.
+        """
+        self.run_stats = {'discovered': 0, 'queued': 0, 'parsed': 0, 'unchanged': 0, 'error': 0,
+                          'new': 0, 'changed': 0, 'withdrawn': 0}
+        
+        # Получаем все лоты (low_memory - потоком со страниц результатов)
+        if low_memory:
+            lots_iter = self.iter_auction_lots(auction_url, page_size=page_size)
+            first_lot = next(lots_iter, None)
+        else:
+            lots = self.get_all_auction_lots(auction_url, page_size=page_size)
+            first_lot = lots[0] if lots else None
+        
+        if first_lot is None:
+            self.run_log.error('no_lots', "❌ Не удалось найти лоты в аукционе", auction_url=auction_url)
+            return
+        
+        if low_memory:
+            lots = StreamedLots(self, lots_iter, first_lot, max_lots)
+            self.run_stats['discovered'] = self.auction_lot_total or 0
+            discovered_lot_ids = lots.discovered_ids
+        else:
+            self.run_stats['discovered'] = len(lots)
+            if max_lots:
+                lots = lots[:max_lots]
+            discovered_lot_ids = {lot['id'] for lot in lots}
+        if max_lots:
+            self.log(f"🎯 Ограничиваем парсинг до {max_lots} лотов из {self.run_stats['discovered']}", level="info")
+        
+        # 🔁 ИНКРЕМЕНТАЛЬНЫЙ ОБХОД: отпечатки лотов прошлых запусков
+        if incremental_state_dir:
+            self.incremental_state = IncrementalState(incremental_state_dir,
+                                                      IncrementalState.auction_id_from_url(first_lot['url']))
+            self.log(f"🔁 Инкрементальный режим: известно лотов {len(self.incremental_state.lots)}", level="info")
+        
+        # 🔁 ПРИ ПРОДОЛЖЕНИИ ПРОПУСКАЕМ УЖЕ СОХРАНЕННЫЕ ЛОТЫ (в потоке - по ходу обхода)
+        if self.completed_lot_ids and not low_memory:
+            remaining_lots = [lot for lot in lots if lot['id'] not in self.completed_lot_ids]
+            self.log(f"⏭️ Пропускаем уже сохраненные лоты: {len(lots) - len(remaining_lots)}", level="info")
+            lots = remaining_lots
+            if not lots:
+                self.run_log.report('run_complete', "✅ Все лоты аукциона уже сохранены", completed=len(self.completed_lot_ids))
+                return
+        if not low_memory:
+            self.run_stats['queued'] = len(lots)
+        self.write_checkpoint()
+        
+        self.run_log.info('run_start', f"\n📦 НАЧИНАЕМ ПАРСИНГ {len(lots)} ЛОТОВ\n" + "="*50,
+                          auction_url=auction_url, lots=len(lots), discovered=self.run_stats['discovered'])
+        
+        # 🚀 АСИНХРОННЫЙ ДВИЖОК: страницы и изображения через один пул aiohttp
+        async_engine = None
+        own_engine = False
+        if engine == "async":
+            from async_engine import AsyncAuctionEngine
+            async_engine = AsyncAuctionEngine(requests_per_second=requests_per_second,
+                                              headers=dict(self.session.headers), metrics=self.metrics,
+                                              log=self.run_log, circuit_breaker=circuit_breaker)
+            own_engine = True
+        elif engine != "threads":
+            async_engine = engine
+        
+        if async_engine:
+            window = concurrency if concurrency > 1 else async_engine.concurrency
+            download_images = any(getattr(sink, 'downloads_images', False) for sink in sinks)
+            results = async_engine.iter_parsed_lots(self, lots, window=window, download_images=download_images)
+            self.log(f"⚡ Асинхронный движок: лотов в работе {window}", level="info")
+        
+        # 🚀 ОБЩИЙ БЮДЖЕТ ЗАПРОСОВ ВМЕСТО ФИКСИРОВАННОЙ ЗАДЕРЖКИ
+        elif requests_per_second == "auto" or hasattr(requests_per_second, 'record_response'):
+            rate_limiter = AdaptiveRateLimiter() if requests_per_second == "auto" else requests_per_second
+            self.http_adapter.set_throttling(rate_limiter, circuit_breaker or CircuitBreaker(log=self.run_log))
+            delay = 0
+            self.log(f"⚡ Адаптивный лимит запросов, параллельно: {concurrency}", level="info")
+        elif requests_per_second:
+            rate_limiter = requests_per_second if hasattr(requests_per_second, 'acquire') else RateLimiter(requests_per_second)
+            self.http_adapter.set_throttling(rate_limiter, circuit_breaker)
+            delay = 0
+            self.log(f"⚡ Лимит запросов: {rate_limiter.rate:g}/с, параллельно: {concurrency}", level="info")
+        elif concurrency > 1:
+            delay = 0
+            self.log(f"⚡ Параллельная загрузка лотов: {concurrency}", level="info")
+        
+        if not async_engine:
+            results = self.iter_parsed_lots(lots, delay, concurrency)
+        
+        for sink in sinks:
+            sink.open(self, lots, async_engine)
+        
+        # Результаты, ждущие отложенной обработки sinks (Future из on_lot), по порядку лотов
+        pending = deque()
+        completed = False
+        try:
+            for lot, lot_data in results:
+                if lot_data is UNCHANGED:
+                    # Страница не изменилась - ни извлечения, ни записи
+                    result = LotResult(lot, None, UNCHANGED_STATUS)
+                    self.completed_lot_ids.add(lot['id'])
+                elif lot_data:
+                    result = LotResult(lot, lot_data, PARSED)
                 else:
-                    error_count += 1
-                    print(f"❌ Ошибка парсинга лота {lot['id']}")
+                    result = LotResult(lot, None, ERROR, error="страница лота не загружена или не разобрана")
                 
-                # Прогресс
-                if i % 10 == 0:
-                    print(f"\n📊 ПРОГРЕСС: {i}/{len(lots)} ({i/len(lots)*100:.1f}%)")
-                    print(f"   Успешно: {success_count}")
-                    print(f"   Ошибок: {error_count}")
+                # 🔁 Инкрементальный обход: отпечаток станет состоянием, только когда строка лота записана
+                change = None
+                if result.status == PARSED and self.incremental_state:
+                    change = self.incremental_state.record(lot_data)
+                    result = result._replace(change=change['change'])
                 
-                # Задержка между запросами
-                if i < len(lots):
-                    time.sleep(delay)
-                    
-            except KeyboardInterrupt:
-                print(f"\n⚠️ ПРЕРЫВАНИЕ ПОЛЬЗОВАТЕЛЕМ")
-                print(f"Обработано: {success_count}/{len(lots)} лотов")
-                break
+                deferred = []
+                try:
+                    for sink in sinks:
+                        future = sink.on_lot(result)
+                        if future is not None:
+                            deferred.append(future)
+                except Exception as e:
+                    result = self.lot_failed(result, e)
+                pending.append((result, deferred, change))
                 
+                # Готовые результаты - по порядку, не дожидаясь последующих лотов
+                while pending and all(future.done() for future in pending[0][1]):
+                    yield self.finish_result(*pending.popleft())
+            
+            while pending:
+                yield self.finish_result(*pending.popleft())
+            completed = True
+        
+        finally:
+            # Сначала sinks: очередь изображений дозагружается еще под лимитом запросов
+            for sink in sinks:
+                sink.close(completed)
+            self.record_throttle_stats(async_engine.rate_limiter if async_engine else self.http_adapter.rate_limiter,
+                                       async_engine.circuit_breaker if async_engine else self.http_adapter.circuit_breaker)
+            self.http_adapter.set_throttling(None)
+            if self.incremental_state:
+                # Снятые лоты определяем только по полному каталогу
+                if completed and not max_lots:
+                    withdrawn = self.incremental_state.mark_withdrawn(discovered_lot_ids)
+                    self.incremental_state.log_changes(withdrawn)
+                    self.run_stats['withdrawn'] = len(withdrawn)
+                self.incremental_state.save()
+            if own_engine:
+                async_engine.close()
+            if self.image_processor:
+                self.image_processor.shutdown()
+            self.run_log.info('run_finish', None, completed=completed, **self.run_stats)
+            self.run_log.flush()
+    
+    def lot_failed(self, result, error):
+        """Ошибка sink для лота - результат становится ошибкой"""
+        self.run_log.error('lot_error', "❌ Критическая ошибка для лота %s: %s", result.lot['id'], error,
+                           lot_id=result.lot['id'], error=str(error))
+        return result._replace(status=ERROR, change=None, error=str(error))
+    
+    def finish_result(self, result, deferred, change):
+        """Итог лота после всех sinks (ждет отложенную обработку): статистика и журнал изменений"""
+        for future in deferred:
+            try:
+                future.result()
             except Exception as e:
-                error_count += 1
-                print(f"❌ Критическая ошибка для лота {lot['id']}: {e}")
-                continue
-        
-        # Финальная статистика
-        print(f"\n🎉 ПАРСИНГ ЗАВЕРШЕН!")
-        print("="*40)
-        print(f"Всего лотов в аукционе: {total_lots}")
-        print(f"Обработано: {success_count + error_count}/{len(lots)}")
-        print(f"Успешно: {success_count}")
-        print(f"Ошибок: {error_count}")
-        print(f"Успешность: {success_count/len(lots)*100:.1f}%")
-        print(f"📁 Данные сохранены в: {self.working_dir}")
+                if result.status != ERROR:
+                    result = self.lot_failed(result, e)
+        
+        # 🔁 Журнал изменений инкрементального обхода (только для обработанных лотов)
+        if change and result.status == PARSED:
+            self.incremental_state.log_changes([change])
+            self.run_stats[change['change']] += 1
+            if self.lot_writer is None:
+                # Строки не пишутся (нет StorageSink) - лот обработан, когда результат отдан
+                self.incremental_state.confirm([change['lot_system_id']])
+        
+        self.run_stats[result.status] += 1
+        if self.metrics:
+            self.metrics.increment(f"lots_{result.status}")
+        return result
+    
+    def record_throttle_stats(self, rate_limiter, circuit_breaker):
+        """Итоги адаптивного бюджета запросов в run_stats['throttle']"""
+        if not hasattr(rate_limiter, 'record_response'):
+            return
+        self.run_stats['throttle'] = dict(rate_limiter.stats, final_rate=rate_limiter.rate,
+                                          paused_hosts=circuit_breaker.stats['opened'] if circuit_breaker else 0)
+    
+    async def aiter_lots(self, auction_url, **options):
+        """Асинхронный вариант iter_lots: следующий лот запрашивается, когда его ждут"""
+        loop = asyncio.get_running_loop()
+        results = self.iter_lots(auction_url, **options)
+        try:
+            while True:
+                result = await loop.run_in_executor(None, next, results, None)
+                if result is None:
+                    break
+                yield result
+        finally:
+            await loop.run_in_executor(None, results.close)
+    
+    def parse_auction(self, auction_url, max_lots=None, delay=2, concurrency=1, requests_per_second=None, engine="threads", page_size=None,
+                      incremental_state_dir=None, metrics_port=None, low_memory=False):
+        """Парсинг полного аукциона: iter_lots с записью, изображениями и логом в консоль
+
+        Параметры - как у iter_lots; metrics_port - метрики для Prometheus
+        на http://127.0.0.1:<port>/metrics во время парсинга.
+        """
+        self.run_log.report('parse_start', "🚀 НАЧИНАЕМ ПАРСИНГ ПОЛНОГО АУКЦИОНА\n" + "="*60, auction_url=auction_url)
+        
+        # Лот записывается, когда его изображения скачаны в общей очереди
+        sinks = [ImageSink(downstream=[StorageSink()]), ConsoleSink()]
+        results = self.iter_lots(auction_url, max_lots=max_lots, delay=delay, concurrency=concurrency,
+                                 requests_per_second=requests_per_second, engine=engine, page_size=page_size,
+                                 incremental_state_dir=incremental_state_dir, sinks=sinks, low_memory=low_memory)
+        
+        if self.metrics and metrics_port:
+            self.metrics.serve(metrics_port, log=self.run_log)
+        try:
+            with closing(results):
+                for _ in results:
+                    pass
+        except KeyboardInterrupt:
+            self.run_log.warning('interrupted', "\n⚠️ ПРЕРЫВАНИЕ ПОЛЬЗОВАТЕЛЕМ\nОбработано: %d/%d лотов",
+                                 self.run_stats['parsed'], self.run_stats['queued'],
+                                 parsed=self.run_stats['parsed'], queued=self.run_stats['queued'])
+        finally:
+            if self.metrics:
+                self.metrics.stop_serving()
+        
+        stats = self.run_stats
+        if not stats['discovered']:
+            return False
+        if not stats['queued']:
+            return True
+        
+        success_count = stats['parsed']
+        error_count = stats['error']
+        unchanged_count = stats['unchanged']
+        queued = stats['queued']
+        
+        # Финальная статистика: текст одной записью журнала, счетчики - ее полями
+        lines = [
+            "\n🎉 ПАРСИНГ ЗАВЕРШЕН!",
+            "="*40,
+            f"Всего лотов в аукционе: {stats['discovered']}",
+            f"Обработано: {success_count + error_count + unchanged_count}/{queued}",
+            f"Успешно: {success_count}",
+            f"Ошибок: {error_count}",
+            f"Успешность: {(success_count + unchanged_count)/queued*100:.1f}%",
+        ]
+        summary = dict(stats, working_dir=self.working_dir)
+        
+        if self.incremental_state:
+            lines.append(f"🔁 Изменения: новых {stats['new']}, измененных {stats['changed']}, "
+                         f"снятых {stats['withdrawn']}, без изменений {unchanged_count}")
+            lines.append(f"📜 Журнал изменений: {self.incremental_state.changes_file}")
+        lines.append(f"📁 Данные сохранены в: {self.working_dir}")
+        
+        if self.http_cache:
+            cache_stats = summary['http_cache'] = self.http_cache.stats
+            lines.append(f"💾 HTTP-кэш: из кэша {cache_stats['hits']}, подтверждено 304: {cache_stats['revalidated']}, "
+                         f"загружено: {cache_stats['misses']} ({cache_stats['bytes_downloaded'] / 1024 / 1024:.1f} МБ, "
+                         f"сэкономлено {cache_stats['bytes_saved'] / 1024 / 1024:.1f} МБ)")
+        
+        if self.html_archive:
+            archive_stats = summary['html_archive'] = self.html_archive.stats
+            lines.append(f"🗄️ Архив HTML: новых страниц {archive_stats['stored']}, без изменений {archive_stats['deduplicated']}, "
+                         f"{archive_stats['raw_bytes'] / 1024 / 1024:.1f} МБ -> {archive_stats['stored_bytes'] / 1024 / 1024:.1f} МБ "
+                         f"({self.html_archive.compression})")
+        
+        if 'throttle' in stats:
+            throttle = stats['throttle']
+            lines.append(f"🚦 Адаптивный лимит: итог {throttle['final_rate']:.1f} запр/с (пик {throttle['peak_rate']:.1f}), "
+                         f"429/503: {throttle['throttled']}, медленных ответов: {throttle['slow_responses']}, "
+                         f"снижений: {throttle['decreases']}, пауз хостов: {throttle['paused_hosts']}")
+        
+        if self.image_store:
+            store_stats = summary['image_store'] = self.image_store.stats
+            lines.append(f"🗃️ Хранилище изображений: из хранилища {store_stats['linked']}, новых {store_stats['added']}, "
+                         f"совпало по содержимому {store_stats['deduplicated']} "
+                         f"(сэкономлено {store_stats['bytes_saved'] / 1024 / 1024:.1f} МБ)")
+        
+        self.run_log.report('parse_summary', "\n".join(lines), **summary)
+
+        # ⏱️ Время стадий с перцентилями; полный снимок - в metrics.json папки запуска
+        if self.metrics:
+            self.metrics.print_summary(log=self.run_log)
+            if self.output_format is not None:
+                metrics_file = self.working_dir / "metrics.json"
+                self.metrics.write_json(metrics_file)
+                self.run_log.report('metrics_saved', "📈 Метрики: %s", metrics_file, path=metrics_file)
         
         # 📊 Показываем статистику заполненности полей
         if success_count > 0:
             self.print_field_statistics(success_count)
         
-        return success_count > 0
+        return success_count + unchanged_count > 0
 
     def extract_dimensions(self, description_text):
         """Извлечение размеров из текста описания"""
-        dimensions = []
-        
-        # Различные паттерны для размеров
-        patterns = [
-            r'(\d+(?:\.\d+)?)\s*cm\s+(?:high|height|h)\b',
-            r'(\d+(?:\.\d+)?)\s*cm\s+(?:wide|width|w)\b', 
-            r'(\d+(?:\.\d+)?)\s*cm\s+(?:deep|depth|d)\b',
-            r'(\d+(?:\.\d+)?)\s*cm\s+(?:long|length|l)\b',
-            r'(\d+(?:\.\d+)?)\s*cm\s+(?:diameter|diam)\b',
-            r'(\d+(?:\.\d+)?)\s*x\s*(\d+(?:\.\d+)?)\s*(?:x\s*(\d+(?:\.\d+)?))?\s*cm',
-            r'(\d+(?:\.\d+)?)\s*inches?\s+(?:high|wide|deep|long)',
-            r'(\d+(?:\.\d+)?)\s*"\s+(?:high|wide|deep|long)',
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, description_text, re.IGNORECASE)
-            for match in matches:
-                if isinstance(match, tuple):
-                    # Для сложных размеров (например, 10x20x30 cm)
-                    dim_str = ' x '.join([d for d in match if d])
-                    dimensions.append(dim_str + ' cm')
-                else:
-                    dimensions.append(f"{match} cm")
-        
-        return '; '.join(dimensions) if dimensions else ""
+        with self.timer('extract_dimensions'):
+            return field_extractors.extract_dimensions(description_text)
     
     def extract_materials(self, description_text):
         """Извлечение материалов из текста описания"""
-        # Распространенные материалы в аукционах
-        materials = [
-            'brass', 'bronze', 'copper', 'silver', 'gold', 'platinum',
-            'wood', 'oak', 'mahogany', 'walnut', 'pine', 'teak', 'ebony',
-            'glass', 'crystal', 'ceramic', 'porcelain', 'earthenware', 'stoneware', 'jasper',
-            'marble', 'stone', 'granite', 'slate',
-            'fabric', 'silk', 'cotton', 'wool', 'linen', 'velvet', 'leather',
-            'plastic', 'resin', 'bakelite',
-            'ivory', 'bone', 'mother of pearl',
-            'enamel', 'lacquer', 'gilt', 'gilded'
-        ]
-        
-        found_materials = []
-        text_lower = description_text.lower()
-        
-        for material in materials:
-            if material in text_lower:
-                found_materials.append(material.title())
-        
-        return ', '.join(found_materials) if found_materials else ""
+        with self.timer('extract_materials'):
+            return field_extractors.extract_materials(description_text)
     
     def extract_period_dating(self, description_text):
         """Извлечение периода и датировки"""
-        periods = []
-        
-        # Паттерны для веков
-        century_patterns = [
-            r'(\d+)(?:st|nd|rd|th)\s+century',
-            r'(\d+)(?:st|nd|rd|th)\s+c\.',
-        ]
-        
-        # Паттерны для конкретных дат
-        date_patterns = [
-            r'circa\s+(\d{4})',
-            r'c\.\s*(\d{4})',
-            r'\b(\d{4})\b',
-            r'(\d{4})\s*-\s*(\d{4})',
-        ]
-        
-        for pattern in century_patterns:
-            matches = re.findall(pattern, description_text, re.IGNORECASE)
-            for match in matches:
-                periods.append(f"{match} century")
-        
-        for pattern in date_patterns:
-            matches = re.findall(pattern, description_text, re.IGNORECASE)
-            for match in matches:
-                if isinstance(match, tuple):
-                    periods.append(f"{match[0]}-{match[1]}")
-                else:
-                    periods.append(match)
-        
-        return ', '.join(periods) if periods else ""
+        with self.timer('extract_period_dating'):
+            return field_extractors.extract_period_dating(description_text)
     
     def extract_artist_maker(self, description_text):
         """Извлечение имен художников и производителей"""
-        makers = []
-        
-        # Паттерны для производителей/художников
-        patterns = [
-            r'by\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)',
-            r'([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*),\s+(?:Paris|London|Berlin|Vienna)',
-            r'(?:signed|attributed to|after)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)',
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, description_text)
-            makers.extend(matches)
-        
-        # Удаляем дубликаты
-        unique_makers = list(dict.fromkeys(makers))
-        return ', '.join(unique_makers) if unique_makers else ""
+        with self.timer('extract_artist_maker'):
+            return field_extractors.extract_artist_maker(description_text)
     
     def extract_origin_country(self, description_text):
         """Извлечение страны происхождения"""
-        countries = [
-            'French', 'English', 'British', 'German', 'Italian', 'Spanish', 
-            'Chinese', 'Japanese', 'American', 'Austrian', 'Dutch', 'Belgian',
-            'Russian', 'Scandinavian', 'European'
-        ]
-        
-        text_words = description_text.split()
-        found_countries = []
-        
-        for country in countries:
-            if country in text_words:
-                found_countries.append(country)
-        
-        return ', '.join(found_countries) if found_countries else ""
+        with self.timer('extract_origin_country'):
+            return field_extractors.extract_origin_country(description_text)
     
     def extract_additional_images(self, soup):
         """Извлечение всех дополнительных изображений лота"""
@@ -947,14 +1688,9 @@ class FullAuctionParser:
         if condition_tab:
             condition_images = condition_tab.find_all('img')
             for img in condition_images:
-                src = img.get('src', '')
-                if src and 'stock' in src:
-                    # Получаем высокое разрешение
-                    high_res_url = src.replace('-small', '').replace('-medium', '')
-                    if high_res_url.startswith('//'):
-                        high_res_url = 'https:' + high_res_url
-                    elif high_res_url.startswith('/'):
-                        high_res_url = 'https://tennants.blob.core.windows.net' + high_res_url
+                # Получаем высокое разрешение
+                high_res_url = field_extractors.additional_image_url(img.get('src', ''))
+                if high_res_url:
                     additional_images.append(high_res_url)
         
         return additional_images
@@ -964,21 +1700,47 @@ class FullAuctionParser:
         # Ищем в h1 с классом lot-title
         h1_tag = soup.find('h1', {'class': re.compile(r'lot-title.*cat-\d+')})
         if h1_tag:
-            class_attr = h1_tag.get('class', [])
-            for cls in class_attr:
-                if cls.startswith('cat-'):
-                    # Можно создать словарь категорий если нужно
-                    return cls
+            lot_category = field_extractors.category_from_classes(h1_tag.get('class', []))
+            if lot_category:
+                return lot_category
         
         # Альтернативно ищем в option elements
         options = soup.find_all('option')
         for option in options:
             text = option.get_text(strip=True)
-            if any(keyword in text.lower() for keyword in ['ceramics', 'glass', 'furniture', 'art', 'jewelry']):
+            if field_extractors.is_category_option(text):
                 return text
         
         return ""
 
+def fetch_auction_info(auction_url, session=None, timeout=30):
+    """Название и дата аукциона со страницы аукциона: (title, "YYYY-MM-DD"), "" - не найдено"""
+    if session is None:
+        session = requests.Session()
+        session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+        })
+    
+    response = session.get(auction_url, timeout=timeout)
+    response.raise_for_status()
+    soup = BeautifulSoup(response.content, 'html.parser')
+    
+    # Название - до " - " в заголовке страницы
+    auction_title = ""
+    title_tag = soup.find('title')
+    if title_tag:
+        full_title = title_tag.get_text(strip=True)
+        auction_title = full_title.split(' - ')[0] if ' - ' in full_title else full_title
+    
+    # Дата в формате "18th Jul, 2025"
+    auction_date = ""
+    date_element = soup.find('p', {'class': 'date-title'})
+    if date_element:
+        auction_date = field_extractors.parse_auction_date(date_element.get_text(strip=True))
+    
+    return auction_title, auction_date
+
+
 def main():
     # URL аукциона, найденного ранее
     auction_url = "https://auctions.tennants.co.uk/auction/details/180725-antiques--interiors-to-include-designer-fashion-and-affordable-modern--contemporary-art/?au=14251"
@@ -988,49 +1750,10 @@ def main():
     
     # 🔥 ПОЛУЧАЕМ ИНФОРМАЦИЮ ОБ АУКЦИОНЕ ДЛЯ НАЗВАНИЯ ПАПКИ
     print("📋 Получение информации об аукционе...")
-    
-    # Быстрый запрос для получения названия аукциона
     try:
-        import requests
-        from bs4 import BeautifulSoup
-        
-        session = requests.Session()
-        session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        })
-        
-        response = session.get(auction_url, timeout=30)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Извлекаем название аукциона
-        auction_title = ""
-        title_tag = soup.find('title')
-        if title_tag:
-            full_title = title_tag.get_text(strip=True)
-            # Извлекаем название до " - "
-            auction_title = full_title.split(' - ')[0] if ' - ' in full_title else full_title
-        
-        if not auction_title:
-            auction_title = "Antiques & Interiors"
-        
-        # Извлекаем дату аукциона
-        auction_date = "2025-07-18"  # По умолчанию
-        date_element = soup.find('p', {'class': 'date-title'})
-        if date_element:
-            date_text = date_element.get_text(strip=True)
-            # Ищем дату в формате "18th Jul, 2025"
-            date_match = re.search(r'(\d+)\w+\s+(\w+),?\s+(\d{4})', date_text)
-            if date_match:
-                day, month, year = date_match.groups()
-                # Преобразуем месяц
-                month_map = {
-                    'Jan': '01', 'Feb': '02', 'Mar': '03', 'Apr': '04',
-                    'May': '05', 'Jun': '06', 'Jul': '07', 'Aug': '08', 
-                    'Sep': '09', 'Oct': '10', 'Nov': '11', 'Dec': '12'
-                }
-                month_num = month_map.get(month, '07')
-                auction_date = f"{year}-{month_num}-{day.zfill(2)}"
+        auction_title, auction_date = fetch_auction_info(auction_url)
+        auction_title = auction_title or "Antiques & Interiors"
+        auction_date = auction_date or "2025-07-18"  # По умолчанию
         
         print(f"✅ Название аукциона: {auction_title}")
         print(f"✅ Дата аукциона: {auction_date}")
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Ограничение частоты запросов для парсеров Tennants
+"""
+
+import asyncio
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from run_log import RunLog
+
+# Ответы, после которых запрос повторяется
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    """Глобальный бюджет запросов в секунду (token bucket), общий для всех потоков
+
+    pause(seconds) - пауза всех запросов (Retry-After от сервера).
+    reserve() не блокирует, поэтому лимитер общий для потоков и asyncio.
+    """
+
+    def __init__(self, requests_per_second, burst=1):
+        if requests_per_second <= 0:
+            raise ValueError("requests_per_second должен быть больше 0")
+        self.rate = float(requests_per_second)
+        self.capacity = max(1.0, float(burst))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def pause(self, seconds):
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            # После паузы запросы начинаются с пустого бюджета, без накопленного всплеска
+            self.tokens = min(self.tokens, 0.0)
+            self.updated_at = max(self.updated_at, self.paused_until)
+
+    def reserve(self):
+        """Время ожидания до своего токена (токен уже занят; баланс может уйти в минус)"""
+        with self.lock:
+            now = time.monotonic()
+            if now > self.updated_at:
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+            self.tokens -= 1
+            return max(0.0, self.updated_at - now - self.tokens / self.rate)
+
+    def acquire(self):
+        """Ожидание свободного токена (и конца паузы) перед запросом"""
+        wait_time = self.reserve()
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+    async def acquire_async(self):
+        wait_time = self.reserve()
+        if wait_time > 0:
+            await asyncio.sleep(wait_time)
+
+
+def parse_retry_after(value):
+    """Retry-After: секунды или HTTP-дата -> секунды ожидания (None - заголовка нет)"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class AdaptiveRateLimiter:
+    """Бюджет запросов, подстраивающийся под ответы сервера (AIMD)
+
+    Пока ответы быстрые, частота растет: сначала вдвое за секунду (как
+    медленный старт TCP), после первого замедления - на increase запросов/с
+    за секунду. 429/503, ошибки соединения и рост задержки выше
+    latency_factor x базовой уменьшают частоту в decrease раз (не чаще раза
+    в cooldown секунд). Retry-After приостанавливает все запросы.
+    reserve() не блокирует, поэтому лимитер общий для потоков и asyncio.
+    """
+
+    def __init__(self, initial_rate=2.0, min_rate=0.2, max_rate=50.0, increase=1.0, decrease=0.5,
+                 latency_factor=2.0, cooldown=1.0):
+        self.rate = float(initial_rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.cooldown = cooldown
+
+        self.slow_start = True
+        self.last_slot = float('-inf')
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.latency = None
+        self.baseline_latency = None
+        self.lock = threading.Lock()
+        self.stats = {'throttled': 0, 'slow_responses': 0, 'errors': 0, 'decreases': 0, 'peak_rate': self.rate}
+
+    def reserve(self):
+        """Время ожидания до своего слота (слот уже занят)
+
+        Интервал от предыдущего слота - по текущей частоте, поэтому ее
+        изменение сразу действует и на следующий запрос.
+        """
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.last_slot + 1.0 / self.rate, self.paused_until)
+            self.last_slot = start
+            return start - now
+
+    def acquire(self):
+        wait_time = self.reserve()
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+    async def acquire_async(self):
+        wait_time = self.reserve()
+        if wait_time > 0:
+            await asyncio.sleep(wait_time)
+
+    def record_response(self, status, latency, retry_after=None):
+        """Обратная связь по ответу: статус, время до заголовков ответа, Retry-After"""
+        with self.lock:
+            now = time.monotonic()
+            if status in (429, 503):
+                self.stats['throttled'] += 1
+                if retry_after:
+                    self.paused_until = max(self.paused_until, now + retry_after)
+                self.slow_down(now)
+                return
+            if status >= 500:
+                self.stats['errors'] += 1
+                self.slow_down(now)
+                return
+
+            # Сглаженная задержка; базовая - минимальная, медленно подтягивается к текущей
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+            self.baseline_latency = self.latency if self.baseline_latency is None else min(self.latency, self.baseline_latency * 1.01)
+
+            if self.latency > self.baseline_latency * self.latency_factor:
+                self.stats['slow_responses'] += 1
+                self.slow_down(now)
+            elif self.slow_start:
+                self.rate = min(self.max_rate, self.rate + 1.0)
+            else:
+                self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+            self.stats['peak_rate'] = max(self.stats['peak_rate'], self.rate)
+
+    def record_error(self):
+        """Ошибка соединения или таймаут"""
+        with self.lock:
+            self.stats['errors'] += 1
+            self.slow_down(time.monotonic())
+
+    def slow_down(self, now):
+        if now - self.last_decrease < self.cooldown:
+            return
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+        self.slow_start = False
+        self.last_decrease = now
+        self.stats['decreases'] += 1
+
+
+class CircuitBreaker:
+    """Пауза для хоста после failure_threshold ошибок подряд
+
+    Через reset_timeout секунд проходит один пробный запрос: успех снимает
+    паузу, ошибка продлевает ее. wait_time() не блокирует - для потоков
+    есть before_request(), для asyncio - цикл с asyncio.sleep. Паузы и
+    восстановление хостов пишутся в log (RunLog парсера или обхода).
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, log=None):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.log = log or RunLog()
+        self.hosts = {}
+        self.lock = threading.Lock()
+        self.stats = {'opened': 0}
+
+    def wait_time(self, host):
+        """0 - запрос можно отправлять, иначе сколько подождать до новой проверки"""
+        with self.lock:
+            state = self.hosts.get(host)
+            if not state or state['opened_at'] is None:
+                return 0
+            remaining = state['opened_at'] + self.reset_timeout - time.monotonic()
+            if remaining > 0:
+                return remaining
+            if state['trial']:
+                # Пробный запрос уже идет - ждем его результата
+                return min(1.0, self.reset_timeout)
+            state['trial'] = True
+            return 0
+
+    def before_request(self, host):
+        while True:
+            wait_time = self.wait_time(host)
+            if wait_time <= 0:
+                return
+            time.sleep(wait_time)
+
+    def record(self, host, success):
+        with self.lock:
+            state = self.hosts.setdefault(host, {'failures': 0, 'opened_at': None, 'trial': False})
+            if success:
+                if state['opened_at'] is not None:
+                    self.log.info('host_resumed', "🔌 Хост %s снова отвечает", host, host=host)
+                state.update(failures=0, opened_at=None, trial=False)
+                return
+
+            state['failures'] += 1
+            if state['trial'] or (state['opened_at'] is None and state['failures'] >= self.failure_threshold):
+                if state['opened_at'] is None:
+                    self.log.warning('host_paused', "🔌 Хост %s: %d ошибок подряд, пауза %.0fс",
+                                     host, state['failures'], self.reset_timeout,
+                                     host=host, failures=state['failures'], pause=self.reset_timeout)
+                    self.stats['opened'] += 1
+                state['opened_at'] = time.monotonic()
+                state['trial'] = False
+
+
+class ThrottledHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter, который берет токен из общего RateLimiter перед каждым запросом
+
+    С лимитером или CircuitBreaker (set_throttling) повторы на 429/5xx делает
+    сам адаптер, чтобы каждая попытка проходила через лимитер; urllib3
+    повторяет только ошибки соединения. AdaptiveRateLimiter получает статус
+    и задержку каждого ответа, остальным лимитерам Retry-After на 429/503
+    передается как пауза (pause) всех запросов.
+    """
+
+    def __init__(self, rate_limiter=None, **kwargs):
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = None
+        self.status_retries = 0
+        # Metrics парсера: ожидание лимита, время до заголовков, статусы ответов
+        self.metrics = None
+        super().__init__(**kwargs)
+        self.default_max_retries = self.max_retries
+
+    def set_throttling(self, rate_limiter=None, circuit_breaker=None, status_retries=3):
+        """Лимитер и предохранитель для всех запросов сессии (None - сброс)"""
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        throttled = circuit_breaker is not None or rate_limiter is not None
+        self.status_retries = status_retries if throttled else 0
+        self.max_retries = Retry(total=3, backoff_factor=0.3, status_forcelist=[], respect_retry_after_header=False) if throttled else self.default_max_retries
+
+    def send(self, request, **kwargs):
+        host = urlparse(request.url).netloc
+        feedback = hasattr(self.rate_limiter, 'record_response')
+
+        for attempt in range(self.status_retries + 1):
+            wait_started_at = time.perf_counter()
+            if self.circuit_breaker:
+                self.circuit_breaker.before_request(host)
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            if self.metrics and (self.circuit_breaker or self.rate_limiter):
+                self.metrics.observe('http_wait', time.perf_counter() - wait_started_at)
+
+            started_at = time.monotonic()
+            try:
+                response = super().send(request, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if self.circuit_breaker:
+                    self.circuit_breaker.record(host, False)
+                if feedback:
+                    self.rate_limiter.record_error()
+                raise
+
+            # Время до заголовков ответа (с установкой соединения); тело читается позже
+            response.headers_at = time.perf_counter()
+            if self.metrics:
+                self.metrics.observe('http_ttfb', time.monotonic() - started_at)
+                self.metrics.increment(f"http_status_{response.status_code}")
+
+            if self.circuit_breaker:
+                self.circuit_breaker.record(host, response.status_code < 500)
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            paused = feedback
+            if feedback:
+                self.rate_limiter.record_response(response.status_code, time.monotonic() - started_at, retry_after)
+            elif retry_after and response.status_code in (429, 503) and hasattr(self.rate_limiter, 'pause'):
+                self.rate_limiter.pause(retry_after)
+                paused = True
+
+            if response.status_code in RETRY_STATUSES and attempt < self.status_retries:
+                response.close()
+                if not paused:
+                    # Лимит без обратной связи не замедляется сам - пауза как у Retry в urllib3
+                    time.sleep(0.3 * (2 ** attempt))
+                continue
+            return response
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Журнал запуска парсера: уровни, текст в консоль и JSON Lines, выборка подробностей по лотам
+"""
+
+import json
+import sys
+import threading
+import time
+import zlib
+
+LEVELS = {'debug': 10, 'info': 20, 'warning': 30, 'error': 40}
+
+
+class RunLog:
+    """Записи о ходе парсинга с уровнями debug / info / warning / error
+
+    Запись - событие (event) с полями и необязательным текстом для консоли;
+    текст форматируется (message % args), только если запись не отброшена
+    уровнем. level="info" - одна краткая запись на лот, "debug" - все шаги
+    и полная диагностика полей каждого лота. detail_sample - доля лотов
+    (выбор по ID, одинаковый при каждом запуске), для которых полная
+    диагностика печатается и на уровне info. quiet=True - в консоль только
+    предупреждения и ошибки. json_file - путь или открытый файл для записей
+    в JSON Lines ("-" - stdout; текст тогда уходит в stderr). report() -
+    итоги и таблицы: пишутся при любом уровне, текст скрывает только quiet.
+    """
+
+    def __init__(self, level="info", quiet=False, json_file=None, detail_sample=0.0):
+        self.level = LEVELS[level]
+        self.quiet = quiet
+        self.detail_sample = detail_sample
+        self.lock = threading.Lock()
+
+        self.owns_json = isinstance(json_file, str) and json_file != "-"
+        # Текст в консоль (None - текущий sys.stdout) не смешивается с JSON Lines в stdout
+        self.console = None
+        if json_file == "-":
+            json_file = sys.stdout
+            self.console = sys.stderr
+            self.quiet = True
+        self.json_file = open(json_file, 'a', encoding='utf-8') if self.owns_json else json_file
+
+    def enabled(self, level):
+        return LEVELS[level] >= self.level
+
+    def shows(self, level):
+        """Попадет ли текст записи уровня level в консоль"""
+        levelno = LEVELS[level]
+        return levelno >= self.level and (not self.quiet or levelno >= LEVELS['warning'])
+
+    def detail(self, lot_key):
+        """Нужна ли полная диагностика лота (уровень debug или лот из выборки)"""
+        if self.level <= LEVELS['debug']:
+            return True
+        if not self.detail_sample or self.quiet:
+            return False
+        return zlib.crc32(str(lot_key).encode('utf-8')) % 10000 < self.detail_sample * 10000
+
+    def write(self, level, event, message=None, *args, report=False, **fields):
+        levelno = LEVELS[level]
+        if levelno < self.level and not report:
+            return
+        if message is not None and args:
+            message = message % args
+
+        if self.json_file is not None:
+            record = {'ts': round(time.time(), 3), 'level': level, 'event': event}
+            record.update(fields)
+            if message is not None:
+                record['message'] = message.strip()
+            line = json.dumps(record, ensure_ascii=False, default=str)
+            with self.lock:
+                self.json_file.write(line + "\n")
+                if levelno >= LEVELS['error']:
+                    self.json_file.flush()
+
+        if message is not None and (not self.quiet or levelno >= LEVELS['warning']):
+            with self.lock:
+                print(message, file=self.console)
+
+    def debug(self, event, message=None, *args, **fields):
+        self.write('debug', event, message, *args, **fields)
+
+    def info(self, event, message=None, *args, **fields):
+        self.write('info', event, message, *args, **fields)
+
+    def warning(self, event, message=None, *args, **fields):
+        self.write('warning', event, message, *args, **fields)
+
+    def error(self, event, message=None, *args, **fields):
+        self.write('error', event, message, *args, **fields)
+
+    def report(self, event, message=None, *args, **fields):
+        self.write('info', event, message, *args, report=True, **fields)
+
+    def flush(self):
+        if self.json_file is not None:
+            with self.lock:
+                self.json_file.flush()
+
+    def close(self):
+        self.flush()
+        if self.owns_json:
+            self.json_file.close()
+            self.json_file = None
+            self.owns_json = False
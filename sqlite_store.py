@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Хранилище лотов в SQLite: одна строка на лот (upsert) и история цен/статусов между запусками
+"""
+
+import sqlite3
+from datetime import datetime
+
+from lot_writer import BufferedLotWriter
+
+# Колонки CSV, которые в SQLite хранятся числами
+INTEGER_COLUMNS = {'auction_id', 'lot_system_id', 'additional_images_count', 'image_width', 'image_height'}
+
+# Поля, изменения которых пишутся в историю
+PRICE_COLUMNS = ['lot_estimate', 'lot_sold_price', 'buyer_premium']
+STATUS_COLUMNS = ['lot_status']
+
+INDEXES = {
+    'lots_auction': 'auction_id',
+    'lots_category': 'lot_category',
+    'lots_maker': 'artist_maker',
+    'lots_auction_date': 'auction_date',
+}
+
+
+def to_integer(value):
+    value = str(value).strip()
+    return int(value) if value.isdigit() else None
+
+
+class SQLiteLotStore(BufferedLotWriter):
+    """Таблица lots с ключом (auction_id, lot_system_id) + price_history / status_history
+
+    Схема строится по списку колонок CSV (FullAuctionParser.csv_columns()).
+    Пачка лотов записывается одной транзакцией; WAL позволяет читать базу,
+    пока парсер пишет. run_id - метка запуска (папка парсинга), по ней при
+    продолжении определяются уже сохраненные лоты.
+    """
+
+    def __init__(self, db_path, columns, run_id="", max_rows=200, max_bytes=4 * 1024 * 1024, flush_interval=5.0,
+                 on_flush=None):
+        super().__init__(max_rows, max_bytes, flush_interval, on_flush)
+        self.db_path = db_path
+        self.columns = columns
+        self.run_id = run_id
+        self.pending_records = []
+
+        self.db = self.connect(db_path)
+        self.create_schema()
+        self.prepare_statements()
+        self.start_flusher()
+
+    def __str__(self):
+        return str(self.db_path)
+
+    @staticmethod
+    def connect(db_path):
+        db = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    @staticmethod
+    def completed_lot_ids(db_path, run_id):
+        """lot_system_id, сохраненные запуском run_id"""
+        db = sqlite3.connect(db_path)
+        try:
+            rows = db.execute("SELECT lot_system_id FROM lots WHERE last_run = ?", (run_id,)).fetchall()
+        except sqlite3.OperationalError:
+            rows = []
+        finally:
+            db.close()
+        return {str(lot_id) for (lot_id,) in rows}
+
+    def create_schema(self):
+        column_defs = [
+            f"{name} {'INTEGER' if name in INTEGER_COLUMNS else 'TEXT'}"
+            for name, _ in self.columns
+        ]
+        self.db.executescript(f"""
+            CREATE TABLE IF NOT EXISTS lots (
+                {', '.join(column_defs)},
+                first_seen TEXT,
+                last_seen TEXT,
+                last_run TEXT,
+                PRIMARY KEY (auction_id, lot_system_id)
+            );
+            CREATE TABLE IF NOT EXISTS price_history (
+                auction_id INTEGER,
+                lot_system_id INTEGER,
+                observed_at TEXT,
+                {', '.join(f'{name} TEXT' for name in PRICE_COLUMNS)}
+            );
+            CREATE TABLE IF NOT EXISTS status_history (
+                auction_id INTEGER,
+                lot_system_id INTEGER,
+                observed_at TEXT,
+                {', '.join(f'{name} TEXT' for name in STATUS_COLUMNS)}
+            );
+            CREATE INDEX IF NOT EXISTS price_history_lot ON price_history(auction_id, lot_system_id, observed_at);
+            CREATE INDEX IF NOT EXISTS status_history_lot ON status_history(auction_id, lot_system_id, observed_at);
+            CREATE INDEX IF NOT EXISTS lots_last_run ON lots(last_run);
+        """)
+        # База прошлых версий: недостающие колонки добавляются
+        existing_columns = {row[1] for row in self.db.execute("PRAGMA table_info(lots)")}
+        for column_def, (name, _) in zip(column_defs, self.columns):
+            if name not in existing_columns:
+                self.db.execute(f"ALTER TABLE lots ADD COLUMN {column_def}")
+        for index_name, column in INDEXES.items():
+            self.db.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON lots({column})")
+        self.db.commit()
+
+    def prepare_statements(self):
+        names = [name for name, _ in self.columns]
+        updates = ', '.join(f"{name} = excluded.{name}" for name in names if name not in ('auction_id', 'lot_system_id'))
+        self.upsert_sql = (
+            f"INSERT INTO lots ({', '.join(names)}, first_seen, last_seen, last_run) "
+            f"VALUES ({', '.join('?' for _ in names)}, ?, ?, ?) "
+            f"ON CONFLICT (auction_id, lot_system_id) DO UPDATE SET {updates}, "
+            f"last_seen = excluded.last_seen, last_run = excluded.last_run"
+        )
+
+        self.history_sql = {}
+        for table, history_columns in (('price_history', PRICE_COLUMNS), ('status_history', STATUS_COLUMNS)):
+            # Строка истории - только если значения отличаются от текущих в lots (или лот новый)
+            same_values = ' AND '.join(f"{name} IS ?" for name in history_columns)
+            self.history_sql[table] = (
+                f"INSERT INTO {table} (auction_id, lot_system_id, observed_at, {', '.join(history_columns)}) "
+                f"SELECT ?, ?, ?, {', '.join('?' for _ in history_columns)} "
+                f"WHERE NOT EXISTS (SELECT 1 FROM lots WHERE auction_id IS ? AND lot_system_id IS ? AND {same_values})",
+                history_columns
+            )
+
+    def record_values(self, lot_data):
+        values = []
+        for name, key in self.columns:
+            value = lot_data.get(key, '')
+            values.append(to_integer(value) if name in INTEGER_COLUMNS else str(value))
+        return values
+
+    def buffer_record(self, lot_data):
+        values = self.record_values(lot_data)
+        self.pending_records.append((values, lot_data))
+        return sum(len(value) for value in values if isinstance(value, str))
+
+    def write_batch(self):
+        seen_at = datetime.now().isoformat()
+        names = [name for name, _ in self.columns]
+        auction_index = names.index('auction_id')
+        lot_index = names.index('lot_system_id')
+
+        history_rows = {table: [] for table in self.history_sql}
+        upsert_rows = []
+        for values, lot_data in self.pending_records:
+            auction_id, lot_system_id = values[auction_index], values[lot_index]
+            observed_at = lot_data.get('timestamp') or seen_at
+            for table, (_, history_columns) in self.history_sql.items():
+                history_values = [values[names.index(name)] for name in history_columns]
+                history_rows[table].append([auction_id, lot_system_id, observed_at, *history_values,
+                                            auction_id, lot_system_id, *history_values])
+            upsert_rows.append([*values, seen_at, seen_at, self.run_id])
+
+        with self.db:
+            for table, (sql, _) in self.history_sql.items():
+                self.db.executemany(sql, history_rows[table])
+            self.db.executemany(self.upsert_sql, upsert_rows)
+
+        self.pending_records = []
+
+    def close_output(self):
+        self.db.close()